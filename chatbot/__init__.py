@@ -1 +1,12 @@
-from .chatbot_core import chatbot, load_models
+# The chatbot instance and loader are resolved on first access, so
+# importing torch-free submodules (config, batcher, executor, rules, ...)
+# does not import torch and the model stack.
+
+
+def __getattr__(name):
+    if name in ("chatbot", "load_models"):
+        from . import chatbot_core
+        return getattr(chatbot_core, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ["chatbot", "load_models"]
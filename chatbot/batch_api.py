@@ -0,0 +1,109 @@
+# Request parsing and NDJSON results for /api/chat/batch.
+# A batch body is either a JSON array or NDJSON (one item per line);
+# items are message strings or {"text": ..., "id": ...} objects.
+# Messages are scored chunk by chunk with Chatbot.predict_batch() and
+# every input gets one JSON result line, in input order, so servers can
+# stream each chunk as soon as it completes. Invalid items get an
+# "error" line instead of failing the whole request.
+
+import json
+
+from .config import BATCH_SIZE, CHAT_BATCH_MAX_BYTES, CHAT_BATCH_MAX_ITEMS, CHAT_BATCH_MAX_CHARS
+
+NDJSON_TYPE = "application/x-ndjson"
+
+
+class BatchRequestError(ValueError):
+    """Rejected batch request; `status` is the HTTP status to answer with."""
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def check_length(content_length, max_bytes: int = CHAT_BATCH_MAX_BYTES) -> int:
+    """Validate a Content-Length header value before reading the body."""
+    if content_length is None:
+        raise BatchRequestError("Content-Length required", status=411)
+    try:
+        length = int(content_length)
+    except ValueError:
+        raise BatchRequestError("Invalid Content-Length")
+    if length > max_bytes:
+        raise BatchRequestError(f"Request body larger than {max_bytes} bytes", status=413)
+    return length
+
+
+def parse_batch(body: bytes, content_type: str = "", max_items: int = CHAT_BATCH_MAX_ITEMS,
+                max_chars: int = CHAT_BATCH_MAX_CHARS) -> list:
+    """
+    Items of a batch body, in order, as dicts with "index" and either
+    "text" (plus "id" if given) or "error".
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise BatchRequestError("Body must be UTF-8")
+
+    # NDJSON by content type, or any body that is not a JSON array
+    if content_type.split(";")[0].strip() == NDJSON_TYPE or not text.lstrip().startswith("["):
+        raw = []
+        for line in text.splitlines():
+            if line.strip():
+                try:
+                    raw.append(json.loads(line))
+                except ValueError:
+                    raw.append(ValueError("Invalid JSON line"))
+            if len(raw) > max_items:
+                break
+    else:
+        try:
+            raw = json.loads(text)
+        except ValueError:
+            raise BatchRequestError("Invalid JSON array")
+    if not raw:
+        raise BatchRequestError("Empty batch")
+    if len(raw) > max_items:
+        raise BatchRequestError(f"Batch larger than {max_items} messages", status=413)
+
+    items = []
+    for i, entry in enumerate(raw):
+        item = {"index": i}
+        if isinstance(entry, dict):
+            if "id" in entry:
+                item["id"] = entry["id"]
+            entry = entry.get("text")
+        if isinstance(entry, Exception):
+            item["error"] = str(entry)
+        elif not isinstance(entry, str) or not entry.strip():
+            item["error"] = "Empty message"
+        elif len(entry) > max_chars:
+            item["error"] = f"Message longer than {max_chars} characters"
+        else:
+            item["text"] = entry.strip()
+        items.append(item)
+    return items
+
+
+def split_chunks(items: list, size: int = BATCH_SIZE):
+    """Consecutive slices of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def score_chunk(predict_batch, chunk: list) -> bytes:
+    """NDJSON result lines for one chunk of parsed items (one forward pass)."""
+    valid = [item for item in chunk if "text" in item]
+    results = predict_batch([item["text"] for item in valid], batch_size=max(1, len(valid))) if valid else []
+    by_index = {item["index"]: result for item, result in zip(valid, results)}
+
+    lines = []
+    for item in chunk:
+        row = {"index": item["index"]}
+        if "id" in item:
+            row["id"] = item["id"]
+        if "error" in item:
+            row["error"] = item["error"]
+        else:
+            row.update(by_index[item["index"]])
+        lines.append(json.dumps(row, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode("utf-8")
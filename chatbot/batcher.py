@@ -0,0 +1,186 @@
+# Dynamic micro-batching in front of the chatbot model.
+# Concurrent requests are queued, collected over a short time window
+# and answered with a single batched forward pass.
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+from .metrics import METRICS, SIZE_BUCKETS
+
+# Sentinel used to stop the worker thread
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects single-text prediction requests and runs them in batches.
+
+    - A batch is dispatched when `max_batch_size` requests are waiting
+      or `max_wait_ms` has passed since the first one arrived
+    - Each caller gets a Future resolved with its own result dict
+    - Both knobs can be changed at runtime; stats() exposes counters
+      for batch sizes and queue wait times
+    - With a `pool` (concurrent.futures executor), batches run on its
+      threads so the next batch is collected while one is computing
+    """
+    def __init__(self, bot, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 pool=None):
+        self.bot = bot
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.pool = pool
+
+        self._init_process_state()
+        self.reset_stats()
+
+    def _init_process_state(self):
+        # Threads and locks don't survive fork(); each process gets its own
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        """Start the background worker thread (idempotent, fork-aware)."""
+        if self._pid != os.getpid():
+            self._init_process_state()
+            self.reset_stats()
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the worker after the already queued requests are served."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join(timeout)
+            self._thread = None
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit(self, text: str) -> Future:
+        """Queue a text for prediction and return a Future for its result."""
+        if self._thread is None or self._pid != os.getpid():
+            self.start()
+        fut = Future()
+        self._queue.put((text, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, text: str, timeout: float = None) -> dict:
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(text).result(timeout)
+
+    def stats(self) -> dict:
+        """Snapshot of batching counters and current settings."""
+        with self._stats_lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queue_depth": self._queue.qsize(),
+                "requests": requests,
+                "batches": batches,
+                "errors": self._errors,
+                "avg_batch_size": requests / batches if batches else 0.0,
+                "max_batch_size_seen": self._max_batch,
+                "batch_size_hist": dict(sorted(self._size_hist.items())),
+                "avg_queue_wait_ms": self._wait_total * 1000 / requests if requests else 0.0,
+                "max_queue_wait_ms": self._wait_max * 1000,
+                "avg_forward_ms": self._forward_total * 1000 / batches if batches else 0.0,
+            }
+
+    def reset_stats(self):
+        """Reset all counters (settings are kept)."""
+        with self._stats_lock:
+            self._requests = 0
+            self._batches = 0
+            self._errors = 0
+            self._max_batch = 0
+            self._size_hist = {}
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self._forward_total = 0.0
+
+    # -----------------------------
+    # Worker
+    # -----------------------------
+    def _collect(self):
+        """
+        Block for the first request, then keep collecting until the
+        batch is full or the wait window of the first request expires.
+        Returns (batch, stop_requested).
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = first[2] + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                if self.pool is not None:
+                    self.pool.submit(self._dispatch, batch)
+                else:
+                    self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch):
+        dispatched = time.perf_counter()
+        texts = [text for text, _, _ in batch]
+        try:
+            results = self.bot.predict_batch(texts, batch_size=len(texts))
+            error = None
+        except Exception as exc:
+            results = [None] * len(batch)
+            error = exc
+        forward = time.perf_counter() - dispatched
+
+        with self._stats_lock:
+            n = len(batch)
+            self._requests += n
+            self._batches += 1
+            self._max_batch = max(self._max_batch, n)
+            self._size_hist[n] = self._size_hist.get(n, 0) + 1
+            self._forward_total += forward
+            for _, _, enqueued in batch:
+                wait = dispatched - enqueued
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+            if error is not None:
+                self._errors += n
+
+        METRICS.observe("batch_size", n, buckets=SIZE_BUCKETS, help="Requests per batched forward pass")
+        for _, _, enqueued in batch:
+            METRICS.observe_stage("queue_wait", dispatched - enqueued)
+
+        for (_, fut, _), result in zip(batch, results):
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
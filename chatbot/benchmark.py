@@ -0,0 +1,284 @@
+# Reproducible inference benchmark for the chatbot.
+# Builds synthetic workloads with data_generator, times each pipeline
+# stage separately (normalization, tokenization, entity extraction,
+# single and batched prediction) and writes a machine-readable JSON
+# report that can be compared across commits. --cold-start also times
+# fresh processes importing the model stack and loading the weights.
+#
+# Usage:
+#   python -m chatbot.benchmark --samples 2000 --out bench.json
+#   python -m chatbot.benchmark --cold-start models/chatbot.pt models/chatbot
+#   python -m chatbot.benchmark --compare bench_old.json --out bench_new.json
+
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import torch
+
+from .chatbot_core import chatbot, normalize_fa, extract_entities
+from .data_generator import generate_dataset
+
+
+# -----------------------------
+# Workload & statistics helpers
+# -----------------------------
+def build_workload(samples: int, min_words: int = None, max_words: int = None, seed: int = 42) -> list:
+    """
+    Return `samples` synthetic messages.
+    If min_words/max_words are given, every message is cut or extended
+    (with words from other messages) to a uniformly drawn word count.
+    """
+    rng = random.Random(seed)
+    per_intent = max(1, -(-samples // 4))
+    texts = [row[0] for row in generate_dataset(total_per_intent=per_intent, seed=seed)][:samples]
+    if min_words is None and max_words is None:
+        return texts
+
+    lo = min_words or 1
+    hi = max(max_words or lo, lo)
+    pool = [w for t in texts for w in t.split()]
+    shaped = []
+    for t in texts:
+        words = t.split()
+        target = rng.randint(lo, hi)
+        while len(words) < target:
+            words.append(rng.choice(pool))
+        shaped.append(" ".join(words[:target]))
+    return shaped
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(latencies: list, items: int, wall: float) -> dict:
+    """Latency percentiles (ms per call) and throughput (items/sec)."""
+    lat = sorted(latencies)
+    return {
+        "calls": len(lat),
+        "items": items,
+        "mean_ms": sum(lat) / len(lat) * 1000 if lat else 0.0,
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p95_ms": percentile(lat, 95) * 1000,
+        "p99_ms": percentile(lat, 99) * 1000,
+        "max_ms": lat[-1] * 1000 if lat else 0.0,
+        "items_per_sec": items / wall if wall > 0 else 0.0,
+    }
+
+
+def time_calls(fn, inputs: list, items_per_call: int = 1, warmup: int = 10) -> dict:
+    """Call fn once per input and summarize per-call latency."""
+    for x in inputs[:warmup]:
+        fn(x)
+    latencies = []
+    start = time.perf_counter()
+    for x in inputs:
+        t0 = time.perf_counter()
+        fn(x)
+        latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - start
+    items = sum(len(x) for x in inputs) if items_per_call is None else len(inputs) * items_per_call
+    return summarize(latencies, items, wall)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Run in a fresh interpreter: import + load, reported as JSON on stdout
+_COLD_START_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+from chatbot.chatbot_core import chatbot
+t1 = time.perf_counter()
+chatbot.load_models(model_path=sys.argv[1] or None)
+t2 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "load_s": t2 - t1, "total_s": t2 - t0, "load": chatbot.load_timings}))
+"""
+
+
+def measure_cold_start(model_path: str = None, runs: int = 3) -> dict:
+    """
+    Median import/load/total seconds over `runs` fresh processes
+    loading `model_path` (None: the default checkpoint).
+    """
+    samples = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", _COLD_START_SCRIPT, model_path or ""], text=True)
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    result = {key: percentile(sorted(s[key] for s in samples), 50) for key in ("import_s", "load_s", "total_s")}
+    result.update({"runs": runs, "path": samples[-1]["load"]["path"], "format": samples[-1]["load"]["format"]})
+    return result
+
+
+# -----------------------------
+# Benchmark runner
+# -----------------------------
+def run_benchmark(samples: int = 2000, min_words: int = None, max_words: int = None,
+                  batch_sizes=(1, 8, 32, 64), seed: int = 42, use_cache: bool = False,
+                  rule_threshold: float = None) -> dict:
+    """
+    Run all stage benchmarks and return the report dict.
+    The model tier is measured alone unless `rule_threshold` enables the
+    rule tier (its hits skip the model, so the timings are not comparable).
+    """
+    if chatbot.model is None:
+        chatbot.load_models()
+
+    # Measure compute, not cache hits, unless asked otherwise
+    saved_cache, saved_threshold = chatbot.cache, chatbot.rule_threshold
+    if not use_cache:
+        chatbot.cache = None
+    chatbot.rule_threshold = rule_threshold
+
+    texts = build_workload(samples, min_words, max_words, seed)
+    normalized = [normalize_fa(t) for t in texts]
+    tokenizer, max_len = chatbot.tokenizer, chatbot.max_len
+
+    try:
+        stages = {
+            "normalize": time_calls(normalize_fa, texts),
+            "tokenize": time_calls(lambda t: tokenizer.encode(t, max_len, normalized=True), normalized),
+            "entities": time_calls(lambda t: extract_entities(t, normalized=True), normalized),
+            "predict": time_calls(chatbot.predict, texts),
+        }
+        for bs in batch_sizes:
+            norm_batches = [normalized[i:i + bs] for i in range(0, len(normalized), bs)]
+            stages[f"tokenize_batch_{bs}"] = time_calls(
+                lambda b: tokenizer.encode_batch(b, max_len), norm_batches, items_per_call=None, warmup=2
+            )
+        for bs in batch_sizes:
+            batches = [texts[i:i + bs] for i in range(0, len(texts), bs)]
+            stages[f"predict_batch_{bs}"] = time_calls(
+                lambda b, bs=bs: chatbot.predict_batch(b, batch_size=bs), batches,
+                items_per_call=None, warmup=2
+            )
+    finally:
+        chatbot.cache, chatbot.rule_threshold = saved_cache, saved_threshold
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "torch_threads": torch.get_num_threads(),
+        "torch_interop_threads": torch.get_num_interop_threads(),
+        "workload": {
+            "samples": len(texts),
+            "min_words": min_words,
+            "max_words": max_words,
+            "mean_words": sum(len(t.split()) for t in texts) / max(1, len(texts)),
+            "seed": seed,
+            "cache": use_cache,
+            "rule_threshold": rule_threshold,
+            "variable_length": chatbot.variable_length,
+        },
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare_reports(old: dict, new: dict, tolerance: float = 0.10) -> list:
+    """
+    Compare p99 latency and throughput per stage.
+    Returns a list of regression descriptions beyond `tolerance`.
+    """
+    regressions = []
+    for stage, cur in new["stages"].items():
+        prev = old.get("stages", {}).get(stage)
+        if prev is None:
+            continue
+        if prev["p99_ms"] > 0 and cur["p99_ms"] > prev["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{stage}: p99 {prev['p99_ms']:.3f}ms -> {cur['p99_ms']:.3f}ms")
+        if cur["items_per_sec"] < prev["items_per_sec"] * (1 - tolerance):
+            regressions.append(f"{stage}: throughput {prev['items_per_sec']:.1f}/s -> {cur['items_per_sec']:.1f}/s")
+    return regressions
+
+
+def print_report(report: dict):
+    print("===================================")
+    print(f"✅ Benchmark ({report['workload']['samples']} samples, "
+          f"torch threads={report['torch_threads']}, commit={report['commit']})")
+    print("===================================")
+    print(f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<20}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['items_per_sec']:>12.1f}")
+    print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    for c in report.get("cold_start", []):
+        print(f"Cold start [{c['format']}] {c['path']}: import {c['import_s'] * 1000:.0f}ms, "
+              f"load {c['load_s'] * 1000:.0f}ms, total {c['total_s'] * 1000:.0f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chatbot inference benchmark")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--min-words", type=int, default=None)
+    parser.add_argument("--max-words", type=int, default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache enabled")
+    parser.add_argument("--rules", type=float, default=None, metavar="THRESHOLD",
+                        help="enable the rule tier at this confidence (default: model only)")
+    parser.add_argument("--cold-start", nargs="*", default=None, metavar="CHECKPOINT",
+                        help="also time fresh-process model loading (default checkpoint if none given)")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--compare", default=None, help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    report = run_benchmark(args.samples, args.min_words, args.max_words, args.batch_sizes,
+                           args.seed, use_cache=args.cache, rule_threshold=args.rules)
+    if args.cold_start is not None:
+        report["cold_start"] = [measure_cold_start(path) for path in (args.cold_start or [None])]
+    print_report(report)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Report saved to: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        if old.get("workload", {}).get("rule_threshold") != args.rules:
+            print("⚠️ Reports measure different rule tier settings; stage timings are not comparable")
+        regressions = compare_reports(old, report, args.tolerance)
+        for r in regressions:
+            print(f"⚠️ Regression: {r}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,33 +5,36 @@
 # - Response generation
 # - Model loading and inference
 
+import os
+import time
 import torch
-import re
+import threading
+from collections import namedtuple
 from pathlib import Path
 
-from .model import ChatbotModel
-from .tokenizer import Tokenizer
-from .config import DEVICE, MODEL_PATH, MAX_LEN, INTENTS, SENTIMENTS
+from .model import build_model
+from .normalizer import normalize_fa
+from .keyword_matcher import KeywordMatcher
+from .tokenizer import tokenizer_from_checkpoint
+from .checkpoint import WEIGHTS_NAME, is_flat_checkpoint, load_flat_checkpoint
+from .cache import PredictionCache
+from .optimize import optimize_model, compare_models
+from .rules import RuleClassifier
+from .metrics import METRICS
+from .config import (
+    DEVICE, MODEL_PATH, MODEL_DIR, MAX_LEN, BATCH_SIZE, VARIABLE_LENGTH,
+    CACHE_SIZE, CACHE_TTL, QUANTIZE, TORCHSCRIPT, MMAP_WEIGHTS,
+    RULE_CONFIDENCE, RULE_SHADOW_EVERY, RELOAD_POLL_SECONDS, INTENTS, SENTIMENTS,
+    PROFILE_CALLS, PROFILE_DIR, PROFILE_TIMEOUT
+)
 
 
 # -----------------------------
 # 1) Text Normalization Utilities
 # -----------------------------
-def normalize_fa(text: str) -> str:
-    """
-    Normalize Persian text by:
-    - Stripping leading/trailing spaces
-    - Unifying Arabic/Persian characters
-    - Collapsing multiple spaces
-    """
-    if not text:
-        return ""
-    text = text.strip()
-    # Unify Arabic and Persian characters
-    text = text.replace("ي", "ی").replace("ك", "ک")
-    # Remove extra whitespaces
-    text = re.sub(r"\s+", " ", text)
-    return text
+# normalize_fa lives in .normalizer (precompiled, single pass) and is
+# re-exported here. Functions below accept `normalized=True` when the
+# caller already normalized the text, so a message is normalized once.
 
 
 # -----------------------------
@@ -53,38 +56,41 @@ DATE_WORDS = [
 PRIORITY_HIGH = ["سریع", "فوری", "اضطراری", "زود", "همین الان"]
 
 
-def extract_entities(text: str) -> dict:
+# Compiled once at import: one pass over the text finds all keywords
+ENTITY_MATCHER = (
+    KeywordMatcher()
+    .add_all(FACILITIES, "facility")
+    .add_all(DATE_WORDS, "date")
+    .add_all(PRIORITY_HIGH, "priority")
+    .build()
+)
+
+
+def extract_entities(text: str, normalized: bool = False) -> dict:
     """
     Extract basic entities (facility, date, priority)
     using keyword matching on normalized text.
+    Overlapping keywords resolve to the longest match
+    (e.g. "روف گاردن" rather than "روف").
     """
-    text_n = normalize_fa(text)
+    text_n = text if normalized else normalize_fa(text)
     ents = {}
 
+    found = {"facility": [], "date": [], "priority": []}
+    for m in ENTITY_MATCHER.find(text_n):
+        found[m.label].append(m.keyword)
+
     # Facility extraction
-    fac = []
-    for f in FACILITIES:
-        if f in text_n:
-            fac.append(f)
-    if fac:
-        ents["facility"] = list(dict.fromkeys(fac))
+    if found["facility"]:
+        ents["facility"] = list(dict.fromkeys(found["facility"]))
 
     # Date extraction
-    dates = []
-    for d in DATE_WORDS:
-        if d in text_n:
-            dates.append(d)
-    if dates:
-        ents["date"] = list(dict.fromkeys(dates))
+    if found["date"]:
+        ents["date"] = list(dict.fromkeys(found["date"]))
 
     # Priority detection (binary: high)
-    pri = []
-    for p in PRIORITY_HIGH:
-        if p in text_n:
-            pri.append("high")
-            break
-    if pri:
-        ents["priority"] = pri
+    if found["priority"]:
+        ents["priority"] = ["high"]
 
     return ents
 
@@ -103,28 +109,31 @@ THANKS = [
 ]
 
 
-def is_greeting(text: str) -> bool:
+def is_greeting(text: str, normalized: bool = False) -> bool:
     """Check whether input text is a greeting."""
-    t = normalize_fa(text).lower()
+    t = text if normalized else normalize_fa(text)
     return any(g in t for g in GREETINGS)
 
 
-def is_thanks(text: str) -> bool:
+def is_thanks(text: str, normalized: bool = False) -> bool:
     """Check whether input text expresses gratitude."""
-    t = normalize_fa(text).lower()
+    t = text if normalized else normalize_fa(text)
     return any(w in t for w in THANKS)
 
 
-def generate_response(intent: str, sentiment: str, entities: dict, text: str) -> str:
+def generate_response(intent: str, sentiment: str, entities: dict, text: str, normalized: bool = False) -> str:
     """
     Generate a professional, user-friendly response
     based on intent, sentiment, and extracted entities.
     """
+    if not normalized:
+        text = normalize_fa(text)
+
     # Greeting / Thanks take priority over model prediction
-    if is_greeting(text):
+    if is_greeting(text, normalized=True):
         return "سلام 😊 من پشتیبان هوشمند سیستم مجتمع هستم. مشکل یا درخواستت رو بگو تا سریع راهنماییت کنم."
 
-    if is_thanks(text):
+    if is_thanks(text, normalized=True):
         return "خواهش می‌کنم 🌿 اگر باز هم کاری داشتی در خدمتم."
 
     # Support issue handling
@@ -159,37 +168,363 @@ def generate_response(intent: str, sentiment: str, entities: dict, text: str) ->
 # -----------------------------
 # 4) Main Chatbot Interface Class
 # -----------------------------
+# Everything one loaded checkpoint consists of. Chatbot swaps the whole
+# bundle at once, so a prediction never mixes a new model with an old
+# tokenizer, and calls already running keep the bundle they started with.
+ModelBundle = namedtuple("ModelBundle", [
+    "model", "tokenizer", "max_len", "variable_length", "version",
+    "optimization_report", "load_timings",
+])
+
+
+def default_model_path() -> str:
+    """
+    config.MODEL_DIR if its weights are at least as new as MODEL_PATH,
+    else MODEL_PATH (e.g. a .pt replaced without re-exporting the flat copy).
+    """
+    if not is_flat_checkpoint(MODEL_DIR):
+        return MODEL_PATH
+    try:
+        pt_mtime = os.stat(MODEL_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return MODEL_DIR
+    if os.stat(os.path.join(MODEL_DIR, WEIGHTS_NAME)).st_mtime_ns >= pt_mtime:
+        return MODEL_DIR
+    print(f"⚠️ {MODEL_PATH} is newer than the flat checkpoint {MODEL_DIR}, loading {MODEL_PATH} "
+          f"(re-export with: python -m chatbot.checkpoint {MODEL_PATH})")
+    return MODEL_PATH
+
+
+def _is_default_path(path) -> bool:
+    return os.path.realpath(path) in (os.path.realpath(MODEL_PATH), os.path.realpath(MODEL_DIR))
+
+
 class Chatbot:
     """
     High-level chatbot interface:
     - Loads trained model and tokenizer
     - Runs inference
     - Produces structured prediction results
+    - Caches results of repeated messages (cache_size=0 disables it)
+    - Classifies obvious messages with a keyword rule tier when its
+      confidence reaches `rule_threshold` (None disables the tier)
     """
-    def __init__(self):
-        self.model = None
-        self.tokenizer = None
-        self.max_len = MAX_LEN
+    def __init__(self, cache_size: int = CACHE_SIZE, cache_ttl: float = CACHE_TTL,
+                 rule_threshold: float = RULE_CONFIDENCE, shadow_every: int = RULE_SHADOW_EVERY):
+        # Served model, tokenizer and settings, swapped as one object
+        self._bundle = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.reload_stats = {"reloads": 0, "failures": 0, "last_error": None, "last_reload": None}
+        # Open profiling window (chatbot.profiler) and the most recent one
+        self._profile = None
+        self._profile_lock = threading.Lock()
+        self.last_profile = None
+        self.cache = PredictionCache(cache_size, cache_ttl) if cache_size else None
+
+        # Rule tier; every `shadow_every`-th rule hit is also run through
+        # the model to measure agreement (0 disables shadow checks)
+        self.rules = RuleClassifier()
+        self.rule_threshold = rule_threshold
+        self.shadow_every = shadow_every
+        self._tier_lock = threading.Lock()
+        self.reset_tier_stats()
+
+    # Read-only views of the served bundle
+    @property
+    def model(self):
+        return self._bundle.model if self._bundle is not None else None
+
+    @property
+    def tokenizer(self):
+        return self._bundle.tokenizer if self._bundle is not None else None
+
+    @property
+    def max_len(self) -> int:
+        return self._bundle.max_len if self._bundle is not None else MAX_LEN
+
+    @property
+    def variable_length(self) -> bool:
+        return self._bundle.variable_length if self._bundle is not None else VARIABLE_LENGTH
+
+    @property
+    def model_version(self):
+        # Identity of the loaded checkpoint, part of every cache key
+        return self._bundle.version if self._bundle is not None else None
+
+    @property
+    def optimization_report(self):
+        # Agreement of an optimized model with its fp32 checkpoint
+        return self._bundle.optimization_report if self._bundle is not None else None
+
+    @property
+    def load_timings(self):
+        # Seconds spent loading the served checkpoint, per step
+        return self._bundle.load_timings if self._bundle is not None else None
+
+    def _require_bundle(self):
+        bundle = self._bundle
+        if bundle is None:
+            raise RuntimeError("Models not loaded. Please run load_models() first.")
+        return bundle
 
-    def load_models(self):
+    def load_models(self, quantize: bool = QUANTIZE, torchscript: bool = TORCHSCRIPT, verify: bool = True,
+                    mmap: bool = MMAP_WEIGHTS, model_path: str = None):
         """
         Load trained model checkpoint and tokenizer vocabulary.
+
+        Optional CPU inference optimizations:
+        - quantize: int8 dynamic quantization of GRU/Linear layers
+        - torchscript: TorchScript-compiled, frozen model
+        - verify: compare the optimized model with the fp32 checkpoint
+          on the presentation test samples and store the report
+        - mmap: memory-map the checkpoint and use its tensors as the model
+          weights, so processes loading the same file share the pages
+        - model_path: a .pt checkpoint or a flat checkpoint directory
+          (defaults to config.MODEL_DIR unless MODEL_PATH is newer)
         """
-        model_path = Path(MODEL_PATH)
+        bundle = self._load_bundle(quantize, torchscript, verify, mmap, model_path)
+        self._swap(bundle)
+        print(f"✅ Models loaded successfully ({bundle.load_timings['path']}, "
+              f"{bundle.load_timings['total_s'] * 1000:.0f}ms)")
+
+    def _load_bundle(self, quantize, torchscript, verify, mmap, model_path) -> "ModelBundle":
+        """Load a checkpoint into a new ModelBundle without touching the served one."""
+        t0 = time.perf_counter()
+        if model_path is None:
+            model_path = default_model_path()
+        model_path = Path(model_path)
         if not model_path.exists():
-            raise FileNotFoundError(f"⚠️ Model file not found at {MODEL_PATH}. Train first.")
+            raise FileNotFoundError(f"⚠️ Model file not found at {model_path}. Train first.")
+
+        mmap = mmap and DEVICE.type == "cpu"
+        flat = model_path.is_dir()
+        if flat:
+            # Flat format: tensors are views on the mapped file, no unpickling
+            checkpoint = load_flat_checkpoint(model_path, mmap_weights=mmap,
+                                              device=None if mmap else DEVICE)
+        else:
+            checkpoint = torch.load(model_path, map_location=DEVICE, mmap=mmap, weights_only=False)
+        t_read = time.perf_counter()
+
+        tokenizer = tokenizer_from_checkpoint(checkpoint)
+
+        # Architecture and sizes are stored by the trainer (distilled
+        # students use "compact"); older checkpoints are the GRU model
+        # with config.py sizes
+        arch = checkpoint.get("arch", "gru")
+        model_config = checkpoint.get("model_config", {})
+        if mmap:
+            # Build on the meta device (no random init, no allocation) and
+            # assign the memory-mapped tensors as the model weights
+            with torch.device("meta"):
+                model = build_model(arch, tokenizer.vocab_size, **model_config)
+            model.load_state_dict(checkpoint["model_state"], assign=True)
+        else:
+            model = build_model(arch, tokenizer.vocab_size, **model_config).to(DEVICE)
+            model.load_state_dict(checkpoint["model_state"])
+        model.eval()
+        t_build = time.perf_counter()
+
+        max_len = checkpoint.get("max_len", MAX_LEN)
+        # Checkpoints trained on padded sequences keep padded inference
+        variable_length = checkpoint.get("variable_length", False) and VARIABLE_LENGTH
+
+        optimization_report = None
+        if quantize or torchscript:
+            reference = model
+            model = optimize_model(reference, quantize=quantize, torchscript=torchscript)
+            if verify:
+                from .test import TEST_SAMPLES
+                optimization_report = compare_models(
+                    reference, model, tokenizer, TEST_SAMPLES, max_len, variable_length
+                )
+                report = optimization_report
+                print(f"✅ Optimized model (quantize={quantize}, torchscript={torchscript}): "
+                      f"intent agreement {report['intent_agreement']:.2%}, "
+                      f"sentiment agreement {report['sentiment_agreement']:.2%}, "
+                      f"max prob diff {report['max_prob_diff']:.4f}, "
+                      f"size {report['reference_bytes'] / 1e6:.2f}MB -> {report['optimized_bytes'] / 1e6:.2f}MB")
+            # Drop the fp32 weights; only the optimized model is served
+            del reference
+
+        # Checkpoint identity, part of every cache key: new weights (or a
+        # different optimization) never hit cached predictions
+        stat = (model_path / WEIGHTS_NAME if flat else model_path).stat()
+        version = (f"{model_path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+                   f":q={int(quantize)}:ts={int(torchscript)}")
+
+        t_end = time.perf_counter()
+        load_timings = {
+            "path": str(model_path),
+            "format": "flat" if flat else "pickle",
+            "mmap": mmap,
+            "read_s": t_read - t0,
+            "build_s": t_build - t_read,
+            "optimize_s": t_end - t_build,
+            "total_s": t_end - t0,
+        }
+        return ModelBundle(model, tokenizer, max_len, variable_length, version,
+                           optimization_report, load_timings)
+
+    def _swap(self, bundle):
+        """Atomically replace the served bundle; in-flight calls keep the old one."""
+        self._bundle = bundle
+        self.invalidate_cache()
+
+    # -----------------------------
+    # Hot reload
+    # -----------------------------
+    def reload(self, model_path: str = None, warmup: bool = True, **load_kwargs) -> dict:
+        """
+        Load a checkpoint next to the served model, warm it up and swap it in.
+
+        - Predictions keep running on the current model while loading;
+          calls that already started finish on the model they started with
+        - model_path defaults to the path of the currently served checkpoint;
+          for the configured checkpoint, the newer of MODEL_DIR and
+          MODEL_PATH (see default_model_path())
+        - Reloads are serialized; a failed load keeps the current model
+          and re-raises the error
+        Returns a report with the new version and load/warm-up timings.
+        """
+        with self._reload_lock:
+            current = self._bundle
+            if model_path is None and current is not None:
+                model_path = current.load_timings["path"]
+                if _is_default_path(model_path):
+                    model_path = default_model_path()
+            try:
+                bundle = self._load_bundle(load_kwargs.get("quantize", QUANTIZE),
+                                           load_kwargs.get("torchscript", TORCHSCRIPT),
+                                           load_kwargs.get("verify", True),
+                                           load_kwargs.get("mmap", MMAP_WEIGHTS), model_path)
+                warmup_s = self._warmup(bundle) if warmup else 0.0
+            except Exception as e:
+                self.reload_stats["failures"] += 1
+                self.reload_stats["last_error"] = repr(e)
+                raise
+
+            self._swap(bundle)
+            report = {
+                "version": bundle.version,
+                "previous_version": current.version if current is not None else None,
+                "load": bundle.load_timings,
+                "warmup_s": warmup_s,
+            }
+            self.reload_stats["reloads"] += 1
+            self.reload_stats["last_error"] = None
+            self.reload_stats["last_reload"] = report
+        print(f"✅ Model reloaded ({bundle.load_timings['path']}, "
+              f"load {bundle.load_timings['total_s'] * 1000:.0f}ms, warm-up {warmup_s * 1000:.0f}ms)")
+        return report
+
+    def _warmup(self, bundle, rounds: int = 3) -> float:
+        """
+        Run a few single and batched forward passes on a freshly loaded
+        bundle so lazy allocations and first-call overhead happen before
+        it serves traffic. Returns the seconds spent.
+        """
+        from .test import TEST_SAMPLES
 
-        checkpoint = torch.load(MODEL_PATH, map_location=DEVICE)
+        start = time.perf_counter()
+        texts = [bundle.tokenizer.model_text(t, normalize_fa(t)) for t in TEST_SAMPLES]
+        X, L = bundle.tokenizer.encode_batch(texts, bundle.max_len, trim=bundle.variable_length)
+        lens = L.clamp(min=1) if bundle.variable_length else None
+        with torch.no_grad():
+            for _ in range(rounds):
+                bundle.model(X.to(DEVICE), lens)
+                for i in range(min(4, len(texts))):
+                    width = max(int(L[i]), 1) if bundle.variable_length else bundle.max_len
+                    bundle.model(X[i:i + 1, :width].to(DEVICE))
+        return time.perf_counter() - start
+
+    def watch(self, model_path: str = None, interval: float = RELOAD_POLL_SECONDS):
+        """
+        Reload automatically when the checkpoint file changes.
+
+        A background thread polls the size and mtime of `model_path`
+        (default: the served checkpoint) every `interval` seconds and
+        reloads once a change has stayed stable for one more poll, so a
+        checkpoint that is still being written is not picked up.
+        When the configured checkpoint is served, both MODEL_PATH and
+        MODEL_DIR are watched and the newer one is loaded.
+        """
+        self.stop_watching()
+        stop = threading.Event()
+
+        def targets():
+            if model_path is None and _is_default_path(self._bundle.load_timings["path"]):
+                return [Path(MODEL_PATH), Path(MODEL_DIR) / WEIGHTS_NAME]
+            path = Path(model_path or self._bundle.load_timings["path"])
+            return [path / WEIGHTS_NAME if path.is_dir() else path]
+
+        def signature():
+            stats = []
+            for target in targets():
+                try:
+                    stat = target.stat()
+                except FileNotFoundError:
+                    stats.append(None)
+                    continue
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            return None if not any(stats) else tuple(stats)
+
+        def run():
+            served = signature()
+            pending = None
+            while not stop.wait(interval):
+                current = signature()
+                if current is None or current == served:
+                    pending = None
+                    continue
+                if current != pending:
+                    # Changed since the last poll: wait until it settles
+                    pending = current
+                    continue
+                try:
+                    self.reload(model_path)
+                except Exception as e:
+                    print(f"⚠️ Hot reload failed, keeping the current model: {e!r}")
+                served, pending = current, None
+
+        thread = threading.Thread(target=run, name="model-watcher", daemon=True)
+        self._watcher = (thread, stop)
+        thread.start()
+
+    def stop_watching(self):
+        """Stop the checkpoint watcher started by watch(), if any."""
+        if self._watcher is not None:
+            thread, stop = self._watcher
+            stop.set()
+            thread.join()
+            self._watcher = None
+
+    def start_profile(self, calls: int = PROFILE_CALLS, out_dir: str = PROFILE_DIR,
+                      timeout: float = PROFILE_TIMEOUT, **kwargs):
+        """
+        Profile the next `calls` predict()/predict_batch() calls with
+        torch.profiler and Python stack sampling (see chatbot.profiler).
+        Returns the ProfileCapture; its files are written when it closes.
+        """
+        from .profiler import ProfileCapture
 
-        self.model = ChatbotModel(vocab_size=len(checkpoint["vocab"])).to(DEVICE)
-        self.model.load_state_dict(checkpoint["model_state"])
-        self.model.eval()
+        with self._profile_lock:
+            if self._profile is not None:
+                raise RuntimeError("A profiling window is already open.")
+            capture = ProfileCapture(self, calls, out_dir, timeout=timeout, **kwargs).start()
+            self._profile = capture
+            self.last_profile = capture
+        return capture
 
-        self.tokenizer = Tokenizer()
-        self.tokenizer.word2idx = checkpoint["vocab"]
-        self.max_len = checkpoint.get("max_len", MAX_LEN)
+    def _detach_profile(self, capture):
+        with self._profile_lock:
+            if self._profile is capture:
+                self._profile = None
 
-        print("✅ Models loaded successfully")
+    def profile_status(self):
+        """Status of the open or most recent profiling window (None if never started)."""
+        return self.last_profile.status() if self.last_profile is not None else None
 
     def predict(self, text: str) -> dict:
         """
@@ -200,41 +535,268 @@ class Chatbot:
         - extracted entities
         - generated response
         """
-        text = normalize_fa(text)
-
-        if self.model is None or self.tokenizer is None:
-            raise RuntimeError("Models not loaded. Please run load_models() first.")
+        capture = self._profile
+        if capture is not None:
+            return capture.call(self._predict, text)
+        return self._predict(text)
+
+    def _predict(self, text: str) -> dict:
+        raw = text
+        with METRICS.stage("normalize"):
+            text = normalize_fa(text)
+        # One bundle for the whole call, even if a reload swaps it meanwhile
+        bundle = self._require_bundle()
+
+        cached = self._cache_get(text, bundle)
+        if cached is not None:
+            return cached
 
         # Handle greeting explicitly to avoid misclassification
-        if is_greeting(text):
-            return {
-                "intent": "greeting",
-                "sentiment": "neutral",
-                "intent_prob": [1.0, 0.0, 0.0, 0.0],
-                "sentiment_prob": [0.0, 1.0, 0.0],
-                "entities": {},
-                "response_text": generate_response("greeting", "neutral", {}, text)
-            }
+        if is_greeting(text, normalized=True):
+            self._count_tier("greeting")
+            return self._cache_put(text, self._greeting_result(text), bundle)
 
-        x = torch.tensor(
-            [self.tokenizer.encode(text, self.max_len)],
-            dtype=torch.long
-        ).to(DEVICE)
+        # Cheap rule tier first; the model only sees unclear messages
+        rule, shadow = self._rule_tier(text)
+        if rule is not None and not shadow:
+            return self._cache_put(text, self._build_result(text, *rule), bundle)
 
-        with torch.no_grad():
-            intent_logits, sent_logits, _ = self.model(x)
+        intent_prob, sent_prob = self._forward_one(bundle.tokenizer.model_text(raw, text), bundle)
+        if rule is not None:
+            self._record_shadow(rule, intent_prob, sent_prob)
+            return self._cache_put(text, self._build_result(text, *rule), bundle)
+
+        self._count_tier("model")
+        return self._cache_put(text, self._build_result(text, intent_prob, sent_prob), bundle)
+
+    def predict_batch(self, texts, batch_size: int = BATCH_SIZE) -> list:
+        """
+        Run inference on a list of texts and return one result dict
+        per input, in input order (same format as predict()).
+
+        - Greetings and confident rule-tier hits are short-circuited per item
+        - Remaining texts are encoded together and run through the model
+          in chunks of `batch_size`, one forward pass per chunk
+        - In variable-length mode texts are grouped by token length so
+          each chunk is only padded up to its own longest message
+        """
+        capture = self._profile
+        if capture is not None:
+            return capture.call(self._predict_batch, texts, batch_size)
+        return self._predict_batch(texts, batch_size)
+
+    def _predict_batch(self, texts, batch_size: int) -> list:
+        bundle = self._require_bundle()
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+
+        texts = list(texts)
+        with METRICS.stage("normalize"):
+            norm_texts = [normalize_fa(t) for t in texts]
+        results = [None] * len(norm_texts)
+
+        # Cache hits, greetings and rule hits never reach the model
+        # (except rule hits sampled for the agreement check)
+        pending = []
+        shadowed = {}
+        for i, text in enumerate(norm_texts):
+            cached = self._cache_get(text, bundle)
+            if cached is not None:
+                results[i] = cached
+                continue
+            if is_greeting(text, normalized=True):
+                self._count_tier("greeting")
+                results[i] = self._cache_put(text, self._greeting_result(text), bundle)
+                continue
+            rule, shadow = self._rule_tier(text)
+            if rule is not None:
+                results[i] = self._cache_put(text, self._build_result(text, *rule), bundle)
+                if shadow:
+                    shadowed[i] = rule
+                    pending.append(i)
+            else:
+                pending.append(i)
+
+        if not pending:
+            return results
+
+        # One batch encode into a [P, T] buffer; rows follow `pending`
+        with METRICS.stage("tokenize"):
+            X, L = bundle.tokenizer.encode_batch([bundle.tokenizer.model_text(texts[i], norm_texts[i])
+                                                  for i in pending], bundle.max_len, trim=bundle.variable_length)
+        rows = list(range(len(pending)))
+        if bundle.variable_length:
+            # Length bucketing: neighbours in a chunk have similar lengths
+            lengths = L.tolist()
+            rows.sort(key=lengths.__getitem__)
+
+        for start in range(0, len(rows), batch_size):
+            chunk_rows = rows[start:start + batch_size]
+            chunk = [pending[r] for r in chunk_rows]
+            index = torch.tensor(chunk_rows, dtype=torch.long)
+
+            if bundle.variable_length:
+                lens = L[index].clamp(min=1)
+                x = X[index, :int(lens.max())].to(DEVICE)
+            else:
+                x = X[index].to(DEVICE)
+                lens = None
+
+            with METRICS.stage("forward"), torch.no_grad():
+                intent_logits, sent_logits, _ = bundle.model(x, lens)
+
+            # Single device->host transfer per chunk
+            with METRICS.stage("postprocess"):
+                intent_probs = torch.softmax(intent_logits, dim=1).cpu().tolist()
+                sent_probs = torch.softmax(sent_logits, dim=1).cpu().tolist()
+
+            for i, intent_prob, sent_prob in zip(chunk, intent_probs, sent_probs):
+                if i in shadowed:
+                    self._record_shadow(shadowed[i], intent_prob, sent_prob)
+                    continue
+                self._count_tier("model")
+                results[i] = self._cache_put(norm_texts[i], self._build_result(norm_texts[i], intent_prob, sent_prob),
+                                             bundle)
+
+        return results
+
+    def _forward_one(self, text: str, bundle):
+        """Model class probabilities (intent, sentiment) for one normalized text."""
+        with METRICS.stage("tokenize"):
+            ids, length = bundle.tokenizer.encode(text, bundle.max_len, return_length=True, normalized=True)
+            if bundle.variable_length:
+                # A single sequence needs no padding at all
+                ids = ids[:max(length, 1)]
+            x = torch.tensor([ids], dtype=torch.long).to(DEVICE)
+
+        with METRICS.stage("forward"), torch.no_grad():
+            intent_logits, sent_logits, _ = bundle.model(x)
+
+        with METRICS.stage("postprocess"):
+            intent_prob = torch.softmax(intent_logits, dim=1)[0].cpu().tolist()
+            sent_prob = torch.softmax(sent_logits, dim=1)[0].cpu().tolist()
+        return intent_prob, sent_prob
+
+    # -----------------------------
+    # Rule tier bookkeeping
+    # -----------------------------
+    def _rule_tier(self, text: str):
+        """
+        Classify with the rule tier.
+        Returns ((intent_prob, sent_prob) or None, shadow) where shadow
+        means the hit should also be checked against the model.
+        """
+        if self.rule_threshold is None:
+            return None, False
+        intent_prob, sent_prob, confidence = self.rules.classify(text)
+        if confidence < self.rule_threshold:
+            return None, False
+        with self._tier_lock:
+            self._tiers["rules"] += 1
+            shadow = bool(self.shadow_every) and self._tiers["rules"] % self.shadow_every == 0
+        return (intent_prob, sent_prob), shadow
+
+    def _count_tier(self, tier: str):
+        with self._tier_lock:
+            self._tiers[tier] += 1
+
+    def _record_shadow(self, rule, model_intent_prob: list, model_sent_prob: list):
+        """Compare a rule-tier (intent_prob, sent_prob) with the model's on the same text."""
+        rule_intent_prob, rule_sent_prob = rule
+        intent_agree = rule_intent_prob.index(max(rule_intent_prob)) == model_intent_prob.index(max(model_intent_prob))
+        sent_agree = rule_sent_prob.index(max(rule_sent_prob)) == model_sent_prob.index(max(model_sent_prob))
+        with self._tier_lock:
+            self._shadow_checks += 1
+            self._shadow_intent_agree += int(intent_agree)
+            self._shadow_sent_agree += int(sent_agree)
+            self._shadow_agree += int(intent_agree and sent_agree)
+
+    def reset_tier_stats(self):
+        """Reset per-tier counters."""
+        with self._tier_lock:
+            self._tiers = {"greeting": 0, "rules": 0, "model": 0}
+            self._shadow_checks = 0
+            self._shadow_intent_agree = 0
+            self._shadow_sent_agree = 0
+            self._shadow_agree = 0
+
+    def tier_stats(self) -> dict:
+        """
+        How many uncached messages each tier answered, the fraction that
+        skipped the model, and rule/model agreement on sampled rule hits
+        (intent, sentiment, and both at once).
+        """
+        with self._tier_lock:
+            total = sum(self._tiers.values())
+            checks = self._shadow_checks
+            return {
+                **self._tiers,
+                "rule_threshold": self.rule_threshold,
+                "model_skipped_rate": (total - self._tiers["model"]) / total if total else 0.0,
+                "shadow_checks": checks,
+                "intent_agreement_rate": self._shadow_intent_agree / checks if checks else None,
+                "sentiment_agreement_rate": self._shadow_sent_agree / checks if checks else None,
+                "agreement_rate": self._shadow_agree / checks if checks else None,
+            }
 
-        intent_prob = torch.softmax(intent_logits, dim=1)[0].cpu().tolist()
-        sent_prob = torch.softmax(sent_logits, dim=1)[0].cpu().tolist()
+    def share_memory(self):
+        """
+        Move model weights to shared memory before forking workers,
+        so all worker processes read the same physical pages.
+        Memory-mapped weights are left alone: they already are shared
+        page-cache pages, and copying them into shm would double them.
+        """
+        bundle = self._bundle
+        if bundle is None:
+            raise RuntimeError("Models not loaded. Please run load_models() first.")
+        if not bundle.load_timings["mmap"]:
+            bundle.model.share_memory()
+        return self
+
+    def invalidate_cache(self):
+        """Drop all cached predictions (e.g. after reloading weights)."""
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _cache_get(self, text: str, bundle):
+        """Cached result for a normalized text under `bundle`'s model, as a fresh copy, or None."""
+        if self.cache is None:
+            return None
+        result = self.cache.get((bundle.version, text))
+        return _copy_result(result) if result is not None else None
+
+    def _cache_put(self, text: str, result: dict, bundle) -> dict:
+        """Store a result computed with `bundle`'s model and return it."""
+        if self.cache is not None:
+            self.cache.put((bundle.version, text), _copy_result(result))
+        return result
+
+    def _greeting_result(self, text: str) -> dict:
+        """Fixed result returned for greeting messages."""
+        return {
+            "intent": "greeting",
+            "sentiment": "neutral",
+            "intent_prob": [1.0, 0.0, 0.0, 0.0],
+            "sentiment_prob": [0.0, 1.0, 0.0],
+            "entities": {},
+            "response_text": generate_response("greeting", "neutral", {}, text, normalized=True)
+        }
 
-        intent_idx = int(torch.argmax(intent_logits, dim=1).item())
-        sent_idx = int(torch.argmax(sent_logits, dim=1).item())
+    def _build_result(self, text: str, intent_prob: list, sent_prob: list) -> dict:
+        """
+        Turn class probabilities of one normalized text into
+        the structured prediction result.
+        """
+        intent_idx = max(range(len(intent_prob)), key=intent_prob.__getitem__)
+        sent_idx = max(range(len(sent_prob)), key=sent_prob.__getitem__)
 
         intent = INTENTS[intent_idx]
         sentiment = SENTIMENTS[sent_idx]
 
-        entities = extract_entities(text)
-        response_text = generate_response(intent, sentiment, entities, text)
+        with METRICS.stage("entities"):
+            entities = extract_entities(text, normalized=True)
+        with METRICS.stage("response"):
+            response_text = generate_response(intent, sentiment, entities, text, normalized=True)
 
         return {
             "intent": intent,
@@ -246,10 +808,20 @@ class Chatbot:
         }
 
 
+def _copy_result(result: dict) -> dict:
+    """Copy a result dict so callers can't mutate cached entries."""
+    return {
+        **result,
+        "intent_prob": list(result["intent_prob"]),
+        "sentiment_prob": list(result["sentiment_prob"]),
+        "entities": {k: list(v) for k, v in result["entities"].items()},
+    }
+
+
 # Ready-to-use singleton instance
 chatbot = Chatbot()
 
 
-def load_models():
+def load_models(**kwargs):
     """Convenience wrapper for loading models globally."""
-    chatbot.load_models()
+    chatbot.load_models(**kwargs)
@@ -0,0 +1,180 @@
+# Flat, memory-mappable checkpoint format.
+# A checkpoint directory holds:
+# - model.safetensors: safetensors layout (8-byte little-endian header
+#   size, JSON header with dtype/shape/byte offsets per tensor and a
+#   string-only __metadata__ entry, then the raw tensor bytes)
+# - vocab.txt: one token per line, line number = token index
+# The weights metadata records the SHA-256 of the vocab.txt written with
+# them; the loader only accepts a matching pair, so a reader racing a
+# save never mixes two versions.
+# Loading maps the weights file and builds tensors directly on the
+# mapped bytes: no unpickling and no weight copies. The files can also
+# be read with the `safetensors` library, which is not required here.
+#
+# Usage:
+#   python -m chatbot.checkpoint models/chatbot.pt            # -> models/chatbot/
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+WEIGHTS_NAME = "model.safetensors"
+VOCAB_NAME = "vocab.txt"
+FORMAT_VERSION = 1
+# Attempts to read a consistent weights/vocab pair while a save is
+# replacing them
+_LOAD_ATTEMPTS = 5
+
+# safetensors dtype names -> (torch dtype attribute, bytes per element)
+_DTYPES = {
+    "F64": ("float64", 8), "F32": ("float32", 4), "F16": ("float16", 2), "BF16": ("bfloat16", 2),
+    "I64": ("int64", 8), "I32": ("int32", 4), "I16": ("int16", 2), "I8": ("int8", 1),
+    "U8": ("uint8", 1), "BOOL": ("bool", 1),
+}
+# Checkpoint entries stored in the metadata (everything except weights and vocab)
+_META_KEYS = ("arch", "model_config", "tokenizer", "max_len", "variable_length", "distilled_from")
+
+
+def resolve_model_path(path, root: str = None) -> str:
+    """
+    `path` resolved inside `root` (default config.MODELS_ROOT), for
+    checkpoint paths supplied by clients; raises ValueError outside it.
+    """
+    from .config import MODELS_ROOT
+
+    root = os.path.realpath(root or MODELS_ROOT)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([root, resolved]) != root or resolved == root:
+        raise ValueError(f"Checkpoint path must be inside {root}/")
+    return resolved
+
+
+def is_flat_checkpoint(path) -> bool:
+    """True if `path` is a directory written by save_flat_checkpoint()."""
+    return os.path.isfile(os.path.join(path, WEIGHTS_NAME))
+
+
+def save_flat_checkpoint(out_dir, checkpoint: dict):
+    """
+    Write a trainer checkpoint dict ("model_state", "vocab", settings)
+    as model.safetensors + vocab.txt in `out_dir`.
+    Files are written to temporaries and renamed into place; the
+    weights metadata pins the vocabulary by its SHA-256.
+    """
+    import torch
+
+    os.makedirs(out_dir, exist_ok=True)
+    names = {getattr(torch, attr): name for name, (attr, _) in _DTYPES.items()}
+
+    # Largest elements first: every offset stays aligned to its dtype
+    # without padding between tensors (the format allows no holes)
+    tensors = sorted(checkpoint["model_state"].items(), key=lambda kv: (-kv[1].element_size(), kv[0]))
+    header, offset = {}, 0
+    for key, t in tensors:
+        size = t.numel() * t.element_size()
+        header[key] = {"dtype": names[t.dtype], "shape": list(t.shape), "data_offsets": [offset, offset + size]}
+        offset += size
+    words = sorted(checkpoint["vocab"], key=checkpoint["vocab"].get)
+    if any(checkpoint["vocab"][w] != i for i, w in enumerate(words)):
+        raise ValueError("Vocabulary indices must be contiguous from 0.")
+    vocab = ("\n".join(words) + "\n").encode("utf-8")
+
+    meta = {k: checkpoint[k] for k in _META_KEYS if k in checkpoint}
+    meta["format_version"] = FORMAT_VERSION
+    meta["vocab_sha256"] = hashlib.sha256(vocab).hexdigest()
+    header["__metadata__"] = {"chatbot": json.dumps(meta, ensure_ascii=False)}
+
+    raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    raw += b" " * (-len(raw) % 8)  # data starts 8-byte aligned
+
+    # Vocabulary first: a watcher reacting to the new weights file
+    # finds the vocabulary they were saved with
+    path = os.path.join(out_dir, VOCAB_NAME)
+    with open(path + ".tmp", "wb") as f:
+        f.write(vocab)
+    os.replace(path + ".tmp", path)
+
+    path = os.path.join(out_dir, WEIGHTS_NAME)
+    with open(path + ".tmp", "wb") as f:
+        f.write(struct.pack("<Q", len(raw)))
+        f.write(raw)
+        for _, t in tensors:
+            f.write(t.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy().tobytes())
+    os.replace(path + ".tmp", path)
+
+
+def load_flat_checkpoint(path, mmap_weights: bool = True, device=None) -> dict:
+    """
+    Read a checkpoint directory into the same dict shape torch.load()
+    returns for trainer checkpoints.
+    With mmap_weights, tensors are views on a private (copy-on-write)
+    memory map of the weights file, shared between processes that map it.
+    Raises ValueError if the vocabulary keeps not matching the weights.
+    """
+    import torch
+
+    for attempt in range(_LOAD_ATTEMPTS):
+        with open(os.path.join(path, WEIGHTS_NAME), "rb") as f:
+            (header_size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_size))
+            if mmap_weights:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            else:
+                f.seek(0)
+                buf = bytearray(f.read())
+        with open(os.path.join(path, VOCAB_NAME), "rb") as f:
+            vocab = f.read()
+
+        checkpoint = json.loads(header.pop("__metadata__", {}).get("chatbot", "{}"))
+        # Checkpoints written before the hash was recorded are not checked
+        expected = checkpoint.pop("vocab_sha256", None)
+        if expected is None or hashlib.sha256(vocab).hexdigest() == expected:
+            break
+        # Caught between the two renames of a save: read both again
+        time.sleep(0.05 * (attempt + 1))
+    else:
+        raise ValueError(f"{path}: {VOCAB_NAME} does not match {WEIGHTS_NAME} (saved by another version?)")
+    start = 8 + header_size
+
+    state = {}
+    for key, info in header.items():
+        attr, size = _DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        t = torch.frombuffer(buf, dtype=getattr(torch, attr), count=(end - begin) // size, offset=start + begin)
+        t = t.view(info["shape"])
+        state[key] = t if device is None else t.to(device)
+    checkpoint["model_state"] = state
+    checkpoint["vocab"] = {w: i for i, w in enumerate(vocab.decode("utf-8").split("\n")[:-1])}
+    return checkpoint
+
+
+def export_checkpoint(pt_path, out_dir=None) -> str:
+    """
+    Convert a torch.save() trainer checkpoint into the flat format.
+    `out_dir` defaults to the checkpoint path without its extension.
+    """
+    import torch
+
+    out_dir = out_dir or os.path.splitext(pt_path)[0]
+    save_flat_checkpoint(out_dir, torch.load(pt_path, map_location="cpu", weights_only=False))
+    return out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a .pt checkpoint into the flat, memory-mappable format")
+    parser.add_argument("checkpoint")
+    parser.add_argument("out_dir", nargs="?", default=None, help="defaults to the checkpoint path without extension")
+    args = parser.parse_args(argv)
+
+    out_dir = export_checkpoint(args.checkpoint, args.out_dir)
+    print(f"✅ Flat checkpoint written to: {out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
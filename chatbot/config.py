@@ -2,17 +2,129 @@
 # Central configuration file for the chatbot project.
 # This module defines global constants, model hyperparameters,
 # device selection, and supported intents and sentiments.
+# torch is not imported here: DEVICE and PIN_MEMORY are resolved on
+# first access (see __getattr__ below), so torch-free modules (servers,
+# rules, data generation) import quickly.
 
-import torch
+import os
 
-# Select computation device:
-# - Uses GPU (CUDA) if available for faster training/inference
-# - Falls back to CPU otherwise
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+def __getattr__(name):
+    # Select computation device on first use:
+    # - Uses GPU (CUDA) if available for faster training/inference
+    # - Falls back to CPU otherwise
+    if name in ("DEVICE", "PIN_MEMORY"):
+        import torch
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        globals().update(DEVICE=device, PIN_MEMORY=device.type == "cuda")
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Maximum number of tokens allowed in an input sequence
 MAX_LEN = 24
 
+# Default number of messages per forward pass in batched inference
+BATCH_SIZE = 64
+
+# Micro-batching of concurrent server requests:
+# a batch is dispatched when this many requests are queued ...
+BATCH_MAX_SIZE = 32
+
+# ... or when the oldest queued request has waited this long (milliseconds)
+BATCH_MAX_WAIT_MS = 5.0
+
+# Run the encoder only over real tokens (packed sequences + masked
+# attention) instead of the full MAX_LEN padded sequence
+VARIABLE_LENGTH = True
+
+# Inference executor of the async server: pool threads running batched
+# forward passes, max queued+running chat requests before answering 503,
+# and torch intra-op threads (None keeps the torch default)
+INFERENCE_WORKERS = 2
+INFERENCE_MAX_PENDING = 256
+INFERENCE_TORCH_THREADS = None
+
+# HTTP serving of simple_chat_server.py (chatbot.serving.PooledHTTPServer):
+# connection threads, accepted connections allowed to wait for a thread
+# before new ones get 503, idle keep-alive timeout and per-request socket
+# timeout (seconds), and how long shutdown waits for running requests
+HTTP_WORKERS = 32
+HTTP_MAX_QUEUED = 128
+HTTP_KEEPALIVE_TIMEOUT = 5.0
+HTTP_REQUEST_TIMEOUT = 30.0
+HTTP_SHUTDOWN_GRACE = 10.0
+
+# Prediction cache: max number of distinct normalized messages kept
+# (0 disables caching) and optional time-to-live in seconds (None: no expiry)
+CACHE_SIZE = 10000
+CACHE_TTL = None
+
+# CPU inference optimizations applied by Chatbot.load_models():
+# int8 dynamic quantization of GRU/Linear layers and TorchScript compilation
+QUANTIZE = False
+TORCHSCRIPT = False
+
+# Memory-map checkpoint weights instead of copying them into each process
+MMAP_WEIGHTS = True
+
+# Hot reload: how often Chatbot.watch() polls the checkpoint for changes (seconds)
+RELOAD_POLL_SECONDS = 2.0
+
+# /api/chat/batch limits: max request body size (bytes), messages per
+# request and characters per message; results are streamed back every
+# BATCH_SIZE messages
+CHAT_BATCH_MAX_BYTES = 1_000_000
+CHAT_BATCH_MAX_ITEMS = 1000
+CHAT_BATCH_MAX_CHARS = 2000
+
+# Token required in the X-Admin-Token header of admin endpoints
+# (model reload, profiling); None disables the admin endpoints (403)
+ADMIN_TOKEN = os.environ.get("CHATBOT_ADMIN_TOKEN")
+
+# Per-stage latency histograms, gauges and counters exposed at /metrics
+# (Prometheus text format); CHATBOT_METRICS=0 turns all recording off
+METRICS_ENABLED = os.environ.get("CHATBOT_METRICS", "1") != "0"
+
+# Admin-triggered profiling (chatbot.profiler): predict calls captured per
+# window, Python stack sampling interval (ms), seconds after which an
+# unfinished window is closed, and the output directory
+PROFILE_CALLS = 50
+PROFILE_SAMPLE_MS = 1.0
+PROFILE_TIMEOUT = 120.0
+PROFILE_DIR = "profiles"
+
+# Rule-based tier: messages whose keyword-based intent confidence reaches
+# this threshold skip the neural model, and their sentiment comes from
+# sentiment keywords (no keyword: neutral). Opt-in: None disables the tier;
+# pick a threshold with `python -m chatbot.rules` on held-out data
+RULE_CONFIDENCE = None
+
+# Every N-th rule-tier hit is also run through the model to measure the
+# rule/model intent and sentiment agreement rates (0 disables the check)
+RULE_SHADOW_EVERY = 20
+
+# Tokenizer type: "word" (one embedding row per distinct training word)
+# or "hashing" (frequent words + fixed hash buckets, bounded embedding size)
+TOKENIZER = "word"
+
+# Hashing tokenizer: number of hash buckets for rare/unknown words,
+# minimum count for a word to get its own row, and max explicit words
+HASH_BUCKETS = 2048
+MIN_FREQ = 2
+MAX_VOCAB = 8000
+
+# Training data pipeline: samples per optimizer micro-batch, gradient
+# accumulation steps (effective batch = TRAIN_BATCH_SIZE * GRAD_ACCUM_STEPS),
+# DataLoader worker processes; PIN_MEMORY (pinned host memory for GPU
+# transfers) is resolved together with DEVICE
+TRAIN_BATCH_SIZE = 64
+GRAD_ACCUM_STEPS = 1
+TRAIN_NUM_WORKERS = 0
+
+# Length bucketing: batches are formed from pools of this many batches
+# sorted by length (0 disables bucketing; bucketing needs NumPy)
+BUCKET_POOL_BATCHES = 50
+
 # Dimensionality of word embeddings
 EMBED_DIM = 128
 
@@ -28,6 +140,26 @@ DROPOUT = 0.25
 # File path for saving and loading the trained chatbot model
 MODEL_PATH = "models/chatbot.pt"
 
+# Flat checkpoint (model.safetensors + vocab.txt) exported next to
+# MODEL_PATH by the trainer; preferred by load_models() when it is at least
+# as new as MODEL_PATH because it is memory-mapped without unpickling
+MODEL_DIR = "models/chatbot"
+
+# Directory admin reloads may load checkpoints from (checkpoints are
+# unpickled, so a client-supplied path must never leave it)
+MODELS_ROOT = os.path.dirname(MODEL_PATH)
+
+# Compact student model trained by knowledge distillation from the
+# checkpoint above: embedding size, convolution channels and output path
+STUDENT_EMBED_DIM = 64
+STUDENT_CHANNELS = 96
+STUDENT_PATH = "models/chatbot_student.pt"
+
+# Distillation: softmax temperature for the teacher's soft targets and
+# weight of the hard-label loss (1 - alpha goes to the soft targets)
+DISTILL_TEMPERATURE = 2.0
+DISTILL_ALPHA = 0.3
+
 # List of supported user intent classes for intent classification
 INTENTS = [
     "support_issue",
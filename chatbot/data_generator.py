@@ -3,6 +3,11 @@
 # This module creates labeled text samples for intent classification,
 # sentiment analysis, and entity extraction using predefined templates.
 
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
 import random
 
 # Intent-specific text templates.
@@ -45,6 +50,53 @@ PRIORITIES = ["low", "medium", "high"]
 # Supported sentiment labels for sentiment classification
 SENTIMENTS = ["positive", "neutral", "negative"]
 
+def _make_sample(rng, intent):
+    """
+    Generate one (text, intent, sentiment, entities) sample for `intent`
+    using the random generator `rng`.
+    """
+    templates = INTENT_TEMPLATES[intent]
+    template = rng.choice(templates)
+    text = template
+
+    # Replace entity placeholders with randomly selected values
+    facilities_used = []
+    if "{facility}" in text:
+        facilities_used = rng.sample(FACILITIES, k=rng.randint(1, 2))
+        text = text.replace("{facility}", " و ".join(facilities_used))
+    if "{date}" in text:
+        text = text.replace("{date}", rng.choice(DATES))
+
+    # Assign sentiment using intent-specific probability distributions
+    if intent == "support_issue":
+        sentiment = rng.choices(SENTIMENTS, weights=[0.1, 0.3, 0.6])[0]
+    elif intent == "facility_reservation":
+        sentiment = rng.choices(SENTIMENTS, weights=[0.2, 0.5, 0.3])[0]
+    elif intent == "operation_status":
+        sentiment = rng.choices(SENTIMENTS, weights=[0.1, 0.7, 0.2])[0]
+    elif intent == "financial_inquiry":
+        sentiment = rng.choices(SENTIMENTS, weights=[0.05, 0.6, 0.35])[0]
+    else:
+        sentiment = "neutral"
+
+    # Build entity annotations based on the intent type
+    entities = {}
+    if intent == "support_issue":
+        entities["facility"] = facilities_used
+        # Optionally assign a priority level to support requests
+        if rng.random() < 0.3:
+            entities["priority"] = [rng.choice(PRIORITIES)]
+    elif intent == "facility_reservation":
+        entities["facility"] = facilities_used
+        if "{date}" in template:
+            entities["date"] = [rng.choice(DATES)]
+    elif intent == "operation_status":
+        entities["facility"] = facilities_used
+    elif intent == "financial_inquiry":
+        entities["facility"] = facilities_used
+    return (text, intent, sentiment, entities)
+
+
 def generate_dataset(total_per_intent=500, seed=42):
     """
     Generate a synthetic dataset for chatbot training.
@@ -55,52 +107,118 @@ def generate_dataset(total_per_intent=500, seed=42):
     - Sentiment label
     - Extracted entities dictionary
     """
-    random.seed(seed)
+    # Random(seed) yields the same stream as random.seed(seed),
+    # so datasets are identical to the previous global-RNG version
+    rng = random.Random(seed)
     dataset = []
 
     # Iterate over each intent and its corresponding templates
-    for intent, templates in INTENT_TEMPLATES.items():
+    for intent in INTENT_TEMPLATES:
         for _ in range(total_per_intent):
-            template = random.choice(templates)
-            text = template
-
-            # Replace entity placeholders with randomly selected values
-            if "{facility}" in text:
-                facilities_used = random.sample(FACILITIES, k=random.randint(1, 2))
-                text = text.replace("{facility}", " و ".join(facilities_used))
-            if "{date}" in text:
-                text = text.replace("{date}", random.choice(DATES))
-
-            # Assign sentiment using intent-specific probability distributions
-            if intent == "support_issue":
-                sentiment = random.choices(SENTIMENTS, weights=[0.1, 0.3, 0.6])[0]
-            elif intent == "facility_reservation":
-                sentiment = random.choices(SENTIMENTS, weights=[0.2, 0.5, 0.3])[0]
-            elif intent == "operation_status":
-                sentiment = random.choices(SENTIMENTS, weights=[0.1, 0.7, 0.2])[0]
-            elif intent == "financial_inquiry":
-                sentiment = random.choices(SENTIMENTS, weights=[0.05, 0.6, 0.35])[0]
-            else:
-                sentiment = "neutral"
-
-            # Build entity annotations based on the intent type
-            entities = {}
-            if intent == "support_issue":
-                entities["facility"] = facilities_used
-                # Optionally assign a priority level to support requests
-                if random.random() < 0.3:
-                    entities["priority"] = [random.choice(PRIORITIES)]
-            elif intent == "facility_reservation":
-                entities["facility"] = facilities_used
-                if "{date}" in template:
-                    entities["date"] = [random.choice(DATES)]
-            elif intent == "operation_status":
-                entities["facility"] = facilities_used
-            elif intent == "financial_inquiry":
-                entities["facility"] = facilities_used
-            # Append the generated sample as a tuple
-            dataset.append((text, intent, sentiment, entities))
+            dataset.append(_make_sample(rng, intent))
 
     # Shuffle dataset to avoid ordering bias during training
-    random.shuffle(dataset)
+    rng.shuffle(dataset)
     return dataset
+
+
+# -----------------------------
+# Streaming / sharded generation
+# -----------------------------
+SHARD_PATTERN = "shard-{:05d}.jsonl.gz"
+MANIFEST_NAME = "manifest.json"
+
+
+def generate_shard(shard_id, shard_size, seed=42):
+    """
+    Generate one shard of `shard_size` samples, balanced over intents.
+
+    Each shard has its own RNG stream derived from (seed, shard_id), so
+    shards are deterministic and independent of how many processes
+    generate them or in which order.
+    """
+    rng = random.Random(f"{seed}/{shard_id}")
+    intents = list(INTENT_TEMPLATES)
+    shard = [_make_sample(rng, intents[k % len(intents)]) for k in range(shard_size)]
+    rng.shuffle(shard)
+    return shard
+
+
+def iter_dataset(num_shards, shard_size, seed=42):
+    """
+    Yield the dataset shard by shard (lists of sample tuples),
+    keeping only one shard in memory at a time.
+    """
+    for shard_id in range(num_shards):
+        yield generate_shard(shard_id, shard_size, seed)
+
+
+def _write_shard(args):
+    out_dir, shard_id, shard_size, seed = args
+    path = os.path.join(out_dir, SHARD_PATTERN.format(shard_id))
+    tmp = path + ".tmp"
+    # Compact records: [text, intent, sentiment] per line, gzip-compressed
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        for text, intent, sentiment, _ in generate_shard(shard_id, shard_size, seed):
+            f.write(json.dumps([text, intent, sentiment], ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    os.replace(tmp, path)
+    return shard_id
+
+
+def write_shards(out_dir, num_shards, shard_size, seed=42, workers=1):
+    """
+    Generate `num_shards` shards in parallel worker processes and write
+    them to `out_dir` together with a manifest.json.
+    Returns the manifest dict.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(out_dir, i, shard_size, seed) for i in range(num_shards)]
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            for _ in pool.imap_unordered(_write_shard, jobs):
+                pass
+    else:
+        for job in jobs:
+            _write_shard(job)
+
+    manifest = {
+        "seed": seed,
+        "num_shards": num_shards,
+        "shard_size": shard_size,
+        "num_samples": num_shards * shard_size,
+        "files": [SHARD_PATTERN.format(i) for i in range(num_shards)],
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_shard(path):
+    """Stream (text, intent, sentiment) records from one shard file."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield tuple(json.loads(line))
+
+
+def load_manifest(shards_dir):
+    """Read the manifest written by write_shards()."""
+    with open(os.path.join(shards_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic training data as compressed shards")
+    parser.add_argument("out_dir")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--shard-size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    manifest = write_shards(args.out_dir, args.shards, args.shard_size, args.seed, args.workers)
+    print(f"✅ Wrote {manifest['num_samples']} samples in {manifest['num_shards']} shards to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# Datasets for training from on-disk data.
+# ShardDataset streams the compressed shards written by
+# data_generator.write_shards() so training never holds the whole
+# corpus in memory.
+# TokenDataset reads a pre-tokenized corpus (flat NumPy arrays plus a
+# vocab sidecar, written once by build_token_dataset()) through memory
+# maps, so repeated training runs skip generation, tokenizer fitting
+# and encoding entirely.
+# BucketBatchSampler groups samples of similar length so batches carry
+# little padding.
+#
+# Usage:
+#   python -m chatbot.dataset data/tokens --per-intent 500
+#   python -m chatbot.dataset data/tokens --shards data/shards
+
+import argparse
+import json
+import os
+import random
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, IterableDataset, Sampler, get_worker_info
+
+from .config import INTENTS, SENTIMENTS, MAX_LEN
+from .data_generator import generate_dataset, load_manifest, read_shard
+from .normalizer import normalize_fa
+from .tokenizer import create_tokenizer, tokenizer_from_checkpoint
+
+_INTENT_IDX = {name: i for i, name in enumerate(INTENTS)}
+_SENT_IDX = {name: i for i, name in enumerate(SENTIMENTS)}
+
+
+class ShardDataset(IterableDataset):
+    """
+    Streams (ids, length, intent, sentiment) tensors from shard files.
+
+    - Shards are split between DataLoader workers
+    - With shuffle=True, shard order is shuffled per epoch and samples
+      pass through a bounded shuffle buffer (`buffer_size` samples)
+    - Call set_epoch() before each epoch for a new, reproducible order
+    """
+    def __init__(self, files, tokenizer, max_len: int, shuffle: bool = False,
+                 buffer_size: int = 10000, seed: int = 42):
+        self.files = list(files)
+        self.tokenizer = tokenizer
+        self.max_len = max_len
+        self.shuffle = shuffle
+        self.buffer_size = buffer_size
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _records(self, files, rng):
+        if self.shuffle:
+            files = list(files)
+            rng.shuffle(files)
+        for path in files:
+            yield from read_shard(path)
+
+    def _encode(self, record):
+        text, intent, sentiment = record
+        ids, length = self.tokenizer.encode(normalize_fa(text), self.max_len,
+                                            return_length=True, normalized=True)
+        return (
+            torch.tensor(ids, dtype=torch.long),
+            torch.tensor(length, dtype=torch.long),
+            torch.tensor(_INTENT_IDX[intent], dtype=torch.long),
+            torch.tensor(_SENT_IDX[sentiment], dtype=torch.long),
+        )
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker_id, num_workers = (info.id, info.num_workers) if info else (0, 1)
+        files = self.files[worker_id::num_workers]
+        rng = random.Random(f"{self.seed}/{self.epoch}/{worker_id}")
+
+        if not self.shuffle:
+            for record in self._records(files, rng):
+                yield self._encode(record)
+            return
+
+        # Bounded shuffle buffer: emit a random element once full
+        buffer = []
+        for record in self._records(files, rng):
+            if len(buffer) < self.buffer_size:
+                buffer.append(record)
+                continue
+            j = rng.randrange(len(buffer))
+            yield self._encode(buffer[j])
+            buffer[j] = record
+        rng.shuffle(buffer)
+        for record in buffer:
+            yield self._encode(record)
+
+
+# -----------------------------
+# Pre-tokenized, memory-mapped corpus
+# -----------------------------
+# One .npy file per column; row i of every array is sample i.
+# Validation samples come first: rows [0, num_val) are the validation
+# split, rows [num_val, num_samples) the training split.
+TOKEN_ARRAYS = {
+    "tokens": np.int32,       # [N, max_len] token ids, 0-padded
+    "lengths": np.int32,      # [N] real token counts
+    "intents": np.int8,       # [N] index into INTENTS
+    "sentiments": np.int8,    # [N] index into SENTIMENTS
+}
+VOCAB_NAME = "vocab.json"
+
+
+def _open_arrays(out_dir, n, max_len):
+    arrays = {}
+    for name, dtype in TOKEN_ARRAYS.items():
+        shape = (n, max_len) if name == "tokens" else (n,)
+        arrays[name] = np.lib.format.open_memmap(
+            os.path.join(out_dir, f"{name}.npy.tmp"), mode="w+", dtype=dtype, shape=shape
+        )
+    return arrays
+
+
+def _write_rows(arrays, start, rows, tokenizer, max_len):
+    # rows: normalized (text, intent, sentiment) tuples
+    x, lengths = tokenizer.encode_batch([t for t, _, _ in rows], max_len)
+    end = start + len(rows)
+    arrays["tokens"][start:end] = x.numpy()
+    arrays["lengths"][start:end] = lengths.numpy()
+    arrays["intents"][start:end] = [INTENTS.index(i) for _, i, _ in rows]
+    arrays["sentiments"][start:end] = [SENTIMENTS.index(s) for _, _, s in rows]
+    return end
+
+
+def build_token_dataset(out_dir, shards_dir=None, total_per_intent=500, val_ratio=0.2,
+                        seed=42, max_len=MAX_LEN, chunk_size=8192):
+    """
+    Tokenize a corpus once and write it as memory-mappable arrays.
+
+    - Without shards_dir, the corpus is generate_dataset(total_per_intent,
+      seed), shuffled and split like train_and_save() does in memory
+    - With shards_dir, shards are streamed twice (tokenizer fit, then
+      encoding in chunks of `chunk_size`); the first shards are the
+      validation split
+    - The fitted tokenizer is stored in vocab.json in checkpoint format
+    Returns the vocab.json metadata dict.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = create_tokenizer()
+
+    if shards_dir is None:
+        rows = generate_dataset(total_per_intent=total_per_intent, seed=seed)
+        random.Random(seed).shuffle(rows)
+        rows = [(normalize_fa(t), intent, sent) for t, intent, sent, _ in rows]
+        num_val = int(len(rows) * val_ratio)
+        tokenizer.fit(t for t, _, _ in rows)
+        tokenizer.freeze()
+
+        arrays = _open_arrays(out_dir, len(rows), max_len)
+        pos = 0
+        for i in range(0, len(rows), chunk_size):
+            pos = _write_rows(arrays, pos, rows[i:i + chunk_size], tokenizer, max_len)
+    else:
+        manifest = load_manifest(shards_dir)
+        files = [os.path.join(shards_dir, f) for f in manifest["files"]]
+        n_val_shards = min(len(files) - 1, max(1, round(len(files) * val_ratio)))
+        num_val = n_val_shards * manifest["shard_size"]
+        tokenizer.fit(normalize_fa(text) for path in files for text, _, _ in read_shard(path))
+        tokenizer.freeze()
+
+        arrays = _open_arrays(out_dir, manifest["num_samples"], max_len)
+        pos, chunk = 0, []
+        for path in files:
+            for text, intent, sent in read_shard(path):
+                chunk.append((normalize_fa(text), intent, sent))
+                if len(chunk) == chunk_size:
+                    pos = _write_rows(arrays, pos, chunk, tokenizer, max_len)
+                    chunk = []
+        if chunk:
+            pos = _write_rows(arrays, pos, chunk, tokenizer, max_len)
+
+    # Flush and move the finished arrays into place
+    for arr in arrays.values():
+        arr.flush()
+    arrays.clear()
+    for name in TOKEN_ARRAYS:
+        os.replace(os.path.join(out_dir, f"{name}.npy.tmp"), os.path.join(out_dir, f"{name}.npy"))
+
+    meta = {
+        "vocab": tokenizer.word2idx,
+        "tokenizer": tokenizer.to_config(),
+        "max_len": max_len,
+        "num_samples": pos,
+        "num_val": num_val,
+        "seed": seed,
+        "source": shards_dir or f"generate_dataset(total_per_intent={total_per_intent})",
+    }
+    with open(os.path.join(out_dir, VOCAB_NAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+
+def load_token_meta(data_dir):
+    """Read the vocab.json sidecar written by build_token_dataset()."""
+    with open(os.path.join(data_dir, VOCAB_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_token_tokenizer(data_dir):
+    """Rebuild the frozen tokenizer a token dataset was encoded with."""
+    return tokenizer_from_checkpoint(load_token_meta(data_dir))
+
+
+class TokenDataset(Dataset):
+    """
+    Map-style dataset over a build_token_dataset() directory.
+
+    - split="train" or "val" selects the row range from vocab.json
+    - Arrays are opened lazily with np.load(mmap_mode="c"), so every
+      DataLoader worker maps the same files instead of receiving a
+      pickled copy; rows are returned as zero-copy tensor views
+    - `lengths` (NumPy view) is exposed for length-aware samplers
+    """
+    def __init__(self, data_dir, split: str = "train"):
+        if split not in ("train", "val"):
+            raise ValueError(f"Unknown split: {split}")
+        meta = load_token_meta(data_dir)
+        self.data_dir = data_dir
+        self.split = split
+        self.max_len = meta["max_len"]
+        if split == "val":
+            self.start, self.stop = 0, meta["num_val"]
+        else:
+            self.start, self.stop = meta["num_val"], meta["num_samples"]
+        self._arrays = None
+
+    def _open(self):
+        if self._arrays is None:
+            self._arrays = {
+                name: np.load(os.path.join(self.data_dir, f"{name}.npy"), mmap_mode="c")[self.start:self.stop]
+                for name in TOKEN_ARRAYS
+            }
+        return self._arrays
+
+    def __getstate__(self):
+        # Workers re-open the memory maps instead of copying them
+        state = dict(self.__dict__)
+        state["_arrays"] = None
+        return state
+
+    @property
+    def lengths(self):
+        return self._open()["lengths"]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        a = self._open()
+        return (
+            torch.from_numpy(a["tokens"][i]),
+            int(a["lengths"][i]),
+            int(a["intents"][i]),
+            int(a["sentiments"][i]),
+        )
+
+
+# -----------------------------
+# Length bucketing
+# -----------------------------
+class BucketBatchSampler(Sampler):
+    """
+    Batch sampler yielding index lists of similar-length samples.
+
+    - Indices are shuffled, cut into pools of `pool_batches` batches,
+      each pool is sorted by length and split into batches
+    - Batch order is shuffled again so lengths are mixed across steps
+    - Call set_epoch() before each epoch for a new, reproducible order
+    """
+    def __init__(self, lengths, batch_size: int, shuffle: bool = True, pool_batches: int = 50,
+                 drop_last: bool = False, seed: int = 42):
+        # Kept as an array (a memory-mapped lengths.npy is not copied)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_batches = pool_batches
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def __iter__(self):
+        rng = np.random.default_rng([self.seed, self.epoch])
+        n = len(self.lengths)
+        indices = rng.permutation(n) if self.shuffle else np.arange(n)
+
+        pool_size = self.batch_size * max(1, self.pool_batches)
+        batches = []
+        for p in range(0, n, pool_size):
+            pool = indices[p:p + pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind="stable")].tolist()
+            batches.extend(pool[i:i + self.batch_size] for i in range(0, len(pool), self.batch_size))
+        if self.drop_last:
+            batches = [b for b in batches if len(b) == self.batch_size]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return iter(batches)
+
+    def __len__(self):
+        # Pools hold whole batches, so only the last pool can end short
+        pool_batches = max(1, self.pool_batches)
+        full, rest = divmod(len(self.lengths), self.batch_size * pool_batches)
+        tail = rest // self.batch_size if self.drop_last else -(-rest // self.batch_size)
+        return full * pool_batches + tail
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a pre-tokenized, memory-mapped training dataset")
+    parser.add_argument("out_dir")
+    parser.add_argument("--shards", default=None, help="shard directory from chatbot.data_generator")
+    parser.add_argument("--per-intent", type=int, default=500, help="samples per intent (without --shards)")
+    parser.add_argument("--val-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    meta = build_token_dataset(args.out_dir, args.shards, args.per_intent, args.val_ratio, args.seed)
+    print(f"✅ Wrote {meta['num_samples']} samples ({meta['num_val']} validation), "
+          f"vocab size {len(meta['vocab'])}, to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
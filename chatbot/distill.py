@@ -0,0 +1,63 @@
+# Command-line entry point for knowledge distillation.
+# Trains a compact student (CompactChatbotModel) on the soft targets of
+# an existing checkpoint with trainer.distill_and_save() and reports the
+# accuracy, size and latency change.
+#
+# Usage:
+#   python -m chatbot.distill --teacher models/chatbot.pt --out models/distill.json
+#   python -m chatbot.distill --channels 64 --embed-dim 48 --max-acc-drop 0.02
+
+import argparse
+import json
+import sys
+
+from .config import MODEL_PATH, STUDENT_PATH, STUDENT_EMBED_DIM, STUDENT_CHANNELS, DROPOUT
+from .config import DISTILL_TEMPERATURE, DISTILL_ALPHA
+from .trainer import distill_and_save
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distill the chatbot model into a compact student")
+    parser.add_argument("--teacher", default=MODEL_PATH)
+    parser.add_argument("--student", default=STUDENT_PATH)
+    parser.add_argument("--embed-dim", type=int, default=STUDENT_EMBED_DIM)
+    parser.add_argument("--channels", type=int, default=STUDENT_CHANNELS)
+    parser.add_argument("--dropout", type=float, default=DROPOUT)
+    parser.add_argument("--dataset", default=None, help="pre-tokenized dataset dir built with the teacher's vocab")
+    parser.add_argument("--shards", default=None, help="shard directory from chatbot.data_generator")
+    parser.add_argument("--per-intent", type=int, default=500, help="samples per intent (in-memory data)")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--lr", type=float, default=0.003)
+    parser.add_argument("--temperature", type=float, default=DISTILL_TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=DISTILL_ALPHA)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-acc-drop", type=float, default=None,
+                        help="exit non-zero if intent or sentiment accuracy drops more than this")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = distill_and_save(
+        teacher_path=args.teacher, student_path=args.student,
+        student_config={"embed_dim": args.embed_dim, "channels": args.channels, "dropout": args.dropout},
+        total_per_intent=args.per_intent, epochs=args.epochs, lr=args.lr, seed=args.seed,
+        shards_dir=args.shards, dataset_dir=args.dataset,
+        temperature=args.temperature, alpha=args.alpha,
+    )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to: {args.out}")
+
+    if args.max_acc_drop is not None:
+        drop = max(report["teacher_intent_acc"] - report["student_intent_acc"],
+                   report["teacher_sent_acc"] - report["student_sent_acc"])
+        if drop > args.max_acc_drop:
+            print(f"⚠️ Accuracy drop {drop:.2%} exceeds {args.max_acc_drop:.2%}")
+            return 1
+        print(f"✅ Accuracy drop {drop:.2%} within {args.max_acc_drop:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,7 @@
 # This file is responsible for extracting structured entities such as
 # facilities, dates, and priority levels from raw user text.
 
-import re
+from .keyword_matcher import KeywordMatcher
 
 # List of supported facility names that may appear in user messages
 FACILITIES = [
@@ -10,15 +10,15 @@ FACILITIES = [
     "روف گاردن", "لابی", "درب", "دوربین", "آیفون"
 ]
 
-# Regular expression patterns for detecting date-related expressions
-DATE_PATTERNS = [
-    r"\bامروز\b",
-    r"\bفردا\b",
-    r"\bپس\s?فردا\b",
-    r"\bشنبه\b|\bیکشنبه\b|\bدوشنبه\b|\bسه\s?شنبه\b|\bچهارشنبه\b|\bپنجشنبه\b|\bجمعه\b",
+# Date expressions (surface variants with and without the inner space)
+DATE_WORDS = [
+    "امروز", "فردا", "پس فردا", "پسفردا",
+    "شنبه", "یکشنبه", "دوشنبه", "سه شنبه", "سهشنبه",
+    "چهارشنبه", "پنجشنبه", "جمعه"
 ]
 
 # Mapping of priority levels to indicative keywords
+# (dict order is the precedence when several levels are mentioned)
 PRIORITY_WORDS = {
     "urgent": ["فوری", "خیلی فوری", "ضروری", "اورژانسی"],
     "high": ["مهم", "سریع", "هرچی زودتر"],
@@ -26,36 +26,45 @@ PRIORITY_WORDS = {
     "low": ["بعداً", "عجله ندارم"]
 }
 
+# Compiled once at import: facilities, dates and priorities in one automaton.
+# Dates must be whole words, like the previous \b-anchored patterns.
+ENTITY_MATCHER = KeywordMatcher().add_all(FACILITIES, "facility").add_all(DATE_WORDS, "date", whole_word=True)
+for _level, _words in PRIORITY_WORDS.items():
+    ENTITY_MATCHER.add_all(_words, ("priority", _level))
+ENTITY_MATCHER.build()
+
+_PRIORITY_RANK = {level: rank for rank, level in enumerate(PRIORITY_WORDS)}
+
 def extract_entities(text: str):
     """
-    Extract entities from input text using simple string matching
-    and regular expressions.
+    Extract entities from input text with a single pass of the
+    shared keyword matcher (longest match wins on overlaps).
 
     Returns a dictionary containing detected entities.
     """
     entities = {}
-
-    # 1) Facility extraction using keyword matching
     found_facilities = []
-    for f in FACILITIES:
-        if f in text:
-            found_facilities.append(f)
+    found_dates = []
+    found_levels = []
+
+    for m in ENTITY_MATCHER.find(text):
+        if m.label == "facility":
+            found_facilities.append(m.keyword)
+        elif m.label == "date":
+            found_dates.append(m.keyword)
+        else:
+            found_levels.append(m.label[1])
+
+    # 1) Facilities in order of first appearance, each once
     if found_facilities:
-        entities["facility"] = found_facilities
-
-    # 2) Date extraction using predefined regex patterns
-    for pat in DATE_PATTERNS:
-        m = re.search(pat, text)
-        if m:
-            entities["date"] = [m.group(0)]
-            break
-
-    # 3) Priority extraction based on indicative keywords
-    # Stops at the first matched priority level
-    for level, words in PRIORITY_WORDS.items():
-        for w in words:
-            if w in text:
-                entities["priority"] = [level]
-                return entities
+        entities["facility"] = list(dict.fromkeys(found_facilities))
+
+    # 2) First date expression mentioned
+    if found_dates:
+        entities["date"] = [found_dates[0]]
+
+    # 3) Most important priority level mentioned
+    if found_levels:
+        entities["priority"] = [min(found_levels, key=_PRIORITY_RANK.__getitem__)]
 
     return entities
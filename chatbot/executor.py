@@ -0,0 +1,138 @@
+# Inference executor for async servers.
+# CPU-bound model work runs on a bounded thread pool so the event loop
+# stays responsive, and requests beyond a pending limit are rejected
+# immediately instead of queueing without bound (backpressure).
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import INFERENCE_WORKERS, INFERENCE_MAX_PENDING, INFERENCE_TORCH_THREADS
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the executor already holds `max_pending` requests."""
+
+
+class InferenceExecutor:
+    """
+    Bounded execution layer for model inference.
+
+    - `max_workers` pool threads run blocking inference calls
+    - at most `max_pending` requests may be queued or running;
+      further requests raise QueueFullError (map it to HTTP 503), or
+      wait for a free slot with run_waiting()
+    - `torch_threads` sets torch intra-op threads for the process
+      (None keeps the torch default)
+    """
+    def __init__(self, max_workers: int = INFERENCE_WORKERS, max_pending: int = INFERENCE_MAX_PENDING,
+                 torch_threads: int = INFERENCE_TORCH_THREADS):
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("max_workers and max_pending must be >= 1")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.torch_threads = torch_threads
+        if torch_threads:
+            import torch
+            torch.set_num_threads(torch_threads)
+
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        # (loop, asyncio.Future) pairs woken by release()
+        self._waiters = []
+        self.completed = 0
+        self.rejected = 0
+
+    # -----------------------------
+    # Admission control
+    # -----------------------------
+    def admit(self):
+        """Reserve a pending slot or raise QueueFullError."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"Inference queue full ({self.max_pending} pending requests)")
+            self._pending += 1
+
+    async def admit_waiting(self):
+        """Reserve a pending slot, waiting until release() frees one."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._pending < self.max_pending:
+                    self._pending += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+
+    def release(self):
+        """Free a slot reserved by admit()."""
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            waiters, self._waiters = self._waiters, []
+        # Every waiter re-checks; the ones that lose the slot wait again
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    # -----------------------------
+    # Execution
+    # -----------------------------
+    def submit(self, fn, *args, **kwargs):
+        """Run a blocking call on the pool; returns a concurrent Future."""
+        self.admit()
+        return self._start(fn, args, kwargs)
+
+    def _start(self, fn, args, kwargs):
+        # Submit with an already reserved slot, freed when the call ends
+        try:
+            fut = self.pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self.release()
+            raise
+        fut.add_done_callback(lambda _: self.release())
+        return fut
+
+    async def run(self, fn, *args, **kwargs):
+        """Await a blocking call executed on the pool."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def run_waiting(self, fn, *args, **kwargs):
+        """Like run(), but waits for a free slot instead of raising QueueFullError."""
+        await self.admit_waiting()
+        return await asyncio.wrap_future(self._start(fn, args, kwargs))
+
+    async def run_future(self, submit, *args):
+        """
+        Await a call that already returns a concurrent Future
+        (e.g. MicroBatcher.submit), counted against the pending limit.
+        """
+        self.admit()
+        try:
+            return await asyncio.wrap_future(submit(*args))
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """Snapshot of executor settings and counters."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "torch_threads": self.torch_threads,
+                "pending": self._pending,
+                "waiting": len(self._waiters),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and optionally wait for running calls."""
+        self.pool.shutdown(wait=wait)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,118 @@
+# Multi-keyword matcher based on the Aho-Corasick automaton.
+# This module finds every occurrence of a (possibly large) keyword list
+# in a single pass over the text, independent of the number of keywords.
+# It is shared by the entity extractors in chatbot_core and entity_extractor.
+
+from collections import deque, namedtuple
+
+# One keyword occurrence: text[start:end] == keyword
+Match = namedtuple("Match", ["start", "end", "keyword", "label"])
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick keyword matcher.
+
+    - Keywords are registered with add() together with an arbitrary label
+    - build() compiles the automaton (called automatically if needed)
+    - find() returns leftmost-longest, non-overlapping matches, so
+      "روف گاردن" wins over "روف" and "پس فردا" over "فردا"
+    - Keywords added with whole_word=True only match when not
+      surrounded by other word characters (like regex \\b)
+    """
+    def __init__(self):
+        # Trie transitions, keywords ending at each node,
+        # failure links and merged outputs (filled by build())
+        self._goto = [{}]
+        self._own = [[]]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, keyword: str, label=None, whole_word: bool = False):
+        """Register a keyword with its label."""
+        if not keyword:
+            raise ValueError("Keyword must be a non-empty string")
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._own.append([])
+            node = nxt
+        self._own[node].append((keyword, label, whole_word))
+        self._built = False
+        return self
+
+    def add_all(self, keywords, label=None, whole_word: bool = False):
+        """Register several keywords sharing the same label."""
+        for kw in keywords:
+            self.add(kw, label, whole_word)
+        return self
+
+    def build(self):
+        """Compute failure links breadth-first and merge suffix outputs."""
+        goto = self._goto
+        fail = [0] * len(goto)
+        out = [list(o) for o in self._own]
+
+        q = deque(goto[0].values())
+        while q:
+            node = q.popleft()
+            for ch, child in goto[node].items():
+                q.append(child)
+                if node:
+                    f = fail[node]
+                    while f and ch not in goto[f]:
+                        f = fail[f]
+                    fail[child] = goto[f].get(ch, 0)
+                # Inherit outputs of the longest proper suffix
+                out[child] += out[fail[child]]
+
+        self._fail = fail
+        self._out = out
+        self._built = True
+        return self
+
+    # -----------------------------
+    # Matching
+    # -----------------------------
+    def iter_matches(self, text: str):
+        """Yield every (possibly overlapping) match in one pass over text."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kw, label, whole_word in out[node]:
+                start = i + 1 - len(kw)
+                if whole_word and not _is_word_boundary(text, start, i + 1):
+                    continue
+                yield Match(start, i + 1, kw, label)
+
+    def find(self, text: str) -> list:
+        """Leftmost-longest, non-overlapping matches in text order."""
+        matches = sorted(self.iter_matches(text), key=lambda m: (m.start, -m.end))
+        result = []
+        pos = 0
+        for m in matches:
+            if m.start >= pos:
+                result.append(m)
+                pos = m.end
+        return result
+
+
+def _is_word_boundary(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] is not glued to neighbouring word characters."""
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not _is_word_char(before) and not _is_word_char(after)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
@@ -0,0 +1,334 @@
+# Low-overhead in-process metrics with Prometheus text exposition.
+# Stage timers feed fixed-bucket histograms; in-flight requests are
+# tracked with gauges; cache, batcher, executor and tier counters that
+# are already kept elsewhere are read by collectors at scrape time.
+# When disabled (config.METRICS_ENABLED), timers are a shared no-op
+# object and nothing is recorded.
+
+import bisect
+import threading
+import time
+
+from .config import METRICS_ENABLED
+
+# Histogram upper bounds (seconds) for stage latencies
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Histogram upper bounds for batch sizes
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Fixed-bucket histogram: per-bucket counts, sum and count."""
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """(cumulative bucket counts incl. +Inf, sum, count)."""
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, n
+
+
+class _Timer:
+    """Context manager observing its duration into a histogram."""
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Shared do-nothing timer used while metrics are disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _HookedStage:
+    """Stage timer combined with the context manager of a stage hook."""
+    __slots__ = ("timer", "ctx")
+
+    def __init__(self, timer, ctx):
+        self.timer = timer
+        self.ctx = ctx
+
+    def __enter__(self):
+        self.ctx.__enter__()
+        self.timer.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.__exit__(*exc)
+        self.ctx.__exit__(*exc)
+        return False
+
+
+class _InFlight:
+    """Context manager incrementing a gauge for its duration."""
+    __slots__ = ("registry", "key")
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def __enter__(self):
+        self.registry._add_gauge(self.key, 1)
+        return self
+
+    def __exit__(self, *exc):
+        self.registry._add_gauge(self.key, -1)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Histograms, counters and gauges keyed by (name, labels).
+
+    - stage(name): timer for the `<prefix>_stage_seconds{stage=...}` histogram
+    - observe()/inc()/in_flight() for other metrics
+    - register_collector(fn): fn() returns (name, type, help, labels, value)
+      samples computed at scrape time
+    - set_stage_hook(fn): fn(name) returns a context manager entered around
+      every stage (used by the profiler to label stages), even if disabled
+    - render(): Prometheus text exposition format
+    """
+    def __init__(self, enabled: bool = True, prefix: str = "chatbot"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+        self._stage_hist = {}
+        self._collectors = []
+        self._stage_hook = None
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+    def stage(self, name: str):
+        """Timer context manager for one pipeline stage."""
+        timer = _Timer(self._stage_histogram(name)) if self.enabled else _NULL_TIMER
+        hook = self._stage_hook
+        return timer if hook is None else _HookedStage(timer, hook(name))
+
+    def set_stage_hook(self, hook):
+        """Install (or with None, remove) the stage hook."""
+        self._stage_hook = hook
+
+    def observe_stage(self, name: str, seconds: float):
+        """Record an already measured stage duration."""
+        if self.enabled:
+            self._stage_histogram(name).observe(seconds)
+
+    def observe(self, name: str, value: float, labels: dict = None, buckets=LATENCY_BUCKETS, help: str = ""):
+        if self.enabled:
+            self._histogram(name, help, labels, buckets).observe(value)
+
+    def inc(self, name: str, value: float = 1, labels: dict = None, help: str = ""):
+        if not self.enabled:
+            return
+        key = self._key(name, labels, "counter", help)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def in_flight(self, name: str = "in_flight_requests", labels: dict = None,
+                  help: str = "Requests currently being handled"):
+        """Context manager tracking concurrently running requests."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _InFlight(self, self._key(name, labels, "gauge", help))
+
+    def register_collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def reset(self):
+        """Drop all recorded values (registered collectors are kept)."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._stage_hist.clear()
+
+    def _key(self, name, labels, kind, help):
+        full = f"{self.prefix}_{name}"
+        if full not in self._help:
+            self._help[full] = (kind, help)
+        return full, tuple(sorted((labels or {}).items()))
+
+    def _stage_histogram(self, name):
+        hist = self._stage_hist.get(name)
+        if hist is None:
+            hist = self._histogram("stage_seconds", "Time spent per pipeline stage", {"stage": name},
+                                   LATENCY_BUCKETS)
+            self._stage_hist[name] = hist
+        return hist
+
+    def _histogram(self, name, help, labels, buckets):
+        key = self._key(name, labels, "histogram", help)
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram(buckets))
+        return hist
+
+    def _add_gauge(self, key, delta):
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    # -----------------------------
+    # Exposition
+    # -----------------------------
+    def render(self) -> str:
+        """All metrics in Prometheus text format."""
+        lines = []
+        with self._lock:
+            histograms = list(self._histograms.items())
+            scalars = list(self._counters.items()) + list(self._gauges.items())
+            help_ = dict(self._help)
+
+        samples = {}
+        for (name, labels), value in scalars:
+            samples.setdefault(name, []).append((labels, value))
+        for fn in self._collectors:
+            for name, kind, help, labels, value in fn():
+                full = f"{self.prefix}_{name}"
+                help_.setdefault(full, (kind, help))
+                samples.setdefault(full, []).append((tuple(sorted(labels.items())), value))
+
+        for name in sorted(samples):
+            kind, help = help_[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples[name]:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        by_name = {}
+        for (name, labels), hist in histograms:
+            by_name.setdefault(name, []).append((labels, hist))
+        for name in sorted(by_name):
+            kind, help = help_[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in by_name[name]:
+                cumulative, total, n = hist.snapshot()
+                for bound, c in zip(hist.buckets + (float("inf"),), cumulative):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {c}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {n}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry used by the chatbot, batcher and servers
+METRICS = MetricsRegistry(enabled=METRICS_ENABLED)
+
+
+# -----------------------------
+# Scrape-time collectors
+# -----------------------------
+def chatbot_collector(bot):
+    """Cache, tier and reload counters of a Chatbot."""
+    def collect():
+        samples = []
+        if bot.cache is not None:
+            c = bot.cache.stats()
+            samples += [
+                ("cache_hits_total", "counter", "Prediction cache hits", {}, c["hits"]),
+                ("cache_misses_total", "counter", "Prediction cache misses", {}, c["misses"]),
+                ("cache_evictions_total", "counter", "Prediction cache LRU evictions", {}, c["evictions"]),
+                ("cache_entries", "gauge", "Prediction cache entries", {}, c["size"]),
+            ]
+        tiers = bot.tier_stats()
+        for tier in ("greeting", "rules", "model"):
+            samples.append(("tier_predictions_total", "counter", "Uncached predictions per tier",
+                            {"tier": tier}, tiers[tier]))
+        samples += [
+            ("model_reloads_total", "counter", "Successful hot model reloads", {}, bot.reload_stats["reloads"]),
+            ("model_reload_failures_total", "counter", "Failed hot model reloads", {},
+             bot.reload_stats["failures"]),
+        ]
+        return samples
+    return collect
+
+
+def batcher_collector(batcher):
+    """Queue depth and batch counters of a MicroBatcher."""
+    def collect():
+        s = batcher.stats()
+        return [
+            ("batch_queue_depth", "gauge", "Requests waiting for a batch", {}, s["queue_depth"]),
+            ("batch_requests_total", "counter", "Requests answered through the micro-batcher", {}, s["requests"]),
+            ("batches_total", "counter", "Batched forward passes", {}, s["batches"]),
+            ("batch_errors_total", "counter", "Requests failed inside a batch", {}, s["errors"]),
+        ]
+    return collect
+
+
+def executor_collector(executor):
+    """Pending/waiting/completed/rejected counters of an InferenceExecutor."""
+    def collect():
+        s = executor.stats()
+        return [
+            ("executor_pending", "gauge", "Chat requests queued or running on the inference pool", {}, s["pending"]),
+            ("executor_waiting", "gauge", "Batch streams waiting for a free inference slot", {}, s["waiting"]),
+            ("executor_completed_total", "counter", "Chat requests completed by the inference pool", {},
+             s["completed"]),
+            ("executor_rejected_total", "counter", "Chat requests rejected with 503 (queue full)", {},
+             s["rejected"]),
+        ]
+    return collect
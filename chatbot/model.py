@@ -1,24 +1,34 @@
 # Neural network architecture for the chatbot.
 # This module defines the attention mechanism and the main model
-# used for joint intent classification and sentiment analysis.
+# used for joint intent classification and sentiment analysis,
+# plus a compact convolutional student model for low-latency serving.
+
+from typing import Optional
 
 import torch
 import torch.nn as nn
-from .config import INTENTS, SENTIMENTS, EMBED_DIM, HIDDEN_DIM, NUM_LAYERS, DROPOUT
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
+from .config import (
+    INTENTS, SENTIMENTS, EMBED_DIM, HIDDEN_DIM, NUM_LAYERS, DROPOUT,
+    STUDENT_EMBED_DIM, STUDENT_CHANNELS,
+)
 
 class Attention(nn.Module):
     """
     Simple additive attention mechanism.
     Computes attention weights over time steps and
     produces a context vector as a weighted sum.
+    Positions where `mask` is False (padding) get zero weight.
     """
-    def init(self, dim):
+    def __init__(self, dim):
         super().__init__()
         self.proj = nn.Linear(dim, 1)
 
-    def forward(self, x):
+    def forward(self, x, mask: Optional[torch.Tensor] = None):
         # x shape: [batch_size, sequence_length, hidden_dim]
         scores = self.proj(x).squeeze(-1)       # [B, T] attention scores
+        if mask is not None:
+            scores = scores.masked_fill(~mask, float("-inf"))
         weights = torch.softmax(scores, dim=1) # [B, T] normalized weights
         context = (x * weights.unsqueeze(-1)).sum(dim=1)  # [B, D] context vector
         return context, weights
@@ -27,50 +37,127 @@ class ChatbotModel(nn.Module):
     """
     Main chatbot model based on a bidirectional GRU with attention.
     Produces intent and sentiment predictions from a shared encoder.
+    Sizes default to config.py; `model_config` holds the values used,
+    so checkpoints can rebuild the same architecture.
     """
-    def init(self, vocab_size):
+    def __init__(self, vocab_size, embed_dim: int = EMBED_DIM, hidden_dim: int = HIDDEN_DIM,
+                 num_layers: int = NUM_LAYERS, dropout: float = DROPOUT):
         super().__init__()
+        self.model_config = {
+            "embed_dim": embed_dim,
+            "hidden_dim": hidden_dim,
+            "num_layers": num_layers,
+            "dropout": dropout,
+        }
 
         # Embedding layer for token indices
-        self.embedding = nn.Embedding(vocab_size, EMBED_DIM, padding_idx=0)
+        self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
 
         # Bidirectional GRU encoder
         self.gru = nn.GRU(
-            input_size=EMBED_DIM,
-            hidden_size=HIDDEN_DIM,
-            num_layers=NUM_LAYERS,
+            input_size=embed_dim,
+            hidden_size=hidden_dim,
+            num_layers=num_layers,
             batch_first=True,
             bidirectional=True,
-            dropout=DROPOUT if NUM_LAYERS > 1 else 0.0
+            dropout=dropout if num_layers > 1 else 0.0
         )
 
         # Attention layer applied on top of GRU outputs
-        self.attn = Attention(HIDDEN_DIM * 2)
+        self.attn = Attention(hidden_dim * 2)
 
         # Classification head for intent prediction
         self.intent_head = nn.Sequential(
-            nn.Linear(HIDDEN_DIM * 2, 256),
+            nn.Linear(hidden_dim * 2, 256),
             nn.ReLU(),
-            nn.Dropout(DROPOUT),
+            nn.Dropout(dropout),
             nn.Linear(256, len(INTENTS))
         )
 
         # Classification head for sentiment prediction
         self.sentiment_head = nn.Sequential(
-            nn.Linear(HIDDEN_DIM * 2, 128),
+            nn.Linear(hidden_dim * 2, 128),
             nn.ReLU(),
-            nn.Dropout(DROPOUT),
+            nn.Dropout(dropout),
             nn.Linear(128, len(SENTIMENTS))
         )
 
-    def forward(self, x):
+    def forward(self, x, lengths: Optional[torch.Tensor] = None):
         # x: tokenized input sequence [B, T]
+        # lengths: optional true token counts [B]; when given, the GRU
+        # skips pad positions and attention ignores them
         emb = self.embedding(x)          # [B, T, E]
-        out, _ = self.gru(emb)           # [B, T, 2H]
-        ctx, weights = self.attn(out)    # ctx: [B, 2H], weights: [B, T]
+        mask: Optional[torch.Tensor] = None
+        if lengths is None:
+            out, _ = self.gru(emb)       # [B, T, 2H]
+        else:
+            lens = lengths.clamp(min=1, max=x.size(1))
+            packed = pack_padded_sequence(emb, lens.cpu(), batch_first=True, enforce_sorted=False)
+            packed_out, _ = self.gru(packed)
+            out, _ = pad_packed_sequence(packed_out, batch_first=True, total_length=x.size(1))
+            mask = torch.arange(x.size(1), device=x.device).unsqueeze(0) < lens.to(x.device).unsqueeze(1)
+        ctx, weights = self.attn(out, mask)  # ctx: [B, 2H], weights: [B, T]
 
         # Compute logits for each task
         intent_logits = self.intent_head(ctx)
         sentiment_logits = self.sentiment_head(ctx)
 
         return intent_logits, sentiment_logits, weights
+
+
+class CompactChatbotModel(nn.Module):
+    """
+    Small student model for low-latency CPU inference.
+    Embeddings -> one width-3 convolution -> masked mean + max pooling
+    -> linear intent and sentiment heads. Has the same forward
+    signature and outputs as ChatbotModel (weights are the pooling
+    weights of the mean), so it can be served in its place.
+    """
+    def __init__(self, vocab_size, embed_dim: int = STUDENT_EMBED_DIM, channels: int = STUDENT_CHANNELS,
+                 dropout: float = DROPOUT):
+        super().__init__()
+        self.model_config = {
+            "embed_dim": embed_dim,
+            "channels": channels,
+            "dropout": dropout,
+        }
+        self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
+        self.conv = nn.Conv1d(embed_dim, channels, kernel_size=3, padding=1)
+        self.dropout = nn.Dropout(dropout)
+        self.intent_head = nn.Linear(channels * 2, len(INTENTS))
+        self.sentiment_head = nn.Linear(channels * 2, len(SENTIMENTS))
+
+    def forward(self, x, lengths: Optional[torch.Tensor] = None):
+        # x: tokenized input sequence [B, T]
+        # lengths: optional true token counts [B]; without them,
+        # non-pad tokens (id != 0) are used
+        if lengths is None:
+            mask = x != 0
+        else:
+            lens = lengths.clamp(min=1, max=x.size(1)).to(x.device)
+            mask = torch.arange(x.size(1), device=x.device).unsqueeze(0) < lens.unsqueeze(1)
+        emb = self.embedding(x).transpose(1, 2)            # [B, E, T]
+        h = torch.relu(self.conv(emb))                      # [B, C, T]
+        h = h.masked_fill(~mask.unsqueeze(1), 0.0)
+
+        weights = mask.float() / mask.sum(dim=1, keepdim=True).clamp(min=1).float()  # [B, T]
+        mean = (h * weights.unsqueeze(1)).sum(dim=2)        # [B, C]
+        # ReLU outputs are >= 0, so zeroed pads never win the max
+        peak = h.max(dim=2).values                          # [B, C]
+        ctx = self.dropout(torch.cat([mean, peak], dim=1))  # [B, 2C]
+
+        return self.intent_head(ctx), self.sentiment_head(ctx), weights
+
+
+# Architectures by checkpoint "arch" name
+MODEL_ARCHS = {
+    "gru": ChatbotModel,
+    "compact": CompactChatbotModel,
+}
+
+
+def build_model(arch: str, vocab_size: int, **model_config) -> nn.Module:
+    """Instantiate a model architecture by name ("gru" or "compact")."""
+    if arch not in MODEL_ARCHS:
+        raise ValueError(f"Unknown model architecture: {arch}")
+    return MODEL_ARCHS[arch](vocab_size, **model_config)
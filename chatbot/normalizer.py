@@ -0,0 +1,71 @@
+# Precompiled Persian text normalization.
+# All character-level rules are folded into one str.translate table,
+# followed by a single whitespace pass, so a message is normalized once
+# and the result is reused by tokenization, entity extraction and
+# response generation.
+# Tokenizers record the normalizer version they were fitted with;
+# checkpoints from before versioning keep the original rules (version 1).
+
+ZWNJ = "\u200c"
+
+# Version of normalize_fa(); bump when its output changes for any text
+NORMALIZER_VERSION = 2
+
+# Character-level rules: {source: replacement or None (delete)}
+_CHAR_MAP = {
+    # Arabic -> Persian letters
+    "ي": "ی", "ى": "ی", "ك": "ک", "ة": "ه", "ۀ": "ه",
+    "أ": "ا", "إ": "ا", "ٱ": "ا",
+    # Zero-width / invisible characters other than ZWNJ
+    "\u200b": None, "\u200d": None, "\ufeff": None, "\u00ad": None,
+    # Non-breaking spaces become regular spaces
+    "\u00a0": " ", "\u202f": " ",
+    # Tatweel (kashida)
+    "\u0640": None,
+}
+# Diacritics (fathatan .. sukun, superscript alef)
+_CHAR_MAP.update({chr(c): None for c in range(0x064B, 0x0653)})
+_CHAR_MAP["\u0670"] = None
+# Persian and Arabic-Indic digits -> ASCII digits
+_CHAR_MAP.update({chr(0x06F0 + d): str(d) for d in range(10)})
+_CHAR_MAP.update({chr(0x0660 + d): str(d) for d in range(10)})
+
+TRANSLATION_TABLE = str.maketrans(_CHAR_MAP)
+
+
+def normalize_fa(text: str) -> str:
+    """
+    Normalize Persian text in one pass:
+    - Unify Arabic/Persian characters, fold digits to ASCII
+    - Drop diacritics, tatweel and stray zero-width characters
+    - Lowercase (for Latin text)
+    - Strip and collapse whitespace; remove ZWNJ at word edges
+    The function is idempotent.
+    """
+    if not text:
+        return ""
+    text = " ".join(text.translate(TRANSLATION_TABLE).lower().split())
+    if ZWNJ in text:
+        text = " ".join(w.strip(ZWNJ) for w in text.split(" "))
+    return text
+
+
+def normalize_fa_v1(text: str) -> str:
+    """
+    Original normalization (version 1), kept for checkpoints fitted with it:
+    strip, unify Arabic yeh/kaf, collapse whitespace.
+    """
+    if not text:
+        return ""
+    return " ".join(text.replace("ي", "ی").replace("ك", "ک").split())
+
+
+_NORMALIZERS = {1: normalize_fa_v1, 2: normalize_fa}
+
+
+def get_normalizer(version: int = NORMALIZER_VERSION):
+    """normalize function of the given version; ValueError if unknown."""
+    try:
+        return _NORMALIZERS[version]
+    except KeyError:
+        raise ValueError(f"Unknown normalizer version: {version}")
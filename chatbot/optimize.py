@@ -0,0 +1,75 @@
+# CPU inference optimizations for the chatbot model.
+# This module converts a trained fp32 model into a dynamically quantized
+# (int8 GRU/Linear) and/or TorchScript-compiled model, and checks that
+# the optimized model still agrees with the fp32 reference.
+
+import io
+
+import torch
+import torch.nn as nn
+
+from .config import DEVICE
+from .normalizer import normalize_fa
+
+
+def optimize_model(model: nn.Module, quantize: bool = True, torchscript: bool = False) -> nn.Module:
+    """
+    Return an inference-only copy of `model`:
+    - quantize: int8 dynamic quantization of nn.GRU and nn.Linear weights
+    - torchscript: compile with torch.jit.script and freeze the graph
+    The input model is left untouched.
+    """
+    if quantize and DEVICE.type != "cpu":
+        raise ValueError("Dynamic int8 quantization is only supported for CPU inference.")
+
+    optimized = model
+    if quantize:
+        optimized = torch.ao.quantization.quantize_dynamic(
+            model, {nn.GRU, nn.Linear}, dtype=torch.qint8
+        )
+    if torchscript:
+        # Scripting (not tracing) keeps the optional `lengths` branch
+        optimized = torch.jit.freeze(torch.jit.script(optimized.eval()))
+    return optimized.eval()
+
+
+def model_size_bytes(model: nn.Module) -> int:
+    """Serialized size of a model's weights (fp32 or packed int8)."""
+    buf = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buf)
+    else:
+        torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+
+def compare_models(reference: nn.Module, candidate: nn.Module, tokenizer, texts, max_len: int,
+                   variable_length: bool = False) -> dict:
+    """
+    Run both models on `texts` and report how closely they agree:
+    - intent / sentiment argmax agreement (fraction of texts)
+    - largest absolute difference of any class probability
+    """
+    x, lengths = tokenizer.encode_batch([tokenizer.model_text(t, normalize_fa(t)) for t in texts], max_len)
+    x = x.to(DEVICE)
+    lengths = lengths.clamp(min=1) if variable_length else None
+
+    with torch.no_grad():
+        ref_int, ref_sent, _ = reference(x, lengths)
+        cand_int, cand_sent, _ = candidate(x, lengths)
+
+    ref_int, cand_int = torch.softmax(ref_int, dim=1), torch.softmax(cand_int, dim=1)
+    ref_sent, cand_sent = torch.softmax(ref_sent, dim=1), torch.softmax(cand_sent, dim=1)
+
+    n = max(1, len(texts))
+    return {
+        "samples": len(texts),
+        "intent_agreement": (ref_int.argmax(1) == cand_int.argmax(1)).sum().item() / n,
+        "sentiment_agreement": (ref_sent.argmax(1) == cand_sent.argmax(1)).sum().item() / n,
+        "max_prob_diff": max(
+            (ref_int - cand_int).abs().max().item(),
+            (ref_sent - cand_sent).abs().max().item(),
+        ),
+        "reference_bytes": model_size_bytes(reference),
+        "optimized_bytes": model_size_bytes(candidate),
+    }
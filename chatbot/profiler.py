@@ -0,0 +1,303 @@
+# On-demand profiling of a running chatbot.
+# A ProfileCapture wraps the next N Chatbot.predict()/predict_batch()
+# calls in torch.profiler and samples the Python stack of the thread
+# running them, then writes to its own directory under PROFILE_DIR:
+# - trace.json: Chrome trace of all captured calls (chrome://tracing,
+#   https://ui.perfetto.dev)
+# - stacks.folded: sampled Python stacks in folded format (flamegraph.pl,
+#   speedscope)
+# - summary.txt / summary.json: labelled sections and top operators
+# Labels: "chatbot.<stage>" for the pipeline stages timed by
+# chatbot.metrics (normalize, tokenize, forward, postprocess, entities,
+# response) and "model.<child>" for the model's submodules (embedding,
+# gru, attn, intent_head, sentiment_head); TorchScript models only show
+# operator names.
+# Captured calls run one at a time (the profiler is per thread); calls
+# arriving while one is being captured run unprofiled. Profiled calls
+# are slower than usual, so only a bounded window is captured.
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import torch
+from torch.profiler import ProfilerActivity, profile, record_function
+
+from .config import PROFILE_CALLS, PROFILE_SAMPLE_MS, PROFILE_TIMEOUT, PROFILE_DIR
+from .metrics import METRICS
+
+# Rows of the operator table in summary.txt / summary.json
+TOP_OPS = 25
+
+# Per-thread stack of open submodule labels (forward hooks can't pass
+# state from the pre-hook to the post-hook)
+_open_labels = threading.local()
+
+
+# -----------------------------
+# Labels
+# -----------------------------
+def _stage_label(name: str):
+    return record_function(f"chatbot.{name}")
+
+
+def _enter_module(label, module, args):
+    rf = record_function(label)
+    rf.__enter__()
+    _open_labels.__dict__.setdefault("stack", []).append(rf)
+
+
+def _exit_module(module, args, output):
+    stack = getattr(_open_labels, "stack", None)
+    if stack:
+        stack.pop().__exit__(None, None, None)
+
+
+def _label_modules(model) -> list:
+    """Forward hooks labelling each direct submodule; returns their handles."""
+    if isinstance(model, torch.jit.ScriptModule):
+        return []
+    handles = []
+    for name, module in model.named_children():
+        label = f"model.{name}"
+        handles.append(module.register_forward_pre_hook(
+            lambda m, args, label=label: _enter_module(label, m, args)))
+        handles.append(module.register_forward_hook(_exit_module))
+    return handles
+
+
+# -----------------------------
+# Python stack sampling
+# -----------------------------
+class _StackSampler(threading.Thread):
+    """Samples the Python stack of `target` (a thread ident) every interval."""
+    def __init__(self, interval_s: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval_s = interval_s
+        self.target = None
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval_s):
+            target = self.target
+            if target is None or target == me:
+                continue
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# -----------------------------
+# Capture window
+# -----------------------------
+class ProfileCapture:
+    """
+    Profiles the next `calls` prediction calls of `bot`.
+
+    - start() arms the window; Chatbot.predict()/predict_batch() route
+      through call() while the capture is attached to the bot
+    - The window closes after `calls` captured calls or `timeout`
+      seconds; files are then written by a background thread
+    - status() reports progress and, when done, the output files and
+      the heaviest labels and operators
+    """
+    def __init__(self, bot, calls: int = PROFILE_CALLS, out_dir: str = PROFILE_DIR,
+                 sample_ms: float = PROFILE_SAMPLE_MS, timeout: float = PROFILE_TIMEOUT,
+                 record_shapes: bool = False):
+        if calls < 1:
+            raise ValueError("calls must be >= 1")
+        self.bot = bot
+        self.calls = calls
+        self.timeout = timeout
+        self.record_shapes = record_shapes
+        self.out_dir = os.path.join(out_dir, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+        self.state = "created"
+        self.captured = 0
+        self.report = None
+        self.error = None
+
+        self._activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            self._activities.append(ProfilerActivity.CUDA)
+        self._sampler = _StackSampler(sample_ms / 1000)
+        self._profiles = []
+        self._hooks = []
+        self._run_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+        self._started = None
+        self._window_s = 0.0
+        self._reason = None
+
+    def start(self):
+        """Label the model and stages and start sampling; returns self."""
+        model = self.bot.model
+        if model is None:
+            raise RuntimeError("Models not loaded. Please run load_models() first.")
+        self._hooks = _label_modules(model)
+        METRICS.set_stage_hook(_stage_label)
+        self._sampler.start()
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self._close, args=("timeout",))
+            self._timer.daemon = True
+            self._timer.start()
+        self._started = time.perf_counter()
+        self.state = "running"
+        return self
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs), profiled if the window has room for it."""
+        if self._closed.is_set() or not self._run_lock.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            if self._closed.is_set():
+                return fn(*args, **kwargs)
+            self._sampler.target = threading.get_ident()
+            try:
+                with profile(activities=self._activities, record_shapes=self.record_shapes) as prof:
+                    with record_function("chatbot.predict"):
+                        result = fn(*args, **kwargs)
+            finally:
+                self._sampler.target = None
+            self._profiles.append(prof)
+            self.captured += 1
+            full = self.captured >= self.calls
+        finally:
+            self._run_lock.release()
+        if full:
+            self._close("complete")
+        return result
+
+    def _close(self, reason: str):
+        # Wait for a call being captured, then detach everything exactly once
+        with self._run_lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+        if self._timer is not None:
+            self._timer.cancel()
+        self.bot._detach_profile(self)
+        METRICS.set_stage_hook(None)
+        for handle in self._hooks:
+            handle.remove()
+        self._sampler.stop()
+        self.state = "writing"
+        self._window_s = time.perf_counter() - self._started
+        self._reason = reason
+        threading.Thread(target=self._write, name="profile-writer", daemon=True).start()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the window closed and its files are written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.state in ("created", "running", "writing"):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def status(self) -> dict:
+        status = {"state": self.state, "calls": self.calls, "captured": self.captured, "out_dir": self.out_dir}
+        if self.report is not None:
+            status.update(self.report)
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+    # -----------------------------
+    # Output
+    # -----------------------------
+    def _write(self):
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            files = {"stacks": self._write_stacks(), "summary": os.path.join(self.out_dir, "summary.txt")}
+            if self._profiles:
+                files["trace"] = self._write_trace()
+            labels, ops = self._aggregate()
+            self.report = {
+                "reason": self._reason,
+                "window_s": self._window_s,
+                "samples": sum(self._sampler.counts.values()),
+                "files": files,
+                "labels": labels,
+                "top_ops": ops[:TOP_OPS],
+            }
+            self._write_summary()
+            self._profiles = []
+            self.state = "done"
+            print(f"✅ Profile written to: {self.out_dir} ({self.captured} calls)")
+        except Exception as e:
+            self.error = repr(e)
+            self.state = "failed"
+            print(f"⚠️ Writing profile failed: {e!r}")
+
+    def _write_stacks(self) -> str:
+        path = os.path.join(self.out_dir, "stacks.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self._sampler.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _write_trace(self) -> str:
+        # One Chrome trace per captured call, merged into a single file
+        path = os.path.join(self.out_dir, "trace.json")
+        part = path + ".part"
+        merged = None
+        for prof in self._profiles:
+            prof.export_chrome_trace(part)
+            with open(part, encoding="utf-8") as f:
+                trace = json.load(f)
+            if merged is None:
+                merged = trace
+            else:
+                merged["traceEvents"].extend(trace.get("traceEvents", []))
+        os.remove(part)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(merged, f)
+        return path
+
+    def _aggregate(self):
+        """(labels, operators) summed over all captured calls, heaviest first."""
+        totals = defaultdict(lambda: {"count": 0, "cpu_total_ms": 0.0, "self_cpu_ms": 0.0})
+        for prof in self._profiles:
+            for evt in prof.key_averages():
+                row = totals[evt.key]
+                row["count"] += evt.count
+                row["cpu_total_ms"] += evt.cpu_time_total / 1000
+                row["self_cpu_ms"] += evt.self_cpu_time_total / 1000
+        rows = [{"name": name, **row} for name, row in totals.items()]
+        # Labels are ranked by inclusive time, operators by self time
+        labels = sorted((r for r in rows if r["name"].startswith(("chatbot.", "model."))),
+                        key=lambda r: -r["cpu_total_ms"])
+        ops = sorted((r for r in rows if not r["name"].startswith(("chatbot.", "model."))),
+                     key=lambda r: -r["self_cpu_ms"])
+        return labels, ops
+
+    def _write_summary(self):
+        with open(os.path.join(self.out_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump({"calls": self.calls, "captured": self.captured, **self.report}, f, indent=2)
+
+        with open(self.report["files"]["summary"], "w", encoding="utf-8") as f:
+            f.write(f"Captured calls: {self.captured}/{self.calls} ({self._reason}), "
+                    f"window {self._window_s:.1f}s, {self.report['samples']} stack samples\n\n")
+            for title, rows, key in (("Labels (inclusive CPU time)", self.report["labels"], "cpu_total_ms"),
+                                     ("Top operators (self CPU time)", self.report["top_ops"], "self_cpu_ms")):
+                f.write(f"{title}\n")
+                f.write(f"{'name':<48}{'calls':>8}{'total ms':>12}{'per call us':>14}\n")
+                for r in rows:
+                    per_call = r[key] * 1000 / r["count"] if r["count"] else 0.0
+                    f.write(f"{r['name'][:47]:<48}{r['count']:>8}{r[key]:>12.3f}{per_call:>14.1f}\n")
+                f.write("\n")
@@ -0,0 +1,204 @@
+# Fast rule-based classification tier.
+# A keyword scorer that classifies obvious messages without running the
+# neural model. Only messages it cannot classify confidently are passed
+# on to ChatbotModel. The tier is opt-in (config.RULE_CONFIDENCE).
+#
+# The command line evaluates the tier per confidence threshold: coverage
+# and intent/sentiment accuracy of the rules against the model on the
+# same messages. Sources: the labelled presentation samples of
+# chatbot/test.py (default), a labelled JSONL file, or --generated data.
+# Generated data comes from the same templates the keyword lists were
+# written from (only the sampling seed differs), so its numbers are
+# in-distribution and overstate real-world accuracy.
+#
+# Usage:
+#   python -m chatbot.rules --thresholds 0.7 0.85 0.95
+#   python -m chatbot.rules --data labelled.jsonl --no-model
+#   python -m chatbot.rules --generated --seed 2024
+
+import argparse
+import gzip
+import json
+import math
+import sys
+
+from .config import INTENTS, SENTIMENTS
+from .keyword_matcher import KeywordMatcher
+from .normalizer import normalize_fa
+
+# Indicative keywords per intent with their score.
+# 3.0 = strong evidence on its own, 1.5 = supporting evidence.
+INTENT_KEYWORDS = {
+    "support_issue": {
+        "خراب": 3.0, "خرابی": 3.0, "قطع": 3.0, "کار نمیکنه": 3.0, "کار نمی‌کنه": 3.0,
+        "مشکل": 1.5, "رسیدگی": 1.5, "نشتی": 3.0,
+    },
+    "facility_reservation": {
+        "رزرو": 3.0, "زمان خالی": 3.0, "وقت خالی": 3.0,
+    },
+    "operation_status": {
+        "وضعیت": 3.0, "پیگیری": 1.5, "حل شد": 3.0, "حل نشده": 3.0,
+        "انجام شد": 3.0, "انجام میشه": 3.0, "درخواست من": 1.5,
+    },
+    "financial_inquiry": {
+        "شارژ": 3.0, "بدهی": 3.0, "فاکتور": 3.0, "پرداخت": 1.5, "مبلغ": 1.5, "قبض": 3.0,
+    },
+}
+
+# Keywords that signal a sentiment; anything else is neutral
+SENTIMENT_KEYWORDS = {
+    "negative": ["ناراحت", "چرا", "هنوز", "عصبانی", "افتضاح", "زیاد شده", "اعتراض"],
+    "positive": ["عالی", "ممنون", "مرسی", "راضی"],
+}
+
+# Probability mass given to the detected sentiment
+SENTIMENT_CONFIDENCE = 0.9
+
+
+class RuleClassifier:
+    """
+    Keyword scorer for intent and sentiment.
+
+    - Intent keywords are summed per intent and turned into
+      probabilities with a softmax (intents without hits score 0)
+    - classify() returns (intent_prob, sentiment_prob, confidence)
+      with lists ordered like INTENTS / SENTIMENTS
+    """
+    def __init__(self, intent_keywords=INTENT_KEYWORDS, sentiment_keywords=SENTIMENT_KEYWORDS):
+        self.matcher = KeywordMatcher()
+        for intent, words in intent_keywords.items():
+            for word, score in words.items():
+                self.matcher.add(word, ("intent", INTENTS.index(intent), score))
+        for sentiment, words in sentiment_keywords.items():
+            self.matcher.add_all(words, ("sentiment", SENTIMENTS.index(sentiment), 1.0))
+        self.matcher.build()
+
+    def classify(self, text: str):
+        """Score a normalized text; confidence is the top intent probability."""
+        intent_scores = [0.0] * len(INTENTS)
+        sent_hits = [0] * len(SENTIMENTS)
+        for m in self.matcher.find(text):
+            kind, idx, score = m.label
+            if kind == "intent":
+                intent_scores[idx] += score
+            else:
+                sent_hits[idx] += 1
+
+        top = max(intent_scores)
+        exps = [math.exp(s - top) for s in intent_scores]
+        total = sum(exps)
+        intent_prob = [e / total for e in exps]
+
+        # Negative wins over positive; no hit means neutral
+        neutral = SENTIMENTS.index("neutral")
+        sent_idx = next((i for i in (SENTIMENTS.index("negative"), SENTIMENTS.index("positive")) if sent_hits[i]),
+                        neutral)
+        rest = (1.0 - SENTIMENT_CONFIDENCE) / (len(SENTIMENTS) - 1)
+        sent_prob = [SENTIMENT_CONFIDENCE if i == sent_idx else rest for i in range(len(SENTIMENTS))]
+
+        confidence = max(intent_prob) if top > 0 else 0.0
+        return intent_prob, sent_prob, confidence
+
+
+# -----------------------------
+# Held-out evaluation
+# -----------------------------
+def load_labelled(path: str) -> list:
+    """
+    (text, intent, sentiment) records from a JSONL file (optionally .gz)
+    of {"text", "intent", "sentiment"} objects or [text, intent, sentiment]
+    arrays (the data_generator shard format).
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                records.append((r["text"], r["intent"], r["sentiment"]) if isinstance(r, dict) else tuple(r[:3]))
+    return records
+
+
+def evaluate_rules(records: list, thresholds, predict_batch=None, rules: RuleClassifier = None) -> list:
+    """
+    Per threshold: fraction of messages the tier would answer (coverage)
+    and the rules' intent/sentiment accuracy on them; with
+    `predict_batch` (a model-only Chatbot.predict_batch), also the model's
+    accuracy on the same messages.
+    """
+    rules = rules or RuleClassifier()
+    scored = []
+    for text, intent, sentiment in records:
+        intent_prob, sent_prob, confidence = rules.classify(normalize_fa(text))
+        scored.append((confidence, INTENTS[intent_prob.index(max(intent_prob))],
+                       SENTIMENTS[sent_prob.index(max(sent_prob))], intent, sentiment))
+    model = predict_batch([r[0] for r in records]) if predict_batch is not None else None
+
+    report = []
+    for t in thresholds:
+        hits = [i for i, s in enumerate(scored) if s[0] >= t]
+        n = len(hits)
+        row = {
+            "threshold": t,
+            "coverage": n / len(records) if records else 0.0,
+            "messages": n,
+            "rule_intent_acc": sum(scored[i][1] == scored[i][3] for i in hits) / n if n else None,
+            "rule_sent_acc": sum(scored[i][2] == scored[i][4] for i in hits) / n if n else None,
+        }
+        if model is not None:
+            row["model_intent_acc"] = sum(model[i]["intent"] == scored[i][3] for i in hits) / n if n else None
+            row["model_sent_acc"] = sum(model[i]["sentiment"] == scored[i][4] for i in hits) / n if n else None
+        report.append(row)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the keyword rule tier on labelled data")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--data", default=None, help="labelled JSONL file (default: chatbot/test.py samples)")
+    source.add_argument("--generated", action="store_true",
+                        help="data_generator templates (in-distribution: overstates accuracy)")
+    parser.add_argument("--per-intent", type=int, default=500, help="generated samples per intent")
+    parser.add_argument("--seed", type=int, default=2024, help="generator seed (the trainer uses 42)")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.85, 0.95])
+    parser.add_argument("--model", default=None, help="checkpoint to compare against")
+    parser.add_argument("--no-model", action="store_true", help="rules only (skip the model)")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    if args.data:
+        records, source = load_labelled(args.data), args.data
+    elif args.generated:
+        from .data_generator import generate_dataset
+        records = [row[:3] for row in generate_dataset(total_per_intent=args.per_intent, seed=args.seed)]
+        source = f"generate_dataset(seed={args.seed}), in-distribution"
+    else:
+        from .test import TEST_SAMPLES, Y_TRUE_INTENT, Y_TRUE_SENT
+        records, source = list(zip(TEST_SAMPLES, Y_TRUE_INTENT, Y_TRUE_SENT)), "chatbot/test.py samples"
+
+    predict_batch = None
+    if not args.no_model:
+        from .chatbot_core import Chatbot
+        bot = Chatbot(cache_size=0, rule_threshold=None)
+        bot.load_models(model_path=args.model, verify=False)
+        predict_batch = bot.predict_batch
+
+    report = evaluate_rules(records, args.thresholds, predict_batch)
+    print(f"Rule tier on {len(records)} messages: {source}")
+    if args.generated:
+        print("⚠️ Generated data shares the templates the keywords were written from; "
+              "accuracy is in-distribution and overstates real-world accuracy")
+    print(f"{'threshold':>10}{'coverage':>10}{'rule int':>10}{'rule sent':>11}{'model int':>11}{'model sent':>12}")
+    fmt = lambda v: f"{v:.3f}" if v is not None else "-"
+    for r in report:
+        print(f"{r['threshold']:>10.2f}{r['coverage']:>10.3f}{fmt(r['rule_intent_acc']):>10}"
+              f"{fmt(r['rule_sent_acc']):>11}{fmt(r.get('model_intent_acc')):>11}{fmt(r.get('model_sent_acc')):>12}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "records": len(records), "results": report}, f, indent=2)
+        print(f"✅ Report saved to: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
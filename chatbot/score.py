@@ -0,0 +1,276 @@
+# Offline bulk scoring of message logs.
+# Streams a JSONL or CSV file (optionally .gz) through worker processes
+# that each load the model once, and writes one result per input record
+# (record index, optional id, intent, sentiment, probabilities,
+# entities) as JSONL or CSV in input order; blank lines are skipped and
+# unparsable records get an "error" instead of a prediction.
+# Only a bounded number of chunks is in flight, so memory stays constant
+# regardless of the input size.
+# Progress is recorded next to the output after every written chunk;
+# --resume truncates the output to the last recorded chunk and skips the
+# records already scored.
+#
+# Usage:
+#   python -m chatbot.score messages.jsonl scored.jsonl --workers 4
+#   python -m chatbot.score messages.csv.gz scored.csv --text-field body --id-field id
+#   python -m chatbot.score messages.jsonl scored.jsonl --resume
+
+import argparse
+import csv
+import gzip
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Columns of CSV output (probabilities and entities as JSON strings)
+CSV_COLUMNS = ["index", "id", "intent", "sentiment", "intent_prob", "sentiment_prob", "entities", "error"]
+
+# Set in each worker process by _init_worker()
+_BOT = None
+_OPTIONS = None
+
+
+# -----------------------------
+# Input / output formats
+# -----------------------------
+def file_format(path: str, override: str = None) -> str:
+    """"jsonl" or "csv", from `override` or the file extension."""
+    if override:
+        return override
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+def _open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def iter_records(path: str, fmt: str):
+    """
+    Input records one at a time: raw lines for JSONL (parsed by the
+    workers), dicts for CSV (the header row names the columns).
+    """
+    with _open_text(path, "r") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def _format_rows(rows: list, fmt: str) -> str:
+    if fmt == "jsonl":
+        return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        writer.writerow([
+            r["index"], r.get("id", ""), r.get("intent", ""), r.get("sentiment", ""),
+            json.dumps(r["intent_prob"]) if "intent_prob" in r else "",
+            json.dumps(r["sentiment_prob"]) if "sentiment_prob" in r else "",
+            json.dumps(r["entities"], ensure_ascii=False) if "entities" in r else "",
+            r.get("error", ""),
+        ])
+    return buf.getvalue()
+
+
+def _format_header() -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(CSV_COLUMNS)
+    return buf.getvalue().encode("utf-8")
+
+
+# -----------------------------
+# Worker processes
+# -----------------------------
+def _init_worker(model_path, threads: int, options: dict):
+    global _BOT, _OPTIONS
+    import torch
+    from .chatbot_core import Chatbot
+
+    torch.set_num_threads(threads)
+    _BOT = Chatbot()
+    _BOT.load_models(model_path=model_path, verify=False)
+    _OPTIONS = options
+
+
+def _score_chunk(start: int, records: list) -> str:
+    """Score records numbered from `start`; returns the formatted output text."""
+    text_field, id_field = _OPTIONS["text_field"], _OPTIONS["id_field"]
+    rows, texts, scored = [], [], []
+    for index, record in enumerate(records, start):
+        row = {"index": index}
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            if id_field is not None and id_field in record:
+                row["id"] = record[id_field]
+            text = record[text_field]
+            if not isinstance(text, str):
+                raise ValueError(f"{text_field!r} is not a string")
+        except (ValueError, KeyError, TypeError) as e:
+            row["error"] = f"bad record: {e!r}"
+        else:
+            texts.append(text)
+            scored.append(row)
+        rows.append(row)
+
+    for row, result in zip(scored, _BOT.predict_batch(texts, batch_size=_OPTIONS["batch_size"])):
+        row.update({
+            "intent": result["intent"],
+            "sentiment": result["sentiment"],
+            "intent_prob": result["intent_prob"],
+            "sentiment_prob": result["sentiment_prob"],
+            "entities": result["entities"],
+        })
+    return _format_rows(rows, _OPTIONS["out_format"])
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def _progress_path(out_path: str) -> str:
+    return out_path + ".progress"
+
+
+def _load_progress(out_path: str, input_path: str) -> dict:
+    path = _progress_path(out_path)
+    if not os.path.exists(path) or not os.path.exists(out_path):
+        return {"records": 0, "bytes": 0, "done": False}
+    with open(path, encoding="utf-8") as f:
+        progress = json.load(f)
+    if progress.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"{path} belongs to another input file: {progress.get('input')}")
+    return progress
+
+
+def _save_progress(out_path: str, progress: dict):
+    path = _progress_path(out_path)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+    os.replace(path + ".tmp", path)
+
+
+def score_file(input_path: str, out_path: str, workers: int = 2, threads: int = None, chunk_size: int = 256,
+               batch_size: int = 64, max_in_flight: int = None, text_field: str = "text", id_field: str = None,
+               in_format: str = None, out_format: str = None, model_path: str = None,
+               resume: bool = False) -> dict:
+    """
+    Score every record of `input_path` into `out_path`.
+
+    - Records are sent to the workers in chunks of `chunk_size`; at most
+      `max_in_flight` chunks (default 2 per worker) are queued or running
+    - Results are written in input order as each leading chunk completes
+    - With resume, scoring continues after the last completed chunk of
+      an earlier run on the same files
+    Returns a summary with record counts and throughput.
+    """
+    in_format = file_format(input_path, in_format)
+    out_format = file_format(out_path, out_format)
+    if out_path.endswith(".gz"):
+        raise ValueError("Compressed output can't be resumed; write plain JSONL/CSV instead.")
+    workers = max(1, workers)
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    max_in_flight = max_in_flight or 2 * workers
+
+    progress = _load_progress(out_path, input_path) if resume else {"records": 0, "bytes": 0, "done": False}
+    progress["input"] = os.path.abspath(input_path)
+    if progress["done"]:
+        print(f"✅ {out_path} is already complete ({progress['records']} records)")
+        return {"records": progress["records"], "scored": 0, "seconds": 0.0, "records_per_sec": 0.0}
+
+    # Drop anything written after the last recorded chunk
+    out = open(out_path, "r+b" if progress["records"] else "wb")
+    out.truncate(progress["bytes"])
+    out.seek(progress["bytes"])
+    if not progress["records"] and out_format == "csv":
+        out.write(_format_header())
+    skipped = progress["records"]
+    if skipped:
+        print(f"✅ Resuming after {skipped} records")
+
+    records = itertools.islice(iter_records(input_path, in_format), skipped, None)
+    options = {"text_field": text_field, "id_field": id_field, "batch_size": batch_size, "out_format": out_format}
+    ctx = multiprocessing.get_context("spawn")
+    t0 = time.perf_counter()
+    scored = 0
+    pending = deque()
+    pool = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                               initargs=(model_path, threads, options))
+    try:
+        start = skipped
+        while True:
+            # Keep the pool busy without reading ahead of it
+            while len(pending) < max_in_flight:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                pending.append((len(chunk), pool.submit(_score_chunk, start, chunk)))
+                start += len(chunk)
+            if not pending:
+                break
+
+            n, future = pending.popleft()
+            out.write(future.result().encode("utf-8"))
+            out.flush()
+            scored += n
+            progress.update(records=progress["records"] + n, bytes=out.tell())
+            _save_progress(out_path, progress)
+            elapsed = time.perf_counter() - t0
+            print(f"\r{progress['records']} records | {scored / elapsed:.0f}/s", end="", flush=True)
+        print()
+        progress["done"] = True
+        _save_progress(out_path, progress)
+    finally:
+        # On interruption, queued chunks are dropped; --resume redoes them
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        out.close()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "records": progress["records"],
+        "scored": scored,
+        "seconds": elapsed,
+        "records_per_sec": scored / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a JSONL/CSV message log with the chatbot model")
+    parser.add_argument("input", help="JSONL or CSV file, optionally gzip-compressed (.gz)")
+    parser.add_argument("output", help="JSONL or CSV file (by extension)")
+    parser.add_argument("--model", default=None, help="checkpoint path (defaults to the served model)")
+    parser.add_argument("--text-field", default="text", help="JSON key / CSV column holding the message")
+    parser.add_argument("--id-field", default=None, help="JSON key / CSV column copied to the output")
+    parser.add_argument("--in-format", choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--out-format", choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads per worker")
+    parser.add_argument("--chunk-size", type=int, default=256, help="records per worker task")
+    parser.add_argument("--batch-size", type=int, default=64, help="texts per forward pass")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="chunks queued or running (default 2 per worker)")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run")
+    args = parser.parse_args(argv)
+
+    summary = score_file(args.input, args.output, workers=args.workers, threads=args.threads,
+                         chunk_size=args.chunk_size, batch_size=args.batch_size, max_in_flight=args.max_in_flight,
+                         text_field=args.text_field, id_field=args.id_field, in_format=args.in_format,
+                         out_format=args.out_format, model_path=args.model, resume=args.resume)
+    print(f"✅ Scored {summary['scored']} records in {summary['seconds']:.1f}s "
+          f"({summary['records_per_sec']:.0f}/s), {summary['records']} total in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
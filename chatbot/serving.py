@@ -0,0 +1,274 @@
+# Serving helpers for simple_chat_server.py.
+# PooledHTTPServer serves HTTP/1.1 keep-alive connections from a bounded
+# thread pool with timeouts and graceful shutdown.
+# prefork(): the parent process loads the model once (memory-mapped
+# weights, or weights moved to shared memory) and forks N workers that
+# serve from the same listening socket. Workers share the weights
+# read-only instead of each loading a copy.
+
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+from .config import (
+    HTTP_WORKERS, HTTP_MAX_QUEUED, HTTP_KEEPALIVE_TIMEOUT, HTTP_REQUEST_TIMEOUT, HTTP_SHUTDOWN_GRACE
+)
+
+# Sent on connections refused because the pool and its queue are full
+_BUSY_BODY = json.dumps({"error": "Server busy, please retry"}).encode("utf-8")
+_BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: application/json; charset=utf-8\r\n"
+    b"Content-Length: " + str(len(_BUSY_BODY)).encode("ascii") + b"\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n\r\n" + _BUSY_BODY
+)
+
+
+# -----------------------------
+# Pooled keep-alive HTTP server
+# -----------------------------
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server handing each connection to a bounded thread pool.
+
+    - `workers` threads serve connections; up to `max_queued` more
+      connections wait for a thread, further ones are answered 503
+    - With a PooledRequestHandler (protocol_version "HTTP/1.1"),
+      connections are kept alive between requests; idle ones are closed
+      after `keepalive_timeout` seconds, and socket reads/writes within a
+      request time out after `request_timeout` seconds
+    - serve() runs until SIGTERM/SIGINT and then shuts down gracefully:
+      no new connections, idle keep-alive connections closed, running
+      requests given `grace` seconds to finish
+    """
+    def __init__(self, address, handler_class, workers: int = HTTP_WORKERS, max_queued: int = HTTP_MAX_QUEUED,
+                 keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT, request_timeout: float = HTTP_REQUEST_TIMEOUT,
+                 grace: float = HTTP_SHUTDOWN_GRACE):
+        if workers < 1 or max_queued < 0:
+            raise ValueError("workers must be >= 1 and max_queued >= 0")
+        super().__init__(address, handler_class)
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.grace = grace
+        self.draining = False
+        self.rejected = 0
+
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self._lock = threading.Lock()
+        self._connections = 0  # queued + being served
+        self._idle = set()     # kept-alive sockets waiting for their next request
+        self._drainer = None
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            accept = not self.draining and self._connections < self.workers + self.max_queued
+            if accept:
+                self._connections += 1
+            else:
+                self.rejected += 1
+        if not accept:
+            self._reject(request)
+            return
+        self.pool.submit(self._serve_connection, request, client_address)
+
+    def _serve_connection(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except (socket.timeout, ConnectionError):
+            pass  # slow or vanished client
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._lock:
+                self._idle.discard(request)
+                self._connections -= 1
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        try:
+            request.settimeout(1.0)
+            request.sendall(_BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    # Called by PooledRequestHandler around each request
+    def mark_idle(self, sock) -> bool:
+        """Record a connection waiting for its next request; False while draining."""
+        with self._lock:
+            if self.draining:
+                return False
+            self._idle.add(sock)
+            return True
+
+    def mark_busy(self, sock):
+        with self._lock:
+            self._idle.discard(sock)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "connections": self._connections,
+                "idle_connections": len(self._idle),
+                "rejected": self.rejected,
+                "draining": self.draining,
+            }
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def shutdown_gracefully(self):
+        """Stop serving and drain connections (not from the serve_forever() thread)."""
+        with self._lock:
+            self.draining = True
+            idle = list(self._idle)
+        self.shutdown()
+        for sock in idle:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        deadline = time.monotonic() + self.grace
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._connections:
+                    break
+            time.sleep(0.05)
+        with self._lock:
+            left = self._connections
+        if left:
+            print(f"⚠️ Shutdown grace period over, {left} connections still open")
+        self.pool.shutdown(wait=False)
+        self.server_close()
+
+    def serve(self):
+        """serve_forever() until SIGTERM/SIGINT, then shut down gracefully."""
+        def on_signal(signum, frame):
+            if self._drainer is None:
+                self._drainer = threading.Thread(target=self.shutdown_gracefully, name="http-drain", daemon=True)
+                self._drainer.start()
+
+        previous = {sig: signal.signal(sig, on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.serve_forever()
+            if self._drainer is not None:
+                self._drainer.join()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+
+class PooledRequestHandler:
+    """
+    Mixin for BaseHTTPRequestHandler subclasses served by PooledHTTPServer:
+    HTTP/1.1 keep-alive, per-phase socket timeouts, no Nagle delay
+    (headers and body are written separately), and connections closed
+    after the current request while the server drains.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle_one_request(self):
+        # Waiting for the (next) request line: idle keep-alive timeout.
+        # While draining, accepted connections still get their first request
+        kept_alive = getattr(self, "_kept_alive", False)
+        if not self.server.mark_idle(self.connection) and kept_alive:
+            self.close_connection = True
+            return
+        self._kept_alive = True
+        self.connection.settimeout(self.server.keepalive_timeout)
+        super().handle_one_request()
+
+    def parse_request(self):
+        self.server.mark_busy(self.connection)
+        self.connection.settimeout(self.server.request_timeout)
+        ok = super().parse_request()
+        if self.server.draining:
+            self.close_connection = True
+        return ok
+
+
+def worker_threads(workers: int) -> int:
+    """Torch intra-op threads per worker so workers don't oversubscribe cores."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def prefork(serve, workers: int, on_worker_start=None):
+    """
+    Fork `workers` child processes that each call serve(worker_id).
+
+    - Call after loading the model and binding the server socket
+    - gc.freeze() keeps the inherited model/vocab objects out of the
+      garbage collector so their pages stay shared (copy-on-write)
+    - Workers that crash (non-zero exit) are restarted
+    - SIGINT/SIGTERM to the parent stop all workers
+    Only available on platforms with os.fork().
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork serving requires os.fork() (POSIX only).")
+
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            # Child: restore default signal handling and serve until killed
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                if on_worker_start is not None:
+                    on_worker_start(worker_id)
+                serve(worker_id)
+            except KeyboardInterrupt:
+                pass
+            except Exception:
+                sys.excepthook(*sys.exc_info())
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id = children.pop(pid, None)
+        if worker_id is not None and status != 0 and not stopping:
+            print(f"⚠️ Worker {worker_id} (pid {pid}) exited with status {status}, restarting")
+            spawn(worker_id)
@@ -0,0 +1,192 @@
+# Hyperparameter sweep over model sizes.
+# Trains every combination of the given architecture settings in
+# parallel worker processes (CPU threads are split between them), then
+# measures each model's accuracy (validation split and the presentation
+# samples in chatbot/test.py), inference latency and parameter count,
+# and reports the Pareto frontier of latency against accuracy.
+#
+# Usage:
+#   python -m chatbot.dataset data/tokens
+#   python -m chatbot.sweep --dataset data/tokens --hidden-dim 64 128 192 --num-layers 1 2
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .config import EMBED_DIM, HIDDEN_DIM, NUM_LAYERS, DROPOUT
+
+
+# -----------------------------
+# Trial execution (worker processes)
+# -----------------------------
+def _init_worker(threads: int):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _evaluate(model_path: str, latency_samples: int, seed: int) -> dict:
+    # Neural model only: no cache, no rule tier
+    from .benchmark import build_workload, time_calls
+    from .chatbot_core import Chatbot
+    from .test import TEST_SAMPLES, Y_TRUE_INTENT, Y_TRUE_SENT
+
+    bot = Chatbot(cache_size=0, rule_threshold=None)
+    bot.load_models(model_path=model_path, verify=False, mmap=False)
+
+    results = bot.predict_batch(TEST_SAMPLES)
+    n = len(TEST_SAMPLES)
+    latency = time_calls(bot.predict, build_workload(latency_samples, seed=seed))
+    return {
+        "params": sum(p.numel() for p in bot.model.parameters()),
+        "test_intent_acc": sum(r["intent"] == t for r, t in zip(results, Y_TRUE_INTENT)) / n,
+        "test_sent_acc": sum(r["sentiment"] == t for r, t in zip(results, Y_TRUE_SENT)) / n,
+        "latency_p50_ms": latency["p50_ms"],
+        "latency_p95_ms": latency["p95_ms"],
+        "predict_per_sec": latency["items_per_sec"],
+    }
+
+
+def _run_trial(trial: dict) -> dict:
+    from .trainer import train_and_save
+
+    # Keep the per-trial training output out of the shared console
+    with open(trial["log_path"], "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        summary = train_and_save(model_path=trial["model_path"], model_config=trial["model_config"],
+                                 **trial["train_kwargs"])
+    best = summary["best_epoch"] or {}
+    result = {
+        "trial": trial["trial"],
+        "model_config": trial["model_config"],
+        "model_path": trial["model_path"],
+        "epochs_run": summary["epochs_run"],
+        "train_seconds": summary["total_seconds"],
+        "train_samples_per_sec": summary["samples_per_sec"],
+        "val_loss": summary["best_val_loss"],
+        "val_intent_acc": best.get("val_intent_acc", 0.0),
+        "val_sent_acc": best.get("val_sent_acc", 0.0),
+    }
+    result.update(_evaluate(trial["model_path"], trial["latency_samples"], trial["seed"]))
+    return result
+
+
+# -----------------------------
+# Sweep driver
+# -----------------------------
+def build_grid(embed_dims, hidden_dims, num_layers, dropouts) -> list:
+    """All combinations of the given architecture settings."""
+    return [
+        {"embed_dim": e, "hidden_dim": h, "num_layers": n, "dropout": d}
+        for e, h, n, d in itertools.product(embed_dims, hidden_dims, num_layers, dropouts)
+    ]
+
+
+def accuracy(result: dict) -> float:
+    """Single accuracy score used for ranking: mean validation accuracy."""
+    return (result["val_intent_acc"] + result["val_sent_acc"]) / 2
+
+
+def pareto_frontier(results: list, latency_key: str = "latency_p50_ms") -> list:
+    """
+    Trials not dominated by any other trial, fastest first:
+    no other trial is both at least as fast and more accurate.
+    """
+    frontier = []
+    best = float("-inf")
+    for r in sorted(results, key=lambda r: (r[latency_key], -accuracy(r))):
+        if accuracy(r) > best:
+            frontier.append(r)
+            best = accuracy(r)
+    return frontier
+
+
+def run_sweep(grid: list, out_dir: str, workers: int = 2, threads: int = None,
+              latency_samples: int = 500, seed: int = 42, **train_kwargs) -> dict:
+    """
+    Train and evaluate every model config in `grid`.
+    `threads` is the torch thread count per worker (default: CPU cores
+    split evenly); remaining keyword arguments go to train_and_save().
+    Returns {"results": [...], "frontier": [...]} and writes results.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers, len(grid)))
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    train_kwargs.setdefault("seed", seed)
+
+    trials = [
+        {
+            "trial": i,
+            "model_config": cfg,
+            "model_path": os.path.join(out_dir, f"trial-{i:03d}.pt"),
+            "log_path": os.path.join(out_dir, f"trial-{i:03d}.log"),
+            "latency_samples": latency_samples,
+            "seed": seed,
+            "train_kwargs": train_kwargs,
+        }
+        for i, cfg in enumerate(grid)
+    ]
+    print(f"✅ Sweep: {len(trials)} trials, {workers} workers x {threads} threads")
+
+    # Spawned workers: no torch thread pools inherited from the parent
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(threads,)) as pool:
+        for result in pool.map(_run_trial, trials):
+            results.append(result)
+            print(f"[{result['trial']:03d}] {result['model_config']} | acc={accuracy(result):.3f} | "
+                  f"p50={result['latency_p50_ms']:.2f}ms | params={result['params']}")
+
+    report = {"grid": grid, "train_kwargs": train_kwargs, "results": results,
+              "frontier": [r["trial"] for r in pareto_frontier(results)]}
+    with open(os.path.join(out_dir, "results.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_frontier(report: dict):
+    by_trial = {r["trial"]: r for r in report["results"]}
+    print("===================================")
+    print("✅ Pareto frontier (latency vs accuracy)")
+    print("===================================")
+    print(f"{'trial':<7}{'embed':>7}{'hidden':>8}{'layers':>8}{'params':>10}"
+          f"{'p50 ms':>9}{'val int':>9}{'val sent':>10}{'test int':>10}{'test sent':>11}")
+    for t in report["frontier"]:
+        r = by_trial[t]
+        c = r["model_config"]
+        print(f"{t:<7}{c['embed_dim']:>7}{c['hidden_dim']:>8}{c['num_layers']:>8}{r['params']:>10}"
+              f"{r['latency_p50_ms']:>9.2f}{r['val_intent_acc']:>9.3f}{r['val_sent_acc']:>10.3f}"
+              f"{r['test_intent_acc']:>10.3f}{r['test_sent_acc']:>11.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep over model sizes")
+    parser.add_argument("--out", default="models/sweep")
+    parser.add_argument("--embed-dim", type=int, nargs="+", default=[EMBED_DIM])
+    parser.add_argument("--hidden-dim", type=int, nargs="+", default=[HIDDEN_DIM])
+    parser.add_argument("--num-layers", type=int, nargs="+", default=[NUM_LAYERS])
+    parser.add_argument("--dropout", type=float, nargs="+", default=[DROPOUT])
+    parser.add_argument("--dataset", default=None, help="pre-tokenized dataset dir (chatbot.dataset)")
+    parser.add_argument("--per-intent", type=int, default=500, help="samples per intent (without --dataset)")
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--lr", type=float, default=0.003)
+    parser.add_argument("--workers", type=int, default=2, help="trials trained in parallel")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads per worker")
+    parser.add_argument("--latency-samples", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    grid = build_grid(args.embed_dim, args.hidden_dim, args.num_layers, args.dropout)
+    report = run_sweep(grid, args.out, args.workers, args.threads, args.latency_samples, args.seed,
+                       dataset_dir=args.dataset, total_per_intent=args.per_intent,
+                       epochs=args.epochs, lr=args.lr)
+    print_frontier(report)
+    print(f"✅ Results saved to: {os.path.join(args.out, 'results.json')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
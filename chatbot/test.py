@@ -6,6 +6,43 @@ import torch
 from chatbot import chatbot, load_models
 from chatbot.config import INTENTS, SENTIMENTS
 
+# Sample test sentences used for qualitative and quantitative evaluation
+TEST_SAMPLES = [
+    "آسانسور خراب شده و خیلی ناراحتم",
+    "آب قطع است لطفاً سریع رسیدگی کنید",
+    "برق پارکینگ قطع شده",
+    "دوربین مداربسته لابی کار نمیکنه",
+    "استخر را برای فردا رزرو کن",
+    "سالن را برای جمعه رزرو میخواهم",
+    "باشگاه رو برای امروز میخوام",
+    "زمان خالی سالن رو بهم بگو",
+    "وضعیت تعمیرات آسانسور چیست؟",
+    "درخواست من انجام شد؟",
+    "چرا درخواست من هنوز حل نشده؟",
+    "پیگیری وضعیت خدمات واحد من",
+    "شارژ پرداخت شده؟",
+    "بدهی من چقدر است؟",
+    "مبلغ شارژ این ماه زیاد شده و ناراحتم",
+    "فاکتور این ماه رو میخوام"
+]
+
+# Ground-truth intent labels for evaluation
+Y_TRUE_INTENT = [
+    "support_issue", "support_issue", "support_issue", "support_issue",
+    "facility_reservation", "facility_reservation", "facility_reservation", "facility_reservation",
+    "operation_status", "operation_status", "operation_status", "operation_status",
+    "financial_inquiry", "financial_inquiry", "financial_inquiry", "financial_inquiry"
+]
+
+# Ground-truth sentiment labels for evaluation
+Y_TRUE_SENT = [
+    "negative", "negative", "negative", "negative",
+    "neutral", "neutral", "neutral", "neutral",
+    "neutral", "neutral", "negative", "neutral",
+    "neutral", "neutral", "negative", "neutral"
+]
+
+
 def main():
     print("\n==============================")
     print("✅ Presentation Test STARTED")
@@ -15,41 +52,9 @@ def main():
     load_models()
     print("✅ Models loaded successfully\n")
 
-    # Sample test sentences used for qualitative and quantitative evaluation
-    test_samples = [
-        "آسانسور خراب شده و خیلی ناراحتم",
-        "آب قطع است لطفاً سریع رسیدگی کنید",
-        "برق پارکینگ قطع شده",
-        "دوربین مداربسته لابی کار نمیکنه",
-        "استخر را برای فردا رزرو کن",
-        "سالن را برای جمعه رزرو میخواهم",
-        "باشگاه رو برای امروز میخوام",
-        "زمان خالی سالن رو بهم بگو",
-        "وضعیت تعمیرات آسانسور چیست؟",
-        "درخواست من انجام شد؟",
-        "چرا درخواست من هنوز حل نشده؟",
-        "پیگیری وضعیت خدمات واحد من",
-        "شارژ پرداخت شده؟",
-        "بدهی من چقدر است؟",
-        "مبلغ شارژ این ماه زیاد شده و ناراحتم",
-        "فاکتور این ماه رو میخوام"
-    ]
-
-    # Ground-truth intent labels for evaluation
-    y_true_intent = [
-        "support_issue", "support_issue", "support_issue", "support_issue",
-        "facility_reservation", "facility_reservation", "facility_reservation", "facility_reservation",
-        "operation_status", "operation_status", "operation_status", "operation_status",
-        "financial_inquiry", "financial_inquiry", "financial_inquiry", "financial_inquiry"
-    ]
-
-    # Ground-truth sentiment labels for evaluation
-    y_true_sent = [
-        "negative", "negative", "negative", "negative",
-        "neutral", "neutral", "neutral", "neutral",
-        "neutral", "neutral", "negative", "neutral",
-        "neutral", "neutral", "negative", "neutral"
-    ]
+    test_samples = TEST_SAMPLES
+    y_true_intent = Y_TRUE_INTENT
+    y_true_sent = Y_TRUE_SENT
 
     preds_intent = []
     preds_sent = []
@@ -111,7 +116,7 @@ def main():
 
     print("\n==============================")
     print("✅ Presentation Test FINISHED")
-print("==============================\n")
+    print("==============================\n")
 
-if name == "__main__":
+if __name__ == "__main__":
     main()
@@ -1,25 +1,40 @@
 # Simple word-level tokenizer.
 # This module is responsible for text normalization,
 # vocabulary construction, and encoding text into fixed-length sequences.
+# HashingTokenizer bounds the vocabulary: frequent words get their own
+# index, everything else is hashed into a fixed number of buckets.
 
-import re
+import zlib
+from array import array
+from collections import Counter
+
+from .config import TOKENIZER, HASH_BUCKETS, MIN_FREQ, MAX_VOCAB
+from .normalizer import NORMALIZER_VERSION, get_normalizer
+
+# Zero-width non-joiner, separates Persian suffixes (‌ها, ‌ام, ...)
+ZWNJ = "\u200c"
 
 class Tokenizer:
-    def init(self):
+    def __init__(self, normalizer: int = NORMALIZER_VERSION):
         # Mapping from tokens to indices
         # <pad>: padding token, <unk>: unknown token
         self.word2idx = {"<pad>": 0, "<unk>": 1}
         self.idx2word = {0: "<pad>", 1: "<unk>"}
+        # Bound lookup of the frozen vocabulary (see freeze())
+        self._lookup = None
+        # Normalizer version the vocabulary was fitted with
+        self.normalizer = normalizer
+        self._normalize = get_normalizer(normalizer)
 
-    def _normalize(self, text: str) -> str:
-        # Normalize input text by trimming whitespace
-        # and collapsing multiple spaces into one
-        text = text.strip()
-        text = re.sub(r"\s+", " ", text)
-        return text
+    def model_text(self, text: str, normalized: str) -> str:
+        # Text to encode for the model: the pipeline's normalized text, or
+        # the raw text normalized like this (older) vocabulary was fitted
+        return normalized if self.normalizer == NORMALIZER_VERSION else self._normalize(text)
 
     def fit(self, texts):
         # Build vocabulary from a list of input texts
+        if self._lookup is not None:
+            raise RuntimeError("Tokenizer vocabulary is frozen.")
         for t in texts:
             t = self._normalize(t)
             for w in t.split():
@@ -28,11 +43,166 @@ class Tokenizer:
                     self.word2idx[w] = idx
                     self.idx2word[idx] = w
 
-    def encode(self, text, max_len: int):
+    def encode(self, text, max_len: int, return_length: bool = False, normalized: bool = False):
         # Convert text into a list of token indices
         # Applies padding or truncation to match max_len
-        text = self._normalize(text)
-        ids = [self.word2idx.get(w, 1) for w in text.split()]
+        # With return_length=True, also returns the number of real
+        # (non-pad) tokens, for variable-length inference
+        # normalized=True skips normalization of already normalized text
+        if not normalized:
+            text = self._normalize(text)
+        lookup = self._lookup or self.word2idx.get
+        ids = [lookup(w, 1) for w in text.split()]
+        length = min(len(ids), max_len)
         if len(ids) < max_len:
             ids += [0] * (max_len - len(ids))
+        if return_length:
+            return ids[:max_len], length
         return ids[:max_len]
+
+    @property
+    def vocab_size(self) -> int:
+        # Number of embedding rows the model needs
+        return len(self.word2idx)
+
+    def to_config(self) -> dict:
+        # Settings stored in checkpoints next to the vocabulary
+        return {"type": "word", "normalizer": self.normalizer}
+
+    def freeze(self):
+        # Freeze the vocabulary for inference / batch encoding:
+        # a compact, insertion-ordered copy with a pre-bound lookup.
+        # fit() is no longer allowed afterwards.
+        self.word2idx = dict(self.word2idx)
+        self._lookup = self.word2idx.get
+        return self
+
+    def encode_batch(self, texts, max_len: int, trim: bool = False):
+        # Encode many texts at once into a preallocated int64 buffer.
+        # Returns (ids [N, T] LongTensor, lengths [N] LongTensor) where
+        # T = max_len, or the longest text in the batch if trim=True.
+        # Texts must already be normalized (see model_text()), as done
+        # once per message by Chatbot.
+        import torch
+
+        lookup = self._lookup or self.word2idx.get
+        rows = []
+        lengths = array("q")
+        for t in texts:
+            ids = [lookup(w, 1) for w in t.split()[:max_len]]
+            rows.append(ids)
+            lengths.append(len(ids))
+
+        width = max(lengths, default=0) if trim else max_len
+        width = max(width, 1)
+        buf = array("q", bytes(8 * width * len(rows)))
+        for r, ids in enumerate(rows):
+            if ids:
+                start = r * width
+                buf[start:start + len(ids)] = array("q", ids)
+
+        # Zero-copy views on the filled buffers
+        x = torch.frombuffer(buf, dtype=torch.long).view(len(rows), width) if rows \
+            else torch.zeros((0, width), dtype=torch.long)
+        lens = torch.frombuffer(lengths, dtype=torch.long) if rows else torch.zeros(0, dtype=torch.long)
+        return x, lens
+
+
+class HashingTokenizer(Tokenizer):
+    """
+    Word tokenizer with a bounded vocabulary.
+
+    - fit() keeps only words seen at least `min_freq` times,
+      at most `max_vocab` of them (most frequent first)
+    - A word outside the vocabulary whose stem (text before a ZWNJ
+      suffix) is known maps to the stem
+    - Any other word is hashed (crc32, stable across processes) into
+      one of `num_buckets` shared rows instead of collapsing to <unk>
+    - Buckets start right after the fitted vocabulary; freeze() fixes
+      that offset and checkpoints store it in the tokenizer settings
+    The embedding table size is therefore bounded: at most
+    2 + max_vocab + num_buckets rows.
+    """
+    def __init__(self, num_buckets: int = HASH_BUCKETS, min_freq: int = MIN_FREQ, max_vocab: int = MAX_VOCAB,
+                 bucket_offset: int = None, normalizer: int = NORMALIZER_VERSION):
+        super().__init__(normalizer)
+        if num_buckets < 1:
+            raise ValueError("num_buckets must be >= 1")
+        self.num_buckets = num_buckets
+        self.min_freq = min_freq
+        self.max_vocab = max_vocab
+        # Index of the first hash bucket (None: after the vocabulary)
+        self.bucket_offset = bucket_offset
+
+    def fit(self, texts):
+        # Count words, then keep the frequent ones only
+        if self._lookup is not None:
+            raise RuntimeError("Tokenizer vocabulary is frozen.")
+        counts = Counter(w for t in texts for w in self._normalize(t).split())
+        kept = [w for w, c in counts.most_common() if c >= self.min_freq and w not in self.word2idx]
+        for w in kept[:self.max_vocab]:
+            idx = len(self.word2idx)
+            self.word2idx[w] = idx
+            self.idx2word[idx] = w
+
+    @property
+    def _offset(self) -> int:
+        return len(self.word2idx) if self.bucket_offset is None else self.bucket_offset
+
+    @property
+    def vocab_size(self) -> int:
+        # Hash buckets sit right after the explicit vocabulary
+        return self._offset + self.num_buckets
+
+    def to_config(self) -> dict:
+        return {
+            "type": "hashing",
+            "num_buckets": self.num_buckets,
+            "min_freq": self.min_freq,
+            "max_vocab": self.max_vocab,
+            "bucket_offset": self._offset,
+            "normalizer": self.normalizer,
+        }
+
+    def freeze(self):
+        super().freeze()
+        if self.bucket_offset is None:
+            self.bucket_offset = len(self.word2idx)
+        self._lookup = self._hashed_lookup
+        return self
+
+    def _hashed_lookup(self, word: str, default: int = 1) -> int:
+        # Vocabulary word, known stem, or hash bucket (default is unused:
+        # every word gets a non-<unk> index)
+        idx = self.word2idx.get(word)
+        if idx is not None:
+            return idx
+        if ZWNJ in word:
+            idx = self.word2idx.get(word.split(ZWNJ, 1)[0])
+            if idx is not None:
+                return idx
+        return self.bucket_offset + zlib.crc32(word.encode("utf-8")) % self.num_buckets
+
+
+def create_tokenizer(kind: str = TOKENIZER, **kwargs) -> Tokenizer:
+    # Build an empty tokenizer of the configured kind ("word" or "hashing")
+    if kind == "word":
+        return Tokenizer(**kwargs)
+    if kind == "hashing":
+        return HashingTokenizer(**kwargs)
+    raise ValueError(f"Unknown tokenizer type: {kind}")
+
+
+def tokenizer_from_checkpoint(checkpoint: dict) -> Tokenizer:
+    # Rebuild the (frozen) tokenizer stored in a training checkpoint.
+    # Checkpoints without tokenizer settings use the plain word tokenizer;
+    # without a normalizer version, the original normalization (1).
+    config = dict(checkpoint.get("tokenizer", {"type": "word"}))
+    config.setdefault("normalizer", 1)
+    if config["type"] == "hashing":
+        # Older hashing checkpoints put the buckets after max_vocab
+        config.setdefault("bucket_offset", 2 + config.get("max_vocab", MAX_VOCAB))
+    tokenizer = create_tokenizer(config.pop("type"), **config)
+    tokenizer.word2idx = dict(checkpoint["vocab"])
+    tokenizer.idx2word = {i: w for w, i in tokenizer.word2idx.items()}
+    return tokenizer.freeze()
@@ -1,28 +1,46 @@
 # Training pipeline for the chatbot model.
-# This module handles dataset generation, tokenization,
-# model training, validation, early stopping, and model persistence.
+# This module handles dataset generation (in memory or streamed from
+# on-disk shards), tokenization, model training, validation, early
+# stopping, and model persistence. distill_and_save() trains a compact
+# student model on the soft targets of an existing checkpoint.
+# NumPy is needed by chatbot.dataset, which is imported only for shard
+# or pre-tokenized training and for length bucketing
+# (BUCKET_POOL_BATCHES > 0); in-memory training with bucketing disabled
+# runs on torch alone.
 
 import os
 import random
-from pathlib import Path
+import time
 
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.data import DataLoader, IterableDataset, TensorDataset, default_collate
 
-from .config import DEVICE, MAX_LEN, MODEL_PATH, INTENTS, SENTIMENTS
-from .tokenizer import Tokenizer
-from .model import ChatbotModel
-from .data_generator import generate_dataset
+from .config import (
+    DEVICE, MAX_LEN, MODEL_PATH, VARIABLE_LENGTH, INTENTS, SENTIMENTS,
+    TRAIN_BATCH_SIZE, GRAD_ACCUM_STEPS, TRAIN_NUM_WORKERS, PIN_MEMORY, BUCKET_POOL_BATCHES,
+    STUDENT_PATH, DISTILL_TEMPERATURE, DISTILL_ALPHA,
+)
+from .tokenizer import create_tokenizer, tokenizer_from_checkpoint
+from .normalizer import NORMALIZER_VERSION, normalize_fa
+from .model import ChatbotModel, build_model
+from .optimize import model_size_bytes
+from .checkpoint import export_checkpoint
+from .data_generator import generate_dataset, load_manifest, read_shard
 
-def train_and_save(total_per_intent=500, epochs=40, lr=0.003, val_ratio=0.2, seed=42):
-    # Entry point for training the chatbot model
-    print("===================================")
-    print("✅ Training STARTED")
-    print("===================================")
-    
-    # Ensure model output directory exists
-    os.makedirs("models", exist_ok=True)
+
+def _save_checkpoint(checkpoint, path):
+    # Write to a temporary file and rename it into place, so a serving
+    # process that memory-maps or hot-reloads `path` never sees a
+    # half-written file (the old inode stays valid for existing maps)
+    tmp = f"{path}.tmp"
+    torch.save(checkpoint, tmp)
+    os.replace(tmp, path)
+
+
+def _in_memory_datasets(total_per_intent, val_ratio, seed, tokenizer=None):
+    # Generate the synthetic dataset in memory and build tensor datasets
+    # (a given, already frozen tokenizer is used as is)
     random.seed(seed)
 
     # Generate synthetic training dataset
@@ -37,33 +55,148 @@ def train_and_save(total_per_intent=500, epochs=40, lr=0.003, val_ratio=0.2, see
     val_rows = rows[:val_size]
     train_rows = rows[val_size:]
 
+    # Normalize once, exactly like inference does
+    train_rows = [(normalize_fa(t), *rest) for t, *rest in train_rows]
+    val_rows = [(normalize_fa(t), *rest) for t, *rest in val_rows]
     train_texts = [r[0] for r in train_rows]
     val_texts = [r[0] for r in val_rows]
 
     # Initialize and fit tokenizer on all available texts
-    tokenizer = Tokenizer()
-    tokenizer.fit(train_texts + val_texts)
-    print(f"Vocab size: {len(tokenizer.word2idx)}")
-    print(f"Epochs: {epochs} | lr: {lr}")
-    print("-----------------------------------")
+    if tokenizer is None:
+        tokenizer = create_tokenizer()
+        tokenizer.fit(train_texts + val_texts)
+        tokenizer.freeze()
 
     def build_xy(rws):
         # Convert raw samples into tensors suitable for training
-        X = torch.tensor([tokenizer.encode(t, MAX_LEN) for t, _, _, _ in rws], dtype=torch.long)
+        X, L = tokenizer.encode_batch([t for t, _, _, _ in rws], MAX_LEN)
         y_int = torch.tensor([INTENTS.index(intent) for _, intent, _, _ in rws], dtype=torch.long)
         y_sent = torch.tensor([SENTIMENTS.index(sent) for *_, sent, _ in rws], dtype=torch.long)
-        return X, y_int, y_sent
+        return X, L, y_int, y_sent
 
     # Build training and validation tensors
-    Xtr, ytr_i, ytr_s = build_xy(train_rows)
-    Xva, yva_i, yva_s = build_xy(val_rows)
+    Xtr, Ltr, ytr_i, ytr_s = build_xy(train_rows)
+    Xva, Lva, yva_i, yva_s = build_xy(val_rows)
+
+    return tokenizer, TensorDataset(Xtr, Ltr, ytr_i, ytr_s), TensorDataset(Xva, Lva, yva_i, yva_s)
+
+
+def _shard_datasets(shards_dir, val_ratio, seed, tokenizer=None):
+    # Stream shards written by data_generator.write_shards();
+    # the first shards are held out for validation
+    from .dataset import ShardDataset
+
+    manifest = load_manifest(shards_dir)
+    files = [os.path.join(shards_dir, f) for f in manifest["files"]]
+    if len(files) < 2:
+        raise ValueError("Shard training needs at least 2 shards (train + validation).")
+    n_val = min(len(files) - 1, max(1, round(len(files) * val_ratio)))
+    val_files, train_files = files[:n_val], files[n_val:]
+    shard_size = manifest["shard_size"]
+    print(f"Train samples: {len(train_files) * shard_size} | Val samples: {len(val_files) * shard_size} "
+          f"({len(files)} shards)")
+
+    # Fit the tokenizer in one streaming pass over the shards
+    if tokenizer is None:
+        tokenizer = create_tokenizer()
+        tokenizer.fit(normalize_fa(text) for path in files for text, _, _ in read_shard(path))
+        tokenizer.freeze()
+
+    train_ds = ShardDataset(train_files, tokenizer, MAX_LEN, shuffle=True, seed=seed)
+    return tokenizer, train_ds, ShardDataset(val_files, tokenizer, MAX_LEN)
+
+
+def _token_datasets(dataset_dir):
+    # Memory-mapped, pre-tokenized corpus from dataset.build_token_dataset();
+    # the split and the tokenizer were fixed when it was built
+    from .dataset import TokenDataset, load_token_meta, load_token_tokenizer
+
+    meta = load_token_meta(dataset_dir)
+    if meta["max_len"] != MAX_LEN:
+        raise ValueError(f"Dataset was built with max_len={meta['max_len']}, config has MAX_LEN={MAX_LEN}.")
+    tokenizer = load_token_tokenizer(dataset_dir)
+    train_ds, val_ds = TokenDataset(dataset_dir, "train"), TokenDataset(dataset_dir, "val")
+    print(f"Train samples: {len(train_ds)} | Val samples: {len(val_ds)} (pre-tokenized)")
+    return tokenizer, train_ds, val_ds
+
+
+def _trim_collate(batch):
+    """
+    Collate (ids, length, intent, sentiment) samples and cut the padded
+    ids to the longest sequence in the batch (for variable-length models).
+    """
+    x, lengths, intents, sentiments = default_collate(batch)
+    width = max(int(lengths.max()), 1) if len(lengths) else 1
+    return x[:, :width], lengths, intents, sentiments
+
+
+def _make_loader(dataset, shuffle, seed, batch_size, num_workers, pin_memory):
+    # Length-bucketed batches for map-style datasets with known lengths;
+    # streamed shards are batched in arrival order (they shuffle themselves)
+    kwargs = {
+        "num_workers": num_workers,
+        "pin_memory": pin_memory,
+        "persistent_workers": num_workers > 0,
+        "collate_fn": _trim_collate if VARIABLE_LENGTH else None,
+    }
+    if isinstance(dataset, TensorDataset):
+        lengths = dataset.tensors[1].tolist()
+    else:
+        lengths = getattr(dataset, "lengths", None)
 
-    # Create PyTorch data loaders
-    train_loader = DataLoader(TensorDataset(Xtr, ytr_i, ytr_s), batch_size=16, shuffle=True)
-    val_loader = DataLoader(TensorDataset(Xva, yva_i, yva_s), batch_size=16, shuffle=False)
+    if isinstance(dataset, IterableDataset):
+        return DataLoader(dataset, batch_size=batch_size, **kwargs)
+    if lengths is not None and BUCKET_POOL_BATCHES > 0:
+        from .dataset import BucketBatchSampler
+
+        sampler = BucketBatchSampler(lengths, batch_size, shuffle=shuffle,
+                                     pool_batches=BUCKET_POOL_BATCHES, seed=seed)
+        return DataLoader(dataset, batch_sampler=sampler, **kwargs)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, **kwargs)
+
+
+def _set_epoch(loader, epoch):
+    # Reseed epoch-aware samplers / streaming datasets
+    for obj in (loader.batch_sampler, loader.dataset):
+        if hasattr(obj, "set_epoch"):
+            obj.set_epoch(epoch)
+
+
+def train_and_save(total_per_intent=500, epochs=40, lr=0.003, val_ratio=0.2, seed=42, shards_dir=None,
+                   dataset_dir=None, batch_size=TRAIN_BATCH_SIZE, accum_steps=GRAD_ACCUM_STEPS,
+                   num_workers=TRAIN_NUM_WORKERS, pin_memory=PIN_MEMORY, model_config=None,
+                   model_path=MODEL_PATH):
+    # Entry point for training the chatbot model
+    # With shards_dir, data is streamed from on-disk shards instead of
+    # being generated in memory (total_per_intent is then ignored)
+    # With dataset_dir, a pre-tokenized dataset is memory-mapped and
+    # training starts immediately (val_ratio is fixed at build time)
+    # model_config overrides the architecture sizes from config.py
+    # (embed_dim, hidden_dim, num_layers, dropout) and is stored in
+    # the checkpoint written to model_path
+    # Returns a summary dict with per-epoch losses, validation accuracy,
+    # wall-clock times and training throughput (samples/sec)
+    print("===================================")
+    print("✅ Training STARTED")
+    print("===================================")
+    
+    # Ensure model output directory exists
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+
+    if dataset_dir is not None:
+        tokenizer, train_ds, val_ds = _token_datasets(dataset_dir)
+    elif shards_dir is not None:
+        tokenizer, train_ds, val_ds = _shard_datasets(shards_dir, val_ratio, seed)
+    else:
+        tokenizer, train_ds, val_ds = _in_memory_datasets(total_per_intent, val_ratio, seed)
+    train_loader = _make_loader(train_ds, True, seed, batch_size, num_workers, pin_memory)
+    val_loader = _make_loader(val_ds, False, seed, batch_size, num_workers, pin_memory)
+    print(f"Vocab size: {len(tokenizer.word2idx)} | Embedding rows: {tokenizer.vocab_size}")
+    print(f"Epochs: {epochs} | lr: {lr} | batch: {batch_size} x {accum_steps} accum | workers: {num_workers}")
+    print("-----------------------------------")
 
     # Initialize model and optimizer
-    model = ChatbotModel(vocab_size=len(tokenizer.word2idx)).to(DEVICE)
+    model = ChatbotModel(vocab_size=tokenizer.vocab_size, **(model_config or {})).to(DEVICE)
     opt = torch.optim.AdamW(model.parameters(), lr=lr, weight_decay=1e-4)
 
     # Cross-entropy losses with label smoothing for better generalization
@@ -74,46 +207,90 @@ def train_and_save(total_per_intent=500, epochs=40, lr=0.003, val_ratio=0.2, see
     best_val = float('inf')
     patience = 6
     bad_epochs = 0
+    best_epoch = None
+    history = []
+    non_blocking = pin_memory and DEVICE.type == "cuda"
 
     for ep in range(epochs):
         # Training phase
         model.train()
-        total = 0.0
-        for xb, yi, ys in train_loader:
-            xb, yi, ys = xb.to(DEVICE), yi.to(DEVICE), ys.to(DEVICE)
-            opt.zero_grad()
-            li, ls, _ = model(xb)
+        _set_epoch(train_loader, ep)
+        ep_start = time.perf_counter()
+        # Losses stay on the device; synced once per epoch
+        total = torch.zeros((), device=DEVICE)
+        n_batches = 0
+        n_samples = 0
+        opt.zero_grad()
+        for step, (xb, lb, yi, ys) in enumerate(train_loader, 1):
+            xb, yi, ys = (t.to(DEVICE, non_blocking=non_blocking) for t in (xb, yi, ys))
+            li, ls, _ = model(xb, lb if VARIABLE_LENGTH else None)
             loss = loss_fn_int(li, yi) + loss_fn_sent(ls, ys)
-            loss.backward()
+            (loss / accum_steps).backward()
+            if step % accum_steps == 0:
+                torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+                opt.step()
+                opt.zero_grad()
+            total += loss.detach()
+            n_batches += 1
+            n_samples += yi.size(0)
+        if n_batches % accum_steps:
+            # Apply the gradients of a trailing partial accumulation
             torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
             opt.step()
-            total += loss.item()
-        train_loss = total / max(1, len(train_loader))
+            opt.zero_grad()
+        train_loss = total.item() / max(1, n_batches)
+        train_seconds = time.perf_counter() - ep_start
 
         # Validation phase
         model.eval()
-        vtotal = 0.0
+        vtotal = torch.zeros((), device=DEVICE)
+        vcorrect = torch.zeros(2, device=DEVICE)
+        n_val_batches = 0
+        n_val_samples = 0
         with torch.no_grad():
-            for xb, yi, ys in val_loader:
-                xb, yi, ys = xb.to(DEVICE), yi.to(DEVICE), ys.to(DEVICE)
-                li, ls, _ = model(xb)
-                vloss = loss_fn_int(li, yi) + loss_fn_sent(ls, ys)
-                vtotal += vloss.item()
-        val_loss = vtotal / max(1, len(val_loader))
+            for xb, lb, yi, ys in val_loader:
+                xb, yi, ys = (t.to(DEVICE, non_blocking=non_blocking) for t in (xb, yi, ys))
+                li, ls, _ = model(xb, lb if VARIABLE_LENGTH else None)
+                vtotal += loss_fn_int(li, yi) + loss_fn_sent(ls, ys)
+                vcorrect[0] += (li.argmax(1) == yi).sum()
+                vcorrect[1] += (ls.argmax(1) == ys).sum()
+                n_val_batches += 1
+                n_val_samples += yi.size(0)
+        val_loss = vtotal.item() / max(1, n_val_batches)
+        val_intent_acc, val_sent_acc = (vcorrect / max(1, n_val_samples)).tolist()
+        epoch_seconds = time.perf_counter() - ep_start
+
+        history.append({
+            "epoch": ep,
+            "train_loss": train_loss,
+            "val_loss": val_loss,
+            "val_intent_acc": val_intent_acc,
+            "val_sent_acc": val_sent_acc,
+            "train_samples": n_samples,
+            "train_seconds": train_seconds,
+            "epoch_seconds": epoch_seconds,
+            "samples_per_sec": n_samples / train_seconds if train_seconds > 0 else 0.0,
+        })
 
         # Periodic logging
         if ep % 5 == 0 or ep == epochs-1:
-            print(f"Epoch {ep:03d} | TrainLoss={train_loss:.4f} | ValLoss={val_loss:.4f}")
+            print(f"Epoch {ep:03d} | TrainLoss={train_loss:.4f} | ValLoss={val_loss:.4f} | "
+                  f"{epoch_seconds:.1f}s | {history[-1]['samples_per_sec']:.0f} samples/s")
           
         # Early stopping and model checkpointing
         if val_loss < best_val - 1e-4:
             best_val = val_loss
+            best_epoch = history[-1]
             bad_epochs = 0
-            torch.save(
-                {"model_state": model.state_dict(),
+            _save_checkpoint(
+                {"arch": "gru",
+                 "model_state": model.state_dict(),
+                 "model_config": model.model_config,
                  "vocab": tokenizer.word2idx,
-                 "max_len": MAX_LEN},
-                MODEL_PATH
+                 "tokenizer": tokenizer.to_config(),
+                 "max_len": MAX_LEN,
+                 "variable_length": VARIABLE_LENGTH},
+                model_path
             )
         else:
             bad_epochs += 1
@@ -121,7 +298,219 @@ def train_and_save(total_per_intent=500, epochs=40, lr=0.003, val_ratio=0.2, see
                 print("✅ Early stopping activated.")
                 break
 
+    train_time = sum(h["train_seconds"] for h in history)
+    summary = {
+        "best_val_loss": best_val,
+        "best_epoch": best_epoch,
+        "model_config": model.model_config,
+        "model_path": model_path,
+        "epochs_run": len(history),
+        "batch_size": batch_size,
+        "accum_steps": accum_steps,
+        "num_workers": num_workers,
+        "total_seconds": sum(h["epoch_seconds"] for h in history),
+        "samples_per_sec": sum(h["train_samples"] for h in history) / train_time if train_time > 0 else 0.0,
+        "history": history,
+    }
+
+    # Flat, memory-mappable copy for fast serving cold start
+    flat_dir = export_checkpoint(model_path)
+
     print("-----------------------------------")
-    print(f"✅ Best model saved to: {MODEL_PATH}")
+    print(f"✅ Best model saved to: {model_path} (flat: {flat_dir})")
+    print(f"Throughput: {summary['samples_per_sec']:.0f} samples/s | Total time: {summary['total_seconds']:.1f}s")
     print("✅ Training FINISHED")
     print("===================================")
+    return summary
+
+
+# -----------------------------
+# Knowledge distillation
+# -----------------------------
+def _distill_loss(student_logits, teacher_logits, labels, temperature, alpha):
+    # Hard-label cross-entropy blended with KL divergence to the
+    # teacher's temperature-softened distribution (scaled by T^2)
+    soft = nn.functional.kl_div(
+        torch.log_softmax(student_logits / temperature, dim=1),
+        torch.softmax(teacher_logits / temperature, dim=1),
+        reduction="batchmean",
+    ) * temperature ** 2
+    hard = nn.functional.cross_entropy(student_logits, labels)
+    return alpha * hard + (1 - alpha) * soft
+
+
+def _forward_latency_ms(model, loader, max_samples=200):
+    # Mean single-message forward latency over validation samples
+    samples = []
+    for xb, lb, _, _ in loader:
+        samples.extend(zip(xb.split(1), lb.split(1)))
+        if len(samples) >= max_samples:
+            break
+    samples = samples[:max_samples]
+    with torch.no_grad():
+        for x, lens in samples[:10]:
+            model(x.to(DEVICE), lens if VARIABLE_LENGTH else None)
+        start = time.perf_counter()
+        for x, lens in samples:
+            model(x.to(DEVICE), lens if VARIABLE_LENGTH else None)
+    return (time.perf_counter() - start) / max(1, len(samples)) * 1000
+
+
+def _evaluate_pair(teacher, student, loader):
+    # Accuracy of both models and student/teacher argmax agreement
+    correct = torch.zeros(6, device=DEVICE)
+    n = 0
+    with torch.no_grad():
+        for xb, lb, yi, ys in loader:
+            xb, yi, ys = xb.to(DEVICE), yi.to(DEVICE), ys.to(DEVICE)
+            lens = lb if VARIABLE_LENGTH else None
+            ti, ts, _ = teacher(xb, lens)
+            si, ss, _ = student(xb, lens)
+            correct += torch.stack([
+                (ti.argmax(1) == yi).sum(), (ts.argmax(1) == ys).sum(),
+                (si.argmax(1) == yi).sum(), (ss.argmax(1) == ys).sum(),
+                (si.argmax(1) == ti.argmax(1)).sum(), (ss.argmax(1) == ts.argmax(1)).sum(),
+            ]).float()
+            n += yi.size(0)
+    keys = ["teacher_intent_acc", "teacher_sent_acc", "student_intent_acc", "student_sent_acc",
+            "intent_agreement", "sentiment_agreement"]
+    return dict(zip(keys, (correct / max(1, n)).tolist()))
+
+
+def distill_and_save(teacher_path=MODEL_PATH, student_path=STUDENT_PATH, student_config=None,
+                     total_per_intent=500, epochs=30, lr=0.003, val_ratio=0.2, seed=42,
+                     shards_dir=None, dataset_dir=None, batch_size=TRAIN_BATCH_SIZE,
+                     num_workers=TRAIN_NUM_WORKERS, pin_memory=PIN_MEMORY,
+                     temperature=DISTILL_TEMPERATURE, alpha=DISTILL_ALPHA):
+    # Train a CompactChatbotModel student on the soft intent/sentiment
+    # targets of the teacher checkpoint at teacher_path.
+    # The student reuses the teacher's tokenizer, so it is a drop-in
+    # replacement: Chatbot.load_models(model_path=student_path) serves it.
+    # Returns a report comparing teacher and student accuracy, agreement,
+    # parameter count, serialized size and single-message latency.
+    print("===================================")
+    print("✅ Distillation STARTED")
+    print("===================================")
+
+    checkpoint = torch.load(teacher_path, map_location=DEVICE, weights_only=False)
+    tokenizer = tokenizer_from_checkpoint(checkpoint)
+    if tokenizer.normalizer != NORMALIZER_VERSION:
+        raise ValueError(f"Teacher vocabulary was fitted with normalizer version {tokenizer.normalizer}; "
+                         f"retrain the teacher (current version: {NORMALIZER_VERSION}).")
+    teacher = build_model(checkpoint.get("arch", "gru"), tokenizer.vocab_size,
+                          **checkpoint.get("model_config", {})).to(DEVICE)
+    teacher.load_state_dict(checkpoint["model_state"])
+    teacher.eval()
+
+    if dataset_dir is not None:
+        from .dataset import load_token_meta
+
+        if load_token_meta(dataset_dir)["vocab"] != tokenizer.word2idx:
+            raise ValueError("Pre-tokenized dataset was built with a different vocabulary than the teacher.")
+        _, train_ds, val_ds = _token_datasets(dataset_dir)
+    elif shards_dir is not None:
+        _, train_ds, val_ds = _shard_datasets(shards_dir, val_ratio, seed, tokenizer)
+    else:
+        _, train_ds, val_ds = _in_memory_datasets(total_per_intent, val_ratio, seed, tokenizer)
+    train_loader = _make_loader(train_ds, True, seed, batch_size, num_workers, pin_memory)
+    val_loader = _make_loader(val_ds, False, seed, batch_size, num_workers, pin_memory)
+
+    os.makedirs(os.path.dirname(student_path) or ".", exist_ok=True)
+    student = build_model("compact", tokenizer.vocab_size, **(student_config or {})).to(DEVICE)
+    opt = torch.optim.AdamW(student.parameters(), lr=lr, weight_decay=1e-4)
+    print(f"Teacher: {teacher_path} | Student config: {student.model_config}")
+    print(f"Epochs: {epochs} | lr: {lr} | T: {temperature} | alpha: {alpha}")
+    print("-----------------------------------")
+
+    best_val = float('inf')
+    patience = 6
+    bad_epochs = 0
+    non_blocking = pin_memory and DEVICE.type == "cuda"
+
+    for ep in range(epochs):
+        student.train()
+        _set_epoch(train_loader, ep)
+        total = torch.zeros((), device=DEVICE)
+        n_batches = 0
+        for xb, lb, yi, ys in train_loader:
+            xb, yi, ys = (t.to(DEVICE, non_blocking=non_blocking) for t in (xb, yi, ys))
+            lens = lb if VARIABLE_LENGTH else None
+            with torch.no_grad():
+                ti, ts, _ = teacher(xb, lens)
+            si, ss, _ = student(xb, lens)
+            loss = (_distill_loss(si, ti, yi, temperature, alpha)
+                    + _distill_loss(ss, ts, ys, temperature, alpha))
+            opt.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(student.parameters(), 1.0)
+            opt.step()
+            total += loss.detach()
+            n_batches += 1
+        train_loss = total.item() / max(1, n_batches)
+
+        # Validation: same blended loss against the teacher
+        student.eval()
+        vtotal = torch.zeros((), device=DEVICE)
+        n_val_batches = 0
+        with torch.no_grad():
+            for xb, lb, yi, ys in val_loader:
+                xb, yi, ys = xb.to(DEVICE), yi.to(DEVICE), ys.to(DEVICE)
+                lens = lb if VARIABLE_LENGTH else None
+                ti, ts, _ = teacher(xb, lens)
+                si, ss, _ = student(xb, lens)
+                vtotal += (_distill_loss(si, ti, yi, temperature, alpha)
+                           + _distill_loss(ss, ts, ys, temperature, alpha))
+                n_val_batches += 1
+        val_loss = vtotal.item() / max(1, n_val_batches)
+
+        if ep % 5 == 0 or ep == epochs-1:
+            print(f"Epoch {ep:03d} | TrainLoss={train_loss:.4f} | ValLoss={val_loss:.4f}")
+
+        if val_loss < best_val - 1e-4:
+            best_val = val_loss
+            bad_epochs = 0
+            _save_checkpoint(
+                {"arch": "compact",
+                 "model_state": student.state_dict(),
+                 "model_config": student.model_config,
+                 "vocab": tokenizer.word2idx,
+                 "tokenizer": tokenizer.to_config(),
+                 "max_len": checkpoint.get("max_len", MAX_LEN),
+                 "variable_length": VARIABLE_LENGTH,
+                 "distilled_from": str(teacher_path)},
+                student_path
+            )
+        else:
+            bad_epochs += 1
+            if bad_epochs >= patience:
+                print("✅ Early stopping activated.")
+                break
+
+    # Compare the best student with the teacher
+    student.load_state_dict(torch.load(student_path, map_location=DEVICE, weights_only=False)["model_state"])
+    student.eval()
+    report = _evaluate_pair(teacher, student, val_loader)
+    report.update({
+        "teacher_params": sum(p.numel() for p in teacher.parameters()),
+        "student_params": sum(p.numel() for p in student.parameters()),
+        "teacher_bytes": model_size_bytes(teacher),
+        "student_bytes": model_size_bytes(student),
+        "teacher_latency_ms": _forward_latency_ms(teacher, val_loader),
+        "student_latency_ms": _forward_latency_ms(student, val_loader),
+        "student_path": student_path,
+    })
+
+    flat_dir = export_checkpoint(student_path)
+
+    print("-----------------------------------")
+    print(f"✅ Student saved to: {student_path} (flat: {flat_dir})")
+    print(f"Intent acc: teacher {report['teacher_intent_acc']:.2%} -> student {report['student_intent_acc']:.2%} "
+          f"(agreement {report['intent_agreement']:.2%})")
+    print(f"Sentiment acc: teacher {report['teacher_sent_acc']:.2%} -> student {report['student_sent_acc']:.2%} "
+          f"(agreement {report['sentiment_agreement']:.2%})")
+    print(f"Params: {report['teacher_params']} -> {report['student_params']} | "
+          f"Size: {report['teacher_bytes'] / 1e6:.2f}MB -> {report['student_bytes'] / 1e6:.2f}MB | "
+          f"Latency: {report['teacher_latency_ms']:.3f}ms -> {report['student_latency_ms']:.3f}ms")
+    print("✅ Distillation FINISHED")
+    print("===================================")
+    return report
@@ -1,16 +1,70 @@
 # FastAPI-based REST service for the chatbot system.
 # This file exposes prediction endpoints and mock APIs
 # intended for integration with a frontend dashboard.
+# The model stack (torch) is imported and loaded in a background thread
+# at startup; /api/ready reports readiness and cold-start timings.
 
-from fastapi import FastAPI, HTTPException
+import time
+
+# Cold-start reference point reported by /api/ready
+STARTED = time.perf_counter()
+
+import asyncio
+import hmac
+import threading
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
-from chatbot.chatbot_core import ChatBot  # Main chatbot class
+from chatbot.batch_api import NDJSON_TYPE, BatchRequestError, check_length, parse_batch, split_chunks, score_chunk
+from chatbot.batcher import MicroBatcher
+from chatbot.checkpoint import resolve_model_path
+from chatbot.config import ADMIN_TOKEN
+from chatbot.executor import InferenceExecutor, QueueFullError
+from chatbot.metrics import METRICS, CONTENT_TYPE, chatbot_collector, batcher_collector, executor_collector
+
+# Inference runs off the event loop on a bounded pool with backpressure
+inference = InferenceExecutor()
+METRICS.register_collector(executor_collector(inference))
+
+# Set by load_chatbot()
+chatbot = None
+batcher = None
+READY = threading.Event()
+STARTUP = {}
+
+
+def load_chatbot():
+    # Import the model stack and load the weights, recording cold-start timings
+    global chatbot, batcher
+    t0 = time.perf_counter()
+    from chatbot.chatbot_core import chatbot as instance
+    t1 = time.perf_counter()
+    instance.load_models()
+
+    chatbot = instance
+    # Concurrent chat requests are coalesced into batched forward passes
+    batcher = MicroBatcher(chatbot, pool=inference.pool)
+    METRICS.register_collector(chatbot_collector(chatbot))
+    METRICS.register_collector(batcher_collector(batcher))
+    STARTUP.update({
+        "import_s": t1 - t0,
+        "load_s": time.perf_counter() - t1,
+        "ready_s": time.perf_counter() - STARTED,
+        "load": chatbot.load_timings,
+    })
+    READY.set()
+
+
+def require_admin(token):
+    # Admin endpoints are disabled unless CHATBOT_ADMIN_TOKEN is set
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints disabled (set CHATBOT_ADMIN_TOKEN)")
+    if token is None or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
 
-# Initialize chatbot with the trained model
-chatbot = ChatBot(model_path="models/chatbot.pt")
 
 app = FastAPI(title="Operations Dashboard API")
 
@@ -26,6 +80,13 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     text: str
 
+class ReloadRequest(BaseModel):
+    path: Optional[str] = None
+
+class ProfileRequest(BaseModel):
+    calls: Optional[int] = None
+    timeout: Optional[float] = None
+
 class ChatResponse(BaseModel):
     intent: str
     sentiment: str
@@ -40,19 +101,134 @@ async def chat_endpoint(request: ChatRequest):
     # Validate non-empty input
     if not request.text.strip():
         raise HTTPException(status_code=400, detail="Empty text provided")
+    if not READY.is_set():
+        raise HTTPException(status_code=503, detail="Model is loading, please retry",
+                            headers={"Retry-After": "1"})
     
-    # Run chatbot prediction
-    result = chatbot.predict(request.text)
+    # Run chatbot prediction through the micro-batcher without blocking
+    # the event loop; reject with 503 when too many requests are pending
+    try:
+        with METRICS.in_flight(), METRICS.stage("request"):
+            result = await inference.run_future(batcher.submit, request.text)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Chat service busy, please retry",
+                            headers={"Retry-After": "1"})
     
     return ChatResponse(
         intent=result['intent'],
         sentiment=result['sentiment'],
         entities=result.get('entities', {}),
         intent_prob=result.get('intent_prob', []),
-        sent_prob=result.get('sent_prob', []),
-        response_text=result.get('response', None)
+        sent_prob=result.get('sentiment_prob', []),
+        response_text=result.get('response_text', None)
     )
 
+@app.post("/api/chat/batch")
+async def chat_batch_endpoint(request: Request):
+    # Batch inference: JSON array or NDJSON body of messages; one NDJSON
+    # result line per message, streamed back after each model batch
+    try:
+        check_length(request.headers.get("content-length"))
+        if not READY.is_set():
+            raise BatchRequestError("Model is loading, please retry", status=503)
+        items = parse_batch(await request.body(), request.headers.get("content-type", ""))
+    except BatchRequestError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+
+    # First chunk before answering, so a full queue is still a 503
+    chunks = split_chunks(items)
+    try:
+        first = await inference.run(score_chunk, chatbot.predict_batch, next(chunks))
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Chat service busy, please retry",
+                            headers={"Retry-After": "1"})
+
+    async def stream():
+        with METRICS.in_flight():
+            yield first
+            for chunk in chunks:
+                # Later chunks wait for queue space instead of failing mid-stream
+                yield await inference.run_waiting(score_chunk, chatbot.predict_batch, chunk)
+
+    return StreamingResponse(stream(), media_type=NDJSON_TYPE)
+
+@app.get("/api/health")
+async def health():
+    # Liveness: the process is up and serving HTTP
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+async def ready():
+    # Readiness: model loaded; includes cold-start timings
+    if not READY.is_set():
+        return JSONResponse({"ready": False, **STARTUP}, status_code=503)
+    return {"ready": True, **STARTUP}
+
+@app.get("/api/chat/stats")
+async def chat_stats():
+    # Micro-batching, cache, executor and classification tier counters for latency/throughput tuning
+    if not READY.is_set():
+        raise HTTPException(status_code=503, detail="Model is loading")
+    cache = chatbot.cache.stats() if chatbot.cache is not None else None
+    return {**batcher.stats(), "cache": cache, "executor": inference.stats(), "tiers": chatbot.tier_stats(),
+            "model_version": chatbot.model_version, "reload": chatbot.reload_stats}
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus scrape endpoint: stage latency histograms, gauges, counters
+    if not METRICS.enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(METRICS.render(), media_type=CONTENT_TYPE)
+
+@app.post("/api/admin/reload")
+async def reload_model(request: ReloadRequest = None, x_admin_token: Optional[str] = Header(None)):
+    # Hot model reload: load + warm up next to the served model, then swap;
+    # chat requests keep being answered meanwhile
+    require_admin(x_admin_token)
+    if not READY.is_set():
+        raise HTTPException(status_code=503, detail="Model is loading")
+    path = request.path if request is not None else None
+    try:
+        # Checkpoints are unpickled: only files under config.MODELS_ROOT
+        path = resolve_model_path(path) if path is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # Off the event loop and off the inference pool
+        return await asyncio.get_running_loop().run_in_executor(None, chatbot.reload, path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, current model kept: {e!r}")
+
+@app.post("/api/admin/profile", status_code=202)
+async def start_profile(request: ProfileRequest = None, x_admin_token: Optional[str] = Header(None)):
+    # Profile the next N predictions (torch profiler + Python stack samples);
+    # files are written under config.PROFILE_DIR when the window closes
+    require_admin(x_admin_token)
+    if not READY.is_set():
+        raise HTTPException(status_code=503, detail="Model is loading")
+    options = {}
+    if request is not None:
+        # pydantic v2 (model_dump), v1 fallback (dict)
+        dump = getattr(request, "model_dump", None) or request.dict
+        options = dump(exclude_none=True)
+    try:
+        return chatbot.start_profile(**options).status()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/admin/profile")
+async def profile_status(x_admin_token: Optional[str] = Header(None)):
+    # Status and output files of the open or last profiling window
+    require_admin(x_admin_token)
+    if not READY.is_set():
+        raise HTTPException(status_code=503, detail="Model is loading")
+    status = chatbot.profile_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No profiling window started")
+    return status
+
 # ---------- Mock / Placeholder Endpoints ----------
 @app.get("/api/tasks")
 async def get_tasks():
@@ -91,6 +267,24 @@ async def get_notifications():
         {"id": 2, "title": "New Task Assigned", "message": "You have been assigned a new task", "notification_type": "task"},
     ]
 
+@app.on_event("startup")
+def start_loading():
+    # Accept requests (health/readiness) while the model loads
+    def run():
+        try:
+            load_chatbot()
+        except Exception as e:
+            STARTUP["error"] = repr(e)
+            print(f"⚠️ Model loading failed: {e!r}")
+    threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_inference():
+    # Let in-flight batches finish before the process exits
+    if batcher is not None:
+        batcher.stop()
+    inference.shutdown(wait=True)
+
 # ---------- Application Entry Point ----------
-if name == "__main__":
+if __name__ == "__main__":
     uvicorn.run("run:app", host="0.0.0.0", port=8000, reload=True)
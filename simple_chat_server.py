@@ -1,36 +1,136 @@
 # Lightweight HTTP server for serving the chatbot API and frontend assets.
 # This implementation uses Python's built-in HTTP server and provides
-# mock endpoints alongside a chatbot inference endpoint.
+# mock endpoints alongside a chatbot inference endpoint. Connections are
+# kept alive (HTTP/1.1) and served by a bounded thread pool
+# (chatbot.serving.PooledHTTPServer); SIGTERM/SIGINT drain gracefully.
+# The model stack (torch) is imported and loaded by load_chatbot(), not
+# at import time; /api/ready reports when chat requests can be served
+# and how long the cold start took.
 
-import json
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-from pathlib import Path
+import time
+
+# Cold-start reference point reported by /api/ready
+STARTED = time.perf_counter()
 
-# Import chatbot instance and model loader
-from chatbot.chatbot_core import chatbot as chatbot_instance, load_models
+import argparse
+import hmac
+import json
+import threading
+from http.server import SimpleHTTPRequestHandler
 
-# Load model once at server startup
-load_models()
+# torch-free helpers; the chatbot itself is imported in load_chatbot()
+from chatbot.batch_api import NDJSON_TYPE, BatchRequestError, check_length, parse_batch, split_chunks, score_chunk
+from chatbot.batcher import MicroBatcher
+from chatbot.checkpoint import resolve_model_path
+from chatbot.config import ADMIN_TOKEN, HTTP_WORKERS, CHAT_BATCH_MAX_BYTES
+from chatbot.metrics import METRICS, CONTENT_TYPE, chatbot_collector, batcher_collector
+from chatbot.serving import PooledHTTPServer, PooledRequestHandler, prefork, worker_threads
 
 PORT = 8000
 
+# Set by load_chatbot()
+chatbot_instance = None
+batcher = None
+READY = threading.Event()
+STARTUP = {}
+
+
+def load_chatbot():
+    # Import the model stack and load the weights, recording cold-start timings
+    global chatbot_instance, batcher
+    t0 = time.perf_counter()
+    from chatbot.chatbot_core import chatbot
+    t1 = time.perf_counter()
+    chatbot.load_models()
+
+    chatbot_instance = chatbot
+    # Concurrent chat requests are coalesced into batched forward passes
+    batcher = MicroBatcher(chatbot_instance)
+    METRICS.register_collector(chatbot_collector(chatbot_instance))
+    METRICS.register_collector(batcher_collector(batcher))
+    STARTUP.update({
+        "import_s": t1 - t0,
+        "load_s": time.perf_counter() - t1,
+        "ready_s": time.perf_counter() - STARTED,
+        "load": chatbot.load_timings,
+    })
+    READY.set()
+    print(f"✅ Ready in {STARTUP['ready_s'] * 1000:.0f}ms "
+          f"(import {STARTUP['import_s'] * 1000:.0f}ms, load {STARTUP['load_s'] * 1000:.0f}ms)")
+
+
+def load_chatbot_in_background(watch=False):
+    # Serve health/readiness while the model loads
+    def run():
+        try:
+            load_chatbot()
+            if watch:
+                chatbot_instance.watch()
+        except Exception as e:
+            STARTUP["error"] = repr(e)
+            print(f"⚠️ Model loading failed: {e!r}")
+    threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+def read_body(handler, length):
+    # Read the request body; a kept-alive connection can then carry the next request
+    handler.body_read = True
+    return handler.rfile.read(length)
+
+def read_json(handler):
+    # Parse the JSON request body ({} when empty)
+    body = read_body(handler, int(handler.headers.get("Content-Length", 0))).decode("utf-8")
+    return json.loads(body) if body else {}
+
+def is_admin(handler):
+    # Admin endpoints require the configured token (disabled without one)
+    token = handler.headers.get("X-Admin-Token")
+    return ADMIN_TOKEN is not None and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
 def send_json(handler, data, status=200):
     # Utility function for sending JSON responses with CORS headers
     handler.send_response(status)
     handler.send_header("Content-Type", "application/json; charset=utf-8")
     handler.send_header("Access-Control-Allow-Origin", "*")
-    handler.send_header("Access-Control-Allow-Headers", "Content-Type")
+    handler.send_header("Access-Control-Allow-Headers", "Content-Type, X-Admin-Token")
     handler.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    handler.send_header("Content-Length", str(len(body)))
+    if handler.close_connection:
+        handler.send_header("Connection", "close")
+    handler.end_headers()
+    handler.wfile.write(body)
+
+def send_ndjson_stream(handler, chunks):
+    # Stream NDJSON byte chunks as they are produced: chunked transfer
+    # encoding on HTTP/1.1 connections, end-of-stream by close otherwise
+    chunked = handler.request_version == "HTTP/1.1" and handler.protocol_version == "HTTP/1.1"
+    handler.send_response(200)
+    handler.send_header("Content-Type", NDJSON_TYPE + "; charset=utf-8")
+    handler.send_header("Access-Control-Allow-Origin", "*")
+    if chunked:
+        handler.send_header("Transfer-Encoding", "chunked")
+    else:
+        handler.send_header("Connection", "close")
+        handler.close_connection = True
     handler.end_headers()
-    handler.wfile.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    for data in chunks:
+        if chunked:
+            handler.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        else:
+            handler.wfile.write(data)
+        handler.wfile.flush()
+    if chunked:
+        handler.wfile.write(b"0\r\n\r\n")
 
-class MyHandler(SimpleHTTPRequestHandler):
+class MyHandler(PooledRequestHandler, SimpleHTTPRequestHandler):
+    # HTTP/1.1 keep-alive: every response carries Content-Length or is chunked
     def do_OPTIONS(self):
         # Handle CORS preflight requests
         self.send_response(200)
         self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, X-Admin-Token")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
     def do_GET(self):
@@ -64,29 +164,178 @@ class MyHandler(SimpleHTTPRequestHandler):
                 {"id": 2, "title": "New Task", "message": "New maintenance request added", "notification_type": "maintenance"},
             ])
 
+        # Liveness: the process is up and serving HTTP
+        if self.path.startswith("/api/health"):
+            return send_json(self, {"status": "ok"})
+
+        # Readiness: model loaded; includes cold-start timings
+        if self.path.startswith("/api/ready"):
+            if not READY.is_set():
+                return send_json(self, {"ready": False, **STARTUP}, status=503)
+            return send_json(self, {"ready": True, **STARTUP})
+
+        # Micro-batching, cache and classification tier counters for latency/throughput tuning
+        if self.path.startswith("/api/chat/stats"):
+            if not READY.is_set():
+                return send_json(self, {"error": "Model is loading"}, status=503)
+            cache = chatbot_instance.cache.stats() if chatbot_instance.cache is not None else None
+            return send_json(self, {**batcher.stats(), "cache": cache, "tiers": chatbot_instance.tier_stats(),
+                                    "model_version": chatbot_instance.model_version,
+                                    "reload": chatbot_instance.reload_stats})
+
+        # Status and output files of the open or last profiling window
+        if self.path.startswith("/api/admin/profile"):
+            if not is_admin(self):
+                return send_json(self, {"error": "Forbidden"}, status=403)
+            if not READY.is_set():
+                return send_json(self, {"error": "Model is loading"}, status=503)
+            status = chatbot_instance.profile_status()
+            if status is None:
+                return send_json(self, {"error": "No profiling window started"}, status=404)
+            return send_json(self, status)
+
+        # Prometheus scrape endpoint (per process; each pre-forked worker
+        # reports its own stage histograms and counters)
+        if self.path.startswith("/metrics"):
+            if not METRICS.enabled:
+                return send_json(self, {"error": "Metrics disabled"}, status=404)
+            body = METRICS.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
         # Serve static frontend files
         return super().do_GET()
 
     def do_POST(self):
+        self.body_read = False
+        try:
+            return self.handle_post()
+        finally:
+            # An unread body would be parsed as the next request: discard
+            # it, or drop the connection if it is too large to bother
+            length = self.headers.get("Content-Length", "0")
+            if not self.body_read and length != "0" and not self.close_connection:
+                if length.isdigit() and int(length) <= CHAT_BATCH_MAX_BYTES:
+                    read_body(self, int(length))
+                else:
+                    self.close_connection = True
+
+    def handle_post(self):
+        # Hot model reload: load + warm up next to the served model, then
+        # swap; chat requests keep being answered meanwhile.
+        # Body: {"path": optional checkpoint path under config.MODELS_ROOT}
+        if self.path.startswith("/api/admin/reload"):
+            if not is_admin(self):
+                return send_json(self, {"error": "Forbidden"}, status=403)
+            if not READY.is_set():
+                return send_json(self, {"error": "Model is loading"}, status=503)
+            data = read_json(self)
+            try:
+                path = resolve_model_path(data["path"]) if data.get("path") is not None else None
+            except (ValueError, TypeError) as e:
+                return send_json(self, {"error": str(e)}, status=400)
+            try:
+                report = chatbot_instance.reload(path)
+            except Exception as e:
+                return send_json(self, {"error": f"Reload failed, current model kept: {e!r}"}, status=500)
+            return send_json(self, report)
+
+        # Profile the next N predictions of this worker process (torch
+        # profiler + Python stack samples); files are written under
+        # config.PROFILE_DIR. Body: {"calls": optional N, "timeout": optional s}
+        if self.path.startswith("/api/admin/profile"):
+            if not is_admin(self):
+                return send_json(self, {"error": "Forbidden"}, status=403)
+            if not READY.is_set():
+                return send_json(self, {"error": "Model is loading"}, status=503)
+            data = read_json(self)
+            options = {k: data[k] for k in ("calls", "timeout") if data.get(k) is not None}
+            try:
+                capture = chatbot_instance.start_profile(**options)
+            except ValueError as e:
+                return send_json(self, {"error": str(e)}, status=400)
+            except RuntimeError as e:
+                return send_json(self, {"error": str(e)}, status=409)
+            return send_json(self, capture.status(), status=202)
+
+        # Batch inference: JSON array or NDJSON body of messages, one NDJSON
+        # result line per message streamed back after each model batch
+        if self.path.startswith("/api/chat/batch"):
+            with METRICS.in_flight():
+                try:
+                    length = check_length(self.headers.get("Content-Length"))
+                    if not READY.is_set():
+                        raise BatchRequestError("Model is loading, please retry", status=503)
+                    items = parse_batch(read_body(self, length), self.headers.get("Content-Type", ""))
+                except BatchRequestError as e:
+                    if e.status in (400, 411, 413) and not self.body_read:
+                        # Missing, invalid or oversized Content-Length: don't read the body
+                        self.close_connection = True
+                    return send_json(self, {"error": str(e)}, status=e.status)
+                # Whole chunks go straight to batched inference (not the micro-batcher)
+                return send_ndjson_stream(self, (score_chunk(chatbot_instance.predict_batch, chunk)
+                                                 for chunk in split_chunks(items)))
+
         # Handle chatbot inference requests
         if self.path.startswith("/api/chat"):
-            length = int(self.headers.get("Content-Length", 0))
-            body = self.rfile.read(length).decode("utf-8")
-            data = json.loads(body) if body else {}
+            with METRICS.in_flight(), METRICS.stage("request"):
+                with METRICS.stage("parse"):
+                    data = read_json(self)
 
-            text = data.get("text", "").strip()
-            if not text:
-                return send_json(self, {"error": "Empty message"}, status=400)
+                text = data.get("text", "").strip()
+                if not text:
+                    return send_json(self, {"error": "Empty message"}, status=400)
+                if not READY.is_set():
+                    return send_json(self, {"error": "Model is loading, please retry"}, status=503)
 
-            # Run chatbot prediction
-            result = chatbot_instance.predict(text)
+                # Run chatbot prediction through the micro-batcher
+                result = batcher.predict(text)
 
-            # Return standardized chatbot response
-            return send_json(self, result)
+                # Return standardized chatbot response
+                with METRICS.stage("send"):
+                    return send_json(self, result)
 
         return send_json(self, {"error": "Unknown endpoint"}, status=404)
 
-if name == "__main__":
-    print(f"✅ Server running: http://localhost:{PORT}/front/index.html")
-    httpd = HTTPServer(("0.0.0.0", PORT), MyHandler)
-    httpd.serve_forever()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chatbot API and frontend server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of pre-forked worker processes sharing the model weights")
+    parser.add_argument("--watch", action="store_true",
+                        help="hot-reload the model when the checkpoint file changes")
+    parser.add_argument("--http-workers", type=int, default=HTTP_WORKERS,
+                        help="connection threads per process (keep-alive connections hold one while open)")
+    args = parser.parse_args()
+
+    # Keep-alive connections served by a bounded thread pool, so static
+    # files and concurrent chats (sharing a batch) don't wait on each other
+    httpd = PooledHTTPServer(("0.0.0.0", args.port), MyHandler, workers=args.http_workers)
+    print(f"✅ Server running: http://localhost:{args.port}/front/index.html")
+
+    if args.workers > 1:
+        # Weights are loaded once before forking; workers inherit them read-only
+        # (memory-mapped weights as shared page cache, others via shm)
+        load_chatbot()
+        import torch
+
+        chatbot_instance.share_memory()
+        threads = worker_threads(args.workers)
+
+        def on_worker_start(worker_id):
+            torch.set_num_threads(threads)
+            # Threads don't survive fork(): every worker watches on its own
+            if args.watch:
+                chatbot_instance.watch()
+            print(f"✅ Worker {worker_id} started ({threads} torch threads)")
+
+        # SIGTERM from the parent drains each worker gracefully
+        prefork(lambda worker_id: httpd.serve(), args.workers, on_worker_start)
+    else:
+        load_chatbot_in_background(watch=args.watch)
+        httpd.serve()
+        print("✅ Server stopped")
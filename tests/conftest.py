@@ -0,0 +1,7 @@
+# Shared pytest setup: make the repository root (run.py, chatbot/)
+# importable when the tests are run from any directory.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
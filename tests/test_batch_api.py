@@ -0,0 +1,86 @@
+# Tests for /api/chat/batch request parsing and NDJSON results.
+#
+# Usage:
+#   python -m pytest tests
+
+import json
+
+import pytest
+
+from chatbot.batch_api import BatchRequestError, check_length, parse_batch, score_chunk, split_chunks
+
+
+def test_check_length():
+    assert check_length("120") == 120
+    with pytest.raises(BatchRequestError) as e:
+        check_length(None)
+    assert e.value.status == 411
+    with pytest.raises(BatchRequestError) as e:
+        check_length("abc")
+    assert e.value.status == 400
+    with pytest.raises(BatchRequestError) as e:
+        check_length("101", max_bytes=100)
+    assert e.value.status == 413
+
+
+def test_parse_json_array_with_ids_and_invalid_items():
+    body = json.dumps(["سلام", {"text": " شارژ ", "id": "a1"}, "", 5, {"id": 7}]).encode()
+    items = parse_batch(body, "application/json")
+    assert items[0] == {"index": 0, "text": "سلام"}
+    assert items[1] == {"index": 1, "id": "a1", "text": "شارژ"}
+    assert items[2] == {"index": 2, "error": "Empty message"}
+    assert items[3] == {"index": 3, "error": "Empty message"}
+    assert items[4] == {"index": 4, "id": 7, "error": "Empty message"}
+
+
+def test_parse_ndjson_skips_blank_lines_and_marks_bad_lines():
+    body = '"یک"\n\n{"text": "دو"}\nnot json\n'.encode()
+    items = parse_batch(body, "application/x-ndjson")
+    assert [i.get("text") for i in items] == ["یک", "دو", None]
+    assert items[2]["error"] == "Invalid JSON line"
+
+
+def test_parse_limits():
+    with pytest.raises(BatchRequestError):
+        parse_batch(b"[]")
+    with pytest.raises(BatchRequestError):
+        parse_batch(b"[1, 2")
+    with pytest.raises(BatchRequestError):
+        parse_batch(b"\xff\xfe")
+    with pytest.raises(BatchRequestError) as e:
+        parse_batch(json.dumps(["a"] * 4).encode(), max_items=3)
+    assert e.value.status == 413
+    with pytest.raises(BatchRequestError) as e:
+        parse_batch(("\n".join('"a"' for _ in range(4))).encode(), "application/x-ndjson", max_items=3)
+    assert e.value.status == 413
+    items = parse_batch(json.dumps(["abcdef"]).encode(), max_chars=5)
+    assert "error" in items[0]
+
+
+def test_split_chunks():
+    assert [len(c) for c in split_chunks(list(range(10)), size=4)] == [4, 4, 2]
+
+
+def test_score_chunk_keeps_input_order_and_errors():
+    calls = []
+
+    def predict_batch(texts, batch_size):
+        calls.append(list(texts))
+        return [{"intent": f"i:{t}"} for t in texts]
+
+    items = parse_batch(json.dumps([{"text": "a", "id": 1}, "", "b"]).encode())
+    lines = [json.loads(line) for line in score_chunk(predict_batch, items).decode().splitlines()]
+    assert calls == [["a", "b"]]
+    assert lines == [
+        {"index": 0, "id": 1, "intent": "i:a"},
+        {"index": 1, "error": "Empty message"},
+        {"index": 2, "intent": "i:b"},
+    ]
+
+
+def test_score_chunk_without_valid_items_skips_the_model():
+    def predict_batch(texts, batch_size):
+        raise AssertionError("model called")
+
+    items = [{"index": 0, "error": "Empty message"}]
+    assert json.loads(score_chunk(predict_batch, items)) == {"index": 0, "error": "Empty message"}
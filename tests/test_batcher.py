@@ -0,0 +1,100 @@
+# Tests for the micro-batcher (stand-in bot, no torch needed).
+#
+# Usage:
+#   python -m pytest tests
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chatbot.batcher import MicroBatcher
+
+
+class EchoBot:
+    """predict_batch() stand-in recording the size of every batch."""
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def predict_batch(self, texts, batch_size=None):
+        with self._lock:
+            self.batches.append(len(texts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [{"text": t} for t in texts]
+
+
+def test_concurrent_requests_share_a_batch():
+    bot = EchoBot()
+    batcher = MicroBatcher(bot, max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(f"m{i}") for i in range(8)]
+    assert [f.result(timeout=5)["text"] for f in futures] == [f"m{i}" for i in range(8)]
+    assert bot.batches == [8]
+    stats = batcher.stats()
+    assert (stats["requests"], stats["batches"], stats["max_batch_size_seen"]) == (8, 1, 8)
+    batcher.stop()
+
+
+def test_partial_batch_flushes_after_wait_window():
+    bot = EchoBot()
+    batcher = MicroBatcher(bot, max_batch_size=64, max_wait_ms=20)
+    start = time.perf_counter()
+    assert batcher.predict("tek", timeout=5) == {"text": "tek"}
+    assert time.perf_counter() - start < 2
+    assert bot.batches == [1]
+    batcher.stop()
+
+
+def test_stop_serves_queued_requests():
+    bot = EchoBot(delay=0.05)
+    batcher = MicroBatcher(bot, max_batch_size=2, max_wait_ms=1)
+    futures = [batcher.submit(str(i)) for i in range(6)]
+    batcher.stop()
+    assert all(f.done() for f in futures)
+    assert sum(bot.batches) == 6
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    batcher = MicroBatcher(EchoBot(fail=True), max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(str(i)) for i in range(4)]
+    for f in futures:
+        with pytest.raises(RuntimeError):
+            f.result(timeout=5)
+    assert batcher.stats()["errors"] == 4
+    batcher.stop()
+
+
+def test_batches_run_on_pool():
+    bot = EchoBot(delay=0.05)
+    pool = ThreadPoolExecutor(2)
+    batcher = MicroBatcher(bot, max_batch_size=1, max_wait_ms=0, pool=pool)
+    futures = [batcher.submit(str(i)) for i in range(4)]
+    assert [f.result(timeout=5)["text"] for f in futures] == ["0", "1", "2", "3"]
+    batcher.stop()
+    pool.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_child_gets_its_own_worker():
+    batcher = MicroBatcher(EchoBot(), max_batch_size=4, max_wait_ms=1)
+    assert batcher.predict("parent", timeout=5) == {"text": "parent"}
+
+    pid = os.fork()
+    if pid == 0:
+        # The parent's worker thread does not exist here
+        try:
+            ok = batcher.predict("child", timeout=5) == {"text": "child"}
+            ok = ok and batcher.stats()["requests"] == 1
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert batcher.stats()["requests"] == 1
+    batcher.stop()
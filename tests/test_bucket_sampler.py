@@ -0,0 +1,49 @@
+# Tests for length-bucketed batch sampling (needs torch and NumPy).
+#
+# Usage:
+#   python -m pytest tests
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+
+from chatbot.dataset import BucketBatchSampler
+
+LENGTHS = [(i * 37) % 23 + 1 for i in range(250)]
+
+
+def test_every_index_once():
+    sampler = BucketBatchSampler(LENGTHS, batch_size=16, pool_batches=4)
+    seen = sorted(i for batch in sampler for i in batch)
+    assert seen == list(range(len(LENGTHS)))
+    assert len(list(sampler)) == len(sampler)
+
+
+def test_batches_hold_similar_lengths():
+    # One pool covering everything: each batch is a slice of the sorted lengths
+    sampler = BucketBatchSampler(LENGTHS, batch_size=10, pool_batches=100)
+    spreads = [max(LENGTHS[i] for i in b) - min(LENGTHS[i] for i in b) for b in sampler]
+    assert max(spreads) <= 2
+
+
+def test_epochs_are_reproducible_and_differ():
+    sampler = BucketBatchSampler(LENGTHS, batch_size=8, seed=3)
+    first = list(sampler)
+    assert list(sampler) == first
+    sampler.set_epoch(1)
+    assert list(sampler) != first
+
+
+def test_drop_last_and_len():
+    sampler = BucketBatchSampler(LENGTHS, batch_size=16, pool_batches=4, drop_last=True)
+    batches = list(sampler)
+    assert all(len(b) == 16 for b in batches)
+    assert len(batches) == len(sampler)
+
+
+def test_accepts_arrays_without_copying_to_lists():
+    lengths = np.array(LENGTHS, dtype=np.int32)
+    sampler = BucketBatchSampler(lengths, batch_size=16, shuffle=False)
+    assert isinstance(sampler.lengths, np.ndarray)
+    assert all(isinstance(i, int) for i in next(iter(sampler)))
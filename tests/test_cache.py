@@ -0,0 +1,87 @@
+# Tests for the LRU/TTL prediction cache.
+#
+# Usage:
+#   python -m pytest tests
+
+import threading
+
+import pytest
+
+from chatbot import cache as cache_module
+from chatbot.cache import PredictionCache
+
+
+def test_hit_and_miss_counters():
+    cache = PredictionCache(4)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_least_recently_used_is_evicted():
+    cache = PredictionCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")            # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 2
+
+
+def test_put_refreshes_existing_key():
+    cache = PredictionCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(4, ttl=5.0)
+    cache.put("a", 1)
+    now[0] += 4.9
+    assert cache.get("a") == 1
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_clear_keeps_counters():
+    cache = PredictionCache(4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError):
+        PredictionCache(0)
+
+
+def test_concurrent_access_stays_bounded():
+    cache = PredictionCache(50)
+
+    def worker(offset):
+        for i in range(500):
+            cache.put((offset, i % 80), i)
+            cache.get((offset, (i * 7) % 80))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert len(cache) == 50
+    assert stats["hits"] + stats["misses"] == 8 * 500
@@ -0,0 +1,87 @@
+# Tests for the inference executor's backpressure (no torch needed).
+#
+# Usage:
+#   python -m pytest tests
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from chatbot.executor import InferenceExecutor, QueueFullError
+
+
+def test_rejects_beyond_max_pending():
+    ex = InferenceExecutor(max_workers=1, max_pending=2)
+    gate = threading.Event()
+    first = ex.submit(gate.wait)
+    second = ex.submit(gate.wait)
+    with pytest.raises(QueueFullError):
+        ex.submit(gate.wait)
+    assert ex.stats()["rejected"] == 1
+    gate.set()
+    first.result(timeout=5)
+    second.result(timeout=5)
+    assert ex.stats()["pending"] == 0
+    # Slots are free again
+    assert ex.submit(lambda: 42).result(timeout=5) == 42
+    ex.shutdown()
+
+
+def test_run_returns_result_and_releases_on_error():
+    ex = InferenceExecutor(max_workers=2, max_pending=2)
+
+    def boom():
+        raise ValueError("bad input")
+
+    async def main():
+        assert await ex.run(sum, [1, 2, 3]) == 6
+        with pytest.raises(ValueError):
+            await ex.run(boom)
+
+    asyncio.run(main())
+    stats = ex.stats()
+    assert (stats["pending"], stats["completed"]) == (0, 2)
+    ex.shutdown()
+
+
+def test_run_future_counts_against_the_limit():
+    ex = InferenceExecutor(max_workers=1, max_pending=1)
+    fut = Future()
+
+    async def main():
+        task = asyncio.ensure_future(ex.run_future(lambda: fut))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFullError):
+            await ex.run(lambda: None)
+        fut.set_result("done")
+        assert await task == "done"
+
+    asyncio.run(main())
+    assert ex.stats()["pending"] == 0
+    ex.shutdown()
+
+
+def test_run_waiting_queues_instead_of_rejecting():
+    ex = InferenceExecutor(max_workers=2, max_pending=2)
+
+    def work(i):
+        time.sleep(0.02)
+        return i
+
+    async def main():
+        return await asyncio.gather(*(ex.run_waiting(work, i) for i in range(8)))
+
+    assert asyncio.run(main()) == list(range(8))
+    stats = ex.stats()
+    assert (stats["pending"], stats["waiting"], stats["rejected"], stats["completed"]) == (0, 0, 0, 8)
+    ex.shutdown()
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        InferenceExecutor(max_workers=0)
+    with pytest.raises(ValueError):
+        InferenceExecutor(max_pending=0)
@@ -0,0 +1,58 @@
+# Tests for the Aho-Corasick keyword matcher and the entity extractor
+# built on it (torch-free).
+#
+# Usage:
+#   python -m pytest tests
+
+import pytest
+
+from chatbot.entity_extractor import extract_entities
+from chatbot.keyword_matcher import KeywordMatcher
+
+
+def test_longest_match_wins_on_overlap():
+    matcher = KeywordMatcher().add_all(["روف", "روف گاردن"], "facility").build()
+    assert [m.keyword for m in matcher.find("روف گاردن تمیز نیست")] == ["روف گاردن"]
+    assert [m.keyword for m in matcher.find("روف خراب است")] == ["روف"]
+
+
+def test_matches_are_non_overlapping_and_in_text_order():
+    matcher = KeywordMatcher().add_all(["آب", "آسانسور", "برق"]).build()
+    matches = matcher.find("برق و آسانسور و آب")
+    assert [m.keyword for m in matches] == ["برق", "آسانسور", "آب"]
+    assert all(a.end <= b.start for a, b in zip(matches, matches[1:]))
+
+
+def test_whole_word_keywords_need_boundaries():
+    matcher = KeywordMatcher().add("فردا", "date", whole_word=True).add("آب", "facility").build()
+    assert [m.label for m in matcher.find("فردا میام")] == ["date"]
+    assert matcher.find("فرداها") == []
+    # Not whole-word: also found inside a longer word
+    assert [m.keyword for m in matcher.find("آبگرمکن")] == ["آب"]
+
+
+def test_matches_report_offsets():
+    text = "لابی و درب"
+    for m in KeywordMatcher().add_all(["لابی", "درب"]).find(text):
+        assert text[m.start:m.end] == m.keyword
+
+
+def test_empty_keyword_rejected():
+    with pytest.raises(ValueError):
+        KeywordMatcher().add("")
+
+
+def test_extract_entities_deduplicates_facilities():
+    assert extract_entities("آسانسور خراب است آسانسور") == {"facility": ["آسانسور"]}
+    assert extract_entities("آسانسور و پارکینگ و آسانسور")["facility"] == ["آسانسور", "پارکینگ"]
+
+
+def test_extract_entities_prefers_longest_keyword():
+    assert extract_entities("روف گاردن کثیف است")["facility"] == ["روف گاردن"]
+    assert extract_entities("پس فردا بیاید")["date"] == ["پس فردا"]
+    assert extract_entities("فردا بیاید")["date"] == ["فردا"]
+
+
+def test_extract_entities_priority_precedence():
+    assert extract_entities("مهم و خیلی فوری")["priority"] == ["urgent"]
+    assert extract_entities("عادی است") == {"priority": ["medium"]}
@@ -0,0 +1,60 @@
+# Tests for the Persian normalizer and the normalizer version recorded
+# by tokenizers (torch-free).
+#
+# Usage:
+#   python -m pytest tests
+
+import pytest
+
+from chatbot.normalizer import NORMALIZER_VERSION, get_normalizer, normalize_fa, normalize_fa_v1
+from chatbot.tokenizer import create_tokenizer, tokenizer_from_checkpoint
+
+
+def test_unifies_characters_and_digits():
+    assert normalize_fa("علي  كجاست") == "علی کجاست"
+    assert normalize_fa("سفارش ۱۲۳ و ٤٥") == "سفارش 123 و 45"
+    assert normalize_fa("ORDER Abc") == "order abc"
+
+
+def test_drops_diacritics_tatweel_and_invisible_characters():
+    assert normalize_fa("سَلام") == "سلام"
+    assert normalize_fa("سـلام") == "سلام"
+    assert normalize_fa("سل​ام دوست") == "سلام دوست"
+
+
+def test_zwnj_kept_inside_words_only():
+    assert normalize_fa("کتاب‌ها") == "کتاب‌ها"
+    assert normalize_fa("‌کتاب‌ ها") == "کتاب ها"
+
+
+def test_idempotent_and_empty():
+    text = "  سَلام   ۱۲ ABC‌ "
+    assert normalize_fa(normalize_fa(text)) == normalize_fa(text)
+    assert normalize_fa("") == ""
+    assert normalize_fa(None) == ""
+
+
+def test_v1_only_trims_and_unifies_yeh_kaf():
+    assert normalize_fa_v1("  ABC  ۱۲ علي ") == "ABC ۱۲ علی"
+    assert get_normalizer(1) is normalize_fa_v1
+    assert get_normalizer() is normalize_fa
+    with pytest.raises(ValueError):
+        get_normalizer(99)
+
+
+def test_new_tokenizers_record_normalizer_version():
+    tok = create_tokenizer("word")
+    tok.fit(["سلام ABC"])
+    tok.freeze()
+    assert tok.to_config()["normalizer"] == NORMALIZER_VERSION
+    restored = tokenizer_from_checkpoint({"vocab": tok.word2idx, "tokenizer": tok.to_config()})
+    assert restored.normalizer == NORMALIZER_VERSION
+
+
+def test_unversioned_checkpoints_keep_original_normalization():
+    vocab = {"<pad>": 0, "<unk>": 1, "ABC": 2, "۱۲": 3}
+    tok = tokenizer_from_checkpoint({"vocab": vocab})
+    assert tok.normalizer == 1
+    raw = " ABC  ۱۲ "
+    assert tok.model_text(raw, normalize_fa(raw)) == "ABC ۱۲"
+    assert tok.encode(raw, 4) == [2, 3, 0, 0]
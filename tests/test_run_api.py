@@ -0,0 +1,77 @@
+# API tests for run.py.
+# The served chatbot is replaced by a stand-in with Chatbot's result
+# format (no model or torch needed); requests go through the real
+# executor and micro-batcher.
+#
+# Usage:
+#   python -m pytest tests
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+import run
+from chatbot.batcher import MicroBatcher
+
+
+class StubChatbot:
+    """Chatbot.predict()/predict_batch() result format with fixed values."""
+    def predict(self, text: str) -> dict:
+        return {
+            "intent": "support_issue",
+            "sentiment": "negative",
+            "intent_prob": [0.1, 0.7, 0.1, 0.1],
+            "sentiment_prob": [0.8, 0.15, 0.05],
+            "entities": {"order_id": ["12345"]},
+            "response_text": f"reply to: {text}",
+        }
+
+    def predict_batch(self, texts, batch_size: int = None) -> list:
+        return [self.predict(t) for t in texts]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    bot = StubChatbot()
+    batcher = MicroBatcher(bot, pool=run.inference.pool)
+    monkeypatch.setattr(run, "chatbot", bot)
+    monkeypatch.setattr(run, "batcher", batcher)
+    run.READY.set()
+    # No context manager: startup events would load the real model
+    yield TestClient(run.app)
+    run.READY.clear()
+    batcher.stop()
+
+
+def test_chat_matches_predict(client):
+    text = "سفارش 12345 من هنوز نرسیده"
+    expected = StubChatbot().predict(text)
+
+    resp = client.post("/api/chat", json={"text": text})
+
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "intent": expected["intent"],
+        "sentiment": expected["sentiment"],
+        "entities": expected["entities"],
+        "intent_prob": expected["intent_prob"],
+        "sent_prob": expected["sentiment_prob"],
+        "response_text": expected["response_text"],
+    }
+
+
+def test_chat_rejects_empty_text(client):
+    assert client.post("/api/chat", json={"text": "  "}).status_code == 400
+
+
+def test_admin_endpoints_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(run, "ADMIN_TOKEN", None)
+    assert client.post("/api/admin/reload", json={}).status_code == 403
+    assert client.get("/api/admin/profile").status_code == 403
+
+
+def test_reload_rejects_paths_outside_models(client, monkeypatch):
+    monkeypatch.setattr(run, "ADMIN_TOKEN", "secret")
+    resp = client.post("/api/admin/reload", json={"path": "/tmp/evil.pt"}, headers={"X-Admin-Token": "secret"})
+    assert resp.status_code == 400
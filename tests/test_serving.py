@@ -0,0 +1,117 @@
+# Tests for the pooled keep-alive HTTP server (real sockets on localhost).
+#
+# Usage:
+#   python -m pytest tests
+
+import http.client
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from chatbot.serving import PooledHTTPServer, PooledRequestHandler
+
+
+class EchoHandler(PooledRequestHandler, BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.3)
+        body = json.dumps({"path": self.path, "port": self.client_address[1]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def server():
+    created = []
+
+    def start(**kwargs):
+        httpd = PooledHTTPServer(("127.0.0.1", 0), EchoHandler, **kwargs)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        created.append(httpd)
+        return httpd
+
+    yield start
+    for httpd in created:
+        if not httpd.draining:
+            httpd.shutdown_gracefully()
+
+
+def test_keep_alive_reuses_the_connection(server):
+    httpd = server(workers=2, max_queued=2)
+    conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    ports = set()
+    for i in range(3):
+        conn.request("GET", f"/r{i}")
+        resp = conn.getresponse()
+        resp_json = json.loads(resp.read())
+        assert resp.status == 200 and resp_json["path"] == f"/r{i}"
+        ports.add(resp_json["port"])
+    assert len(ports) == 1
+    conn.close()
+
+
+def test_idle_connections_time_out(server):
+    httpd = server(workers=1, max_queued=0, keepalive_timeout=0.2)
+    sock = socket.create_connection(httpd.server_address, timeout=5)
+    time.sleep(0.5)
+    assert sock.recv(1) == b""   # closed by the server
+    sock.close()
+    assert wait_for(lambda: httpd.stats()["connections"] == 0)
+
+
+def test_full_pool_answers_503(server):
+    httpd = server(workers=1, max_queued=0, keepalive_timeout=2)
+    busy = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    busy.request("GET", "/slow")
+    time.sleep(0.1)
+
+    extra = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    extra.request("GET", "/")
+    resp = extra.getresponse()
+    assert resp.status == 503
+    assert resp.getheader("Retry-After") == "1"
+    assert httpd.stats()["rejected"] == 1
+
+    assert busy.getresponse().status == 200
+    busy.close()
+    extra.close()
+
+
+def test_graceful_shutdown_finishes_running_requests(server):
+    httpd = server(workers=2, max_queued=0, grace=5)
+    conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    conn.request("GET", "/slow")
+    time.sleep(0.1)
+    threading.Thread(target=httpd.shutdown_gracefully, daemon=True).start()
+    resp = conn.getresponse()
+    assert resp.status == 200
+    resp.read()
+    # The kept-alive connection is closed after the request, not reused
+    assert conn.sock is None or conn.sock.recv(1) == b""
+    conn.close()
+    assert wait_for(lambda: httpd.stats()["connections"] == 0)
+
+
+def test_invalid_pool_settings():
+    with pytest.raises(ValueError):
+        PooledHTTPServer(("127.0.0.1", 0), EchoHandler, workers=0)
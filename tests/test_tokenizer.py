@@ -0,0 +1,72 @@
+# Tests for the word and hashing tokenizers (torch-free parts).
+#
+# Usage:
+#   python -m pytest tests
+
+import zlib
+
+import pytest
+
+from chatbot.tokenizer import HashingTokenizer, create_tokenizer, tokenizer_from_checkpoint
+
+TEXTS = ["آسانسور خراب است", "آسانسور لابی خراب است", "شارژ این ماه", "آسانسور"]
+
+
+def fitted(**kwargs):
+    tok = HashingTokenizer(**kwargs)
+    tok.fit(TEXTS)
+    return tok.freeze()
+
+
+def test_buckets_start_after_fitted_vocabulary():
+    tok = fitted(num_buckets=16, min_freq=2, max_vocab=8000)
+    assert tok.bucket_offset == len(tok.word2idx) == 5   # <pad>, <unk>, آسانسور, خراب, است
+    assert tok.vocab_size == tok.bucket_offset + 16
+    assert tok.to_config()["bucket_offset"] == tok.bucket_offset
+
+
+def test_unknown_words_hash_into_buckets():
+    tok = fitted(num_buckets=16, min_freq=2)
+    ids = tok.encode("آسانسور ناشناخته", 3)
+    assert ids[0] == tok.word2idx["آسانسور"]
+    assert ids[1] == tok.bucket_offset + zlib.crc32("ناشناخته".encode("utf-8")) % 16
+    assert tok.bucket_offset <= ids[1] < tok.vocab_size
+    assert ids[2] == 0
+
+
+def test_zwnj_suffix_maps_to_known_stem():
+    tok = fitted(min_freq=2)
+    assert tok.encode("آسانسور‌ها", 1) == [tok.word2idx["آسانسور"]]
+
+
+def test_max_vocab_keeps_most_frequent_words():
+    tok = fitted(min_freq=1, max_vocab=1)
+    assert list(tok.word2idx) == ["<pad>", "<unk>", "آسانسور"]
+
+
+def test_checkpoint_round_trip_and_legacy_offset():
+    tok = fitted(num_buckets=16, min_freq=2)
+    restored = tokenizer_from_checkpoint({"vocab": tok.word2idx, "tokenizer": tok.to_config()})
+    assert restored.vocab_size == tok.vocab_size
+    assert restored.encode("آسانسور ناشناخته", 3) == tok.encode("آسانسور ناشناخته", 3)
+
+    # Checkpoints from before bucket_offset was stored keep 2 + max_vocab
+    legacy = dict(tok.to_config())
+    del legacy["bucket_offset"]
+    old = tokenizer_from_checkpoint({"vocab": tok.word2idx, "tokenizer": legacy})
+    assert old.bucket_offset == 2 + tok.max_vocab
+
+
+def test_frozen_tokenizer_rejects_fit():
+    tok = fitted()
+    with pytest.raises(RuntimeError):
+        tok.fit(["جدید"])
+
+
+def test_word_tokenizer_unknown_and_padding():
+    tok = create_tokenizer("word")
+    tok.fit(["سلام دنیا"])
+    tok.freeze()
+    assert tok.encode("سلام ناشناخته", 4, return_length=True) == ([2, 1, 0, 0], 2)
+    with pytest.raises(ValueError):
+        create_tokenizer("bpe")